@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+iBase 本地激活服务 · asyncio
+
+仅监听本机回环地址（或 Unix 套接字），供服务台批量签发、校验激活码。
+    POST /v1/issue    {"items": [{"machine_code": "...", "expires": "YYYY-MM-DD" | null}]}
+    POST /v1/verify   {"items": [{"machine_code": "...", "code": "..."}]}
+    POST /v1/expiry   {"items": [{"machine_code": "...", "code": "..."}]}
+    GET  /v1/stats    请求延迟、吞吐与缓存计数
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import datetime as dt
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ibase_launcher import (
+    PERMANENT_EXPIRY_SENTINEL, calc_activation_code_v3, verify_activation_code,
+    format_activation_code, format_machine_code, _sanitize_machine_code,
+    set_date_code_cache_limit, date_code_cache_info
+)
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_ITEMS = 1000
+LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class EndpointStats:
+    __slots__ = ("requests", "items", "errors", "latency_sum_ms", "latency_max_ms", "buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.items = 0
+        self.errors = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, latency_ms: float, items: int, failed: bool):
+        self.requests += 1
+        self.items += items
+        if failed:
+            self.errors += 1
+        self.latency_sum_ms += latency_ms
+        self.latency_max_ms = max(self.latency_max_ms, latency_ms)
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def snapshot(self, uptime: float) -> dict:
+        labels = [str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"]
+        return {
+            "requests": self.requests,
+            "items": self.items,
+            "errors": self.errors,
+            "latency_avg_ms": round(self.latency_sum_ms / self.requests, 3) if self.requests else 0.0,
+            "latency_max_ms": round(self.latency_max_ms, 3),
+            "latency_buckets_ms": dict(zip(labels, self.buckets)),
+            "requests_per_s": round(self.requests / uptime, 3) if uptime > 0 else 0.0,
+            "items_per_s": round(self.items / uptime, 3) if uptime > 0 else 0.0,
+        }
+
+
+def _expiry_fields(expires_at: Optional[int]) -> dict:
+    if expires_at is None:
+        return {"expires_at": None, "expires_on": None}
+    if expires_at == PERMANENT_EXPIRY_SENTINEL:
+        return {"expires_at": expires_at, "expires_on": "permanent"}
+    day = dt.datetime.fromtimestamp(expires_at, tz=dt.timezone.utc).date()
+    return {"expires_at": expires_at, "expires_on": day.isoformat()}
+
+
+def issue_batch(items: List[dict]) -> List[dict]:
+    results = []
+    for item in items:
+        mc = _sanitize_machine_code(str(item.get("machine_code", "")))
+        expires = item.get("expires")
+        try:
+            expires_on = None if expires in (None, "permanent") else dt.date.fromisoformat(str(expires))
+        except ValueError:
+            results.append({"machine_code": format_machine_code(mc), "error": f"无效的到期日期：{expires}"})
+            continue
+        try:
+            code = calc_activation_code_v3(mc, expires_on)
+        except ValueError as e:
+            results.append({"machine_code": format_machine_code(mc), "error": str(e)})
+            continue
+        results.append({"machine_code": format_machine_code(mc), "activation_code": format_activation_code(code)})
+    return results
+
+
+def verify_batch(items: List[dict]) -> List[dict]:
+    results = []
+    for item in items:
+        mc = _sanitize_machine_code(str(item.get("machine_code", "")))
+        ok, expires_at, error, normalized = verify_activation_code(mc, str(item.get("code", "")))
+        entry = {"machine_code": format_machine_code(mc), "code": normalized, "ok": ok, "error": error}
+        entry.update(_expiry_fields(expires_at))
+        results.append(entry)
+    return results
+
+
+def expiry_batch(items: List[dict]) -> List[dict]:
+    now = int(time.time())
+    results = []
+    for entry in verify_batch(items):
+        expires_at = entry["expires_at"]
+        results.append({
+            "machine_code": entry["machine_code"],
+            "code": entry["code"],
+            "valid_code": expires_at is not None,
+            "expired": expires_at is not None and expires_at < now,
+            "expires_at": expires_at,
+            "expires_on": entry["expires_on"],
+        })
+    return results
+
+
+class ActivationService:
+    ROUTES = {
+        "/v1/issue": issue_batch,
+        "/v1/verify": verify_batch,
+        "/v1/expiry": expiry_batch,
+    }
+
+    def __init__(self, workers: int = 2):
+        self.started = time.monotonic()
+        self.stats: Dict[str, EndpointStats] = {path: EndpointStats() for path in self.ROUTES}
+        # 校验与建表是 CPU 密集操作，放到线程池，避免阻塞事件循环
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="activation")
+
+    def snapshot(self) -> dict:
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime_s": round(uptime, 3),
+            "endpoints": {path: st.snapshot(uptime) for path, st in self.stats.items()},
+            "date_code_cache": date_code_cache_info(),
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/v1/stats":
+            return 200, self.snapshot()
+        handler = self.ROUTES.get(path)
+        if handler is None:
+            return 404, {"error": "未知路径"}
+        if method != "POST":
+            return 405, {"error": "仅支持 POST"}
+        try:
+            payload = json.loads(body.decode("utf-8") or "{}")
+            items = payload["items"]
+            if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+                raise ValueError
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+            return 400, {"error": "请求体应为 {\"items\": [...]}"}
+        if len(items) > MAX_BATCH_ITEMS:
+            return 413, {"error": f"单批最多 {MAX_BATCH_ITEMS} 项"}
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._pool, handler, items)
+        return 200, {"results": results}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "请求行无效"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                raw_length = headers.get("content-length", "0") or "0"
+                # 只接受十进制非负整数；无效时无法确定请求边界，回复后关闭连接
+                if not (raw_length.isascii() and raw_length.isdigit()):
+                    await self._respond(writer, 400, {"error": "Content-Length 无效"}, False)
+                    break
+                length = int(raw_length)
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "请求体过大"}, False)
+                    break
+                try:
+                    body = await reader.readexactly(length) if length else b""
+                except asyncio.IncompleteReadError:
+                    await self._respond(writer, 400, {"error": "请求体不完整"}, False)
+                    break
+                path = target.split("?", 1)[0]
+                try:
+                    status, payload = await self.dispatch(method.upper(), path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                st = self.stats.get(path)
+                if st is not None:
+                    items = len(payload.get("results", ())) if status == 200 else 0
+                    st.observe((time.perf_counter() - start) * 1000.0, items, status != 200)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(port: int = DEFAULT_PORT, unix_path: Optional[str] = None, workers: int = 2):
+    service = ActivationService(workers=workers)
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path)
+        where = unix_path
+    else:
+        # 只绑定回环地址，不对外暴露
+        server = await asyncio.start_server(service.handle, host="127.0.0.1", port=port)
+        where = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    print(f"激活服务已启动：{where}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="activation_service", description="iBase 本地激活服务")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="回环地址端口（0 为随机）")
+    parser.add_argument("--unix", metavar="PATH", help="改为监听 Unix 套接字")
+    parser.add_argument("--cache-size", type=int, default=64, help="常驻 v2 日期表的机器数上限（每张约 1.9 MB）")
+    parser.add_argument("--workers", type=int, default=2, help="校验线程数")
+    args = parser.parse_args(argv)
+    set_date_code_cache_limit(args.cache_size)
+    try:
+        asyncio.run(serve(args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+本地激活服务验证
+
+    python benchmarks/activation_service_check.py
+
+在随机端口启动 activation_service，依次检查签发、校验、到期查询与统计接口的结果，
+以及未知路径、错误方法、无效请求体、超大批次、无效 / 负数 Content-Length 与截断请求体的错误状态码；
+错误请求之后服务仍应正常响应。
+"""
+import sys
+import json
+import socket
+import asyncio
+import argparse
+import datetime as dt
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import activation_service as service
+
+MACHINE_CODE = "87A3-2510-F767-1734"
+
+
+async def _exchange(port: int, raw: bytes, half_close: bool = False):
+    """发送原始请求，返回 (状态码, JSON 响应体)；连接在响应前被关闭时状态码为 None。"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    if half_close:
+        writer.transport.get_extra_info("socket").shutdown(socket.SHUT_WR)
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        writer.close()
+        return None, None
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(int(l.split(":", 1)[1]) for l in lines if l.lower().startswith("content-length:"))
+    body = json.loads(await reader.readexactly(length))
+    writer.close()
+    return int(lines[0].split(" ")[1]), body
+
+
+def _request(method: str, path: str, payload=None, headers: str = None) -> bytes:
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    if headers is None:
+        headers = f"Content-Length: {len(body)}\r\n"
+    return f"{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n{headers}\r\n".encode("latin-1") + body
+
+
+async def _run(failures: list) -> dict:
+    app = service.ActivationService(workers=2)
+    server = await asyncio.start_server(app.handle, host="127.0.0.1", port=0)
+    port = server.sockets[0].getsockname()[1]
+    report = {}
+
+    def expect(name, got, status, check=None):
+        report[name] = got[0]
+        if got[0] != status:
+            failures.append(f"{name}：状态码应为 {status}，实际 {got[0]}（{got[1]}）")
+        elif check is not None and not check(got[1]):
+            failures.append(f"{name}：响应内容不符：{got[1]}")
+
+    async with server:
+        future = (dt.date.today() + dt.timedelta(days=30)).isoformat()
+        issued = await _exchange(port, _request("POST", "/v1/issue", {"items": [
+            {"machine_code": MACHINE_CODE, "expires": future},
+            {"machine_code": MACHINE_CODE, "expires": None},
+            {"machine_code": MACHINE_CODE, "expires": "2024-13-01"},
+        ]}))
+        expect("issue", issued, 200, lambda b: "activation_code" in b["results"][0]
+               and "activation_code" in b["results"][1] and "error" in b["results"][2])
+        dated, permanent = (r.get("activation_code", "") for r in issued[1]["results"][:2])
+
+        items = [{"machine_code": MACHINE_CODE, "code": dated}, {"machine_code": MACHINE_CODE, "code": permanent},
+                 {"machine_code": MACHINE_CODE, "code": "0123-4567-89AB-CDEF"}]
+        expect("verify", await _exchange(port, _request("POST", "/v1/verify", {"items": items})), 200,
+               lambda b: [r["ok"] for r in b["results"]] == [True, True, False]
+               and b["results"][0]["expires_on"] == future and b["results"][1]["expires_on"] == "permanent")
+        expect("expiry", await _exchange(port, _request("POST", "/v1/expiry", {"items": items})), 200,
+               lambda b: [(r["valid_code"], r["expired"]) for r in b["results"]]
+               == [(True, False), (True, False), (False, False)])
+
+        expect("unknown_path", await _exchange(port, _request("POST", "/v1/nope", {"items": []})), 404)
+        expect("wrong_method", await _exchange(port, _request("GET", "/v1/verify")), 405)
+        expect("bad_json", await _exchange(port, _request("POST", "/v1/verify", headers="Content-Length: 3\r\n")
+                                           + b"{x}"), 400)
+        expect("missing_items", await _exchange(port, _request("POST", "/v1/verify", {"codes": []})), 400)
+        expect("too_many_items", await _exchange(port, _request("POST", "/v1/verify", {
+            "items": [{"machine_code": MACHINE_CODE, "code": ""}] * (service.MAX_BATCH_ITEMS + 1)})), 413)
+        expect("body_too_large", await _exchange(port, _request(
+            "POST", "/v1/verify", headers=f"Content-Length: {service.MAX_BODY_BYTES + 1}\r\n")), 413)
+        expect("length_not_numeric", await _exchange(port, _request(
+            "POST", "/v1/verify", headers="Content-Length: abc\r\n")), 400)
+        expect("length_negative", await _exchange(port, _request(
+            "POST", "/v1/verify", headers="Content-Length: -5\r\n")), 400)
+        expect("body_truncated", await _exchange(port, _request(
+            "POST", "/v1/verify", headers="Content-Length: 100\r\n") + b'{"items": [', half_close=True), 400)
+
+        expect("stats", await _exchange(port, _request("GET", "/v1/stats")), 200,
+               lambda b: b["endpoints"]["/v1/verify"]["requests"] >= 2)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="activation_service_check", description="本地激活服务验证")
+    parser.parse_args(argv)
+    failures: list = []
+    report = asyncio.run(_run(failures))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    for line in failures:
+        print("失败：", line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
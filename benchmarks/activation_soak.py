@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+激活对话框浸泡测试 · offscreen 平台
+
+    python benchmarks/activation_soak.py --iterations 10000 -o activation_soak.json
+
+反复输入错误激活码并确认（同时穿插启动失败提示），按检查点记录对话框子对象数、
+顶层窗口数、Python 对象数与常驻内存；预热后任一指标持续增长即返回非零。
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import QObject
+from PyQt6.QtWidgets import QApplication
+
+import ibase_launcher as launcher
+
+SAMPLE_MACHINE_CODE = "87A3-2510-F767-1734"
+WRONG_CODES = ("0123-4567-89AB-CDEF", "3000-0000-0000-0000", "FFFF", "DEAD-BEEF-DEAD-BEEF")
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # 非 Linux 平台只能取得峰值常驻内存
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _sample(app: QApplication, dlg, i: int, t0: float) -> dict:
+    gc.collect()
+    return {
+        "iteration": i,
+        "elapsed_s": round(time.perf_counter() - t0, 2),
+        "children": len(dlg.findChildren(QObject)),
+        "top_level_widgets": len(app.topLevelWidgets()),
+        "py_objects": len(gc.get_objects()),
+        "rss_kb": _rss_kb(),
+    }
+
+
+def soak(iterations: int, checkpoint: int, toast_every: int) -> dict:
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    launcher.Theme.apply(app, launcher.RenderProfile(launcher.RENDER_PROFILE_FULL, "soak"))
+    dlg = launcher.ActivateDialog(SAMPLE_MACHINE_CODE)
+    dlg.show()
+    app.processEvents()
+    t0 = time.perf_counter()
+    samples = [_sample(app, dlg, 0, t0)]
+    for i in range(1, iterations + 1):
+        dlg.ed_code.setText(WRONG_CODES[i % len(WRONG_CODES)])
+        dlg.on_accept()
+        if toast_every and i % toast_every == 0:
+            launcher._show_launch_error(f"启动 iBase.exe 失败：第 {i} 次")
+        app.processEvents()
+        if i % checkpoint == 0:
+            samples.append(_sample(app, dlg, i, t0))
+    dlg.close()
+    return {"iterations": iterations, "samples": samples}
+
+
+def check(result: dict, rss_slack_kb: int, object_slack: int) -> list:
+    """以第一个检查点（预热后）为基线，比较最后一个检查点。"""
+    samples = result["samples"]
+    if len(samples) < 3:
+        return []
+    base, last = samples[1], samples[-1]
+    problems = []
+    for key in ("children", "top_level_widgets"):
+        if last[key] > base[key]:
+            problems.append(f"{key}: {base[key]} -> {last[key]}")
+    if last["py_objects"] - base["py_objects"] > object_slack:
+        problems.append(f"py_objects: {base['py_objects']} -> {last['py_objects']}")
+    if last["rss_kb"] - base["rss_kb"] > rss_slack_kb:
+        problems.append(f"rss_kb: {base['rss_kb']} -> {last['rss_kb']}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="activation_soak", description="激活对话框浸泡测试")
+    parser.add_argument("--iterations", type=int, default=10000, help="错误激活次数")
+    parser.add_argument("--checkpoint", type=int, default=1000, help="采样间隔")
+    parser.add_argument("--toast-every", type=int, default=10, help="每隔多少次穿插一次启动失败提示，0 为关闭")
+    parser.add_argument("--rss-slack-mb", type=float, default=8.0, help="允许的常驻内存增长")
+    parser.add_argument("--object-slack", type=int, default=2000, help="允许的 Python 对象数增长")
+    parser.add_argument("-o", "--output", help="结果 JSON 路径")
+    args = parser.parse_args(argv)
+
+    result = soak(args.iterations, args.checkpoint, args.toast_every)
+    result["problems"] = check(result, int(args.rss_slack_mb * 1024), args.object_slack)
+    for s in result["samples"]:
+        print(f"#{s['iteration']:>6}  {s['elapsed_s']:>7}s  子对象 {s['children']:>5}  "
+              f"顶层窗口 {s['top_level_widgets']:>3}  Python 对象 {s['py_objects']:>7}  RSS {s['rss_kb']} KB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    for line in result["problems"]:
+        print("增长：", line)
+    return 1 if result["problems"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+启动准入 · 同时启动压力验证
+
+    python benchmarks/admission_herd.py --sessions 12 --max-concurrent 2
+
+在临时目录中模拟多个会话同一时刻启动：每个进程经 AdmissionController 排队，取得槽位后
+占用 --hold-ms 模拟创建进程，再保留 --settle-ms。检查任意时刻占用槽位的会话不超过上限、
+放行顺序与排队名次一致，并统计等待时间；另有一个短超时会话验证超时后放行。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import multiprocessing as mp
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ibase_launcher as launcher
+
+
+def _session(root: str, args, start_at: float, timeout: float, results):
+    controller = launcher.AdmissionController(Path(root), args.max_concurrent, timeout, args.settle_ms / 1000.0)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    admitted = controller.acquire()
+    granted = time.time()
+    if admitted:
+        time.sleep(args.hold_ms / 1000.0)
+    controller.release(launched=admitted)
+    released = time.time()
+    results.put({"pid": os.getpid(), "admitted": admitted, "outcome": controller.outcome, "ticket": controller.ticket,
+                 "position": controller.first_position or 0, "waited": controller.waited,
+                 "granted": granted, "busy_until": released + args.settle_ms / 1000.0 if admitted else granted})
+
+
+def _max_overlap(intervals) -> int:
+    events = sorted([(a, 1) for a, _ in intervals] + [(b, -1) for _, b in intervals])
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="admission_herd", description="启动准入压力验证")
+    parser.add_argument("--sessions", type=int, default=10, help="同时启动的会话数")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="槽位数")
+    parser.add_argument("--hold-ms", type=int, default=150, help="取得槽位后的占用时长")
+    parser.add_argument("--settle-ms", type=int, default=100, help="释放后槽位继续保留的时长")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        results = mp.Queue()
+        start_at = time.time() + 0.5
+        procs = [mp.Process(target=_session, args=(root, args, start_at, 60.0, results))
+                 for _ in range(args.sessions)]
+        # 最后一个会话超时很短，验证超时后不再等待
+        procs.append(mp.Process(target=_session, args=(root, args, start_at + 0.05, 0.2, results)))
+        for p in procs:
+            p.start()
+        rows = [results.get(timeout=120) for _ in procs]
+        for p in procs:
+            p.join()
+        leftovers = [n for n in os.listdir(root) if n.startswith("t-")]
+
+    admitted = sorted((r for r in rows if r["admitted"]), key=lambda r: r["granted"])
+    peak = _max_overlap([(r["granted"], r["busy_until"]) for r in admitted])
+    # 先来先得：可同时放行 max_concurrent 个，因此某会话放行时，票据更早却尚未放行的会话应少于槽位数
+    inversions = sum(
+        1 for r in admitted
+        if sum(1 for o in admitted if o["ticket"] < r["ticket"] and o["granted"] > r["granted"]) >= args.max_concurrent
+    )
+    waits = [r["waited"] * 1000.0 for r in admitted]
+    report = {
+        "sessions": len(rows),
+        "admitted": len(admitted),
+        "timeouts": sum(1 for r in rows if r["outcome"] == "timeout"),
+        "peak_concurrent": peak,
+        "order_inversions": inversions,
+        "wait_ms_median": round(statistics.median(waits), 1),
+        "wait_ms_max": round(max(waits), 1),
+        "leftover_tickets": len(leftovers),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failures = []
+    if peak > args.max_concurrent:
+        failures.append(f"同时占用 {peak} 个槽位，超过上限 {args.max_concurrent}")
+    if inversions:
+        failures.append(f"放行顺序与排队先后不一致 {inversions} 次")
+    if report["timeouts"] != 1:
+        failures.append("短超时会话未按超时放行")
+    if leftovers:
+        failures.append(f"残留票据 {leftovers}")
+    for line in failures:
+        print("失败：", line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+激活对话框交互回放 · QTest / offscreen 平台
+
+    python benchmarks/flow_replay.py                       # 回放 scenarios/ 下全部场景
+    python benchmarks/flow_replay.py scenarios/wrong_then_right.json -o replay.json
+    python benchmarks/flow_replay.py --record my_flow.json   # 在真实窗口中操作并录制
+
+每一步记录“输入 → 界面反馈”的延迟（例如从回车到横幅出现），以及期间事件循环两次处理之间的最大间隔
+（界面线程被阻塞的时长）。非 wait 步骤的反馈延迟或任一步骤的最大间隔超过 --budget-ms 即视为卡顿，
+存在卡顿或反馈未出现时返回非零。场景中的步骤紧接着执行，不插入思考时间，冷启动时的耗时同样计入。
+
+场景文件格式：
+    {"name": "...", "steps": [{"action": "type", "text": "{wrong_code}", "expect": "enabled"}, ...]}
+action：type / clear / paste / click / key / wait（等待后台结果或模拟思考时间，反馈延迟不计入卡顿）
+target：ed_code / ed_mc / btn_copy / btn_paste / btn_ok / btn_cancel / eye
+expect：见 EXPECTATIONS；文本中的 {valid_code} / {wrong_code} / {machine_code} 在回放时替换。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Callable, Dict, List
+
+if "--record" not in sys.argv:
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import Qt, QEvent, QObject
+from PyQt6.QtGui import QClipboard
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication, QDialog, QLineEdit
+
+import ibase_launcher as launcher
+
+SCENARIO_DIR = Path(__file__).resolve().parent / "scenarios"
+SAMPLE_MACHINE_CODE = "87A3-2510-F767-1734"
+WRONG_CODE = "0123-4567-89AB-CDEF"
+FEEDBACK_TIMEOUT = 3.0
+
+TARGETS: Dict[str, Callable[[launcher.ActivateDialog], object]] = {
+    "ed_code": lambda d: d.ed_code,
+    "ed_mc": lambda d: d.ed_mc,
+    "btn_copy": lambda d: d.btn_copy,
+    "btn_paste": lambda d: d.btn_paste,
+    "btn_ok": lambda d: d.btn_ok,
+    "btn_cancel": lambda d: d.btn_cancel,
+    "eye": lambda d: d.ed_code._eye,
+}
+
+EXPECTATIONS: Dict[str, Callable[[launcher.ActivateDialog, dict], bool]] = {
+    "banner": lambda d, s: d.banner.isVisible(),
+    "banner_error": lambda d, s: d.banner.isVisible() and d.banner._tone is False,
+    "banner_ok": lambda d, s: d.banner.isVisible() and d.banner._tone is True,
+    "banner_hidden": lambda d, s: not d.banner.isVisible(),
+    "popup": lambda d, s: d.copy_popup.isVisible(),
+    "clipboard_mc": lambda d, s: QApplication.clipboard().text() == d.mc_display,
+    "text": lambda d, s: d.ed_code.text() == s.get("text", ""),
+    "masked": lambda d, s: d.ed_code.echoMode() == QLineEdit.EchoMode.Password,
+    "unmasked": lambda d, s: d.ed_code.echoMode() == QLineEdit.EchoMode.Normal,
+    "enabled": lambda d, s: d.btn_ok.isEnabled(),
+    "disabled": lambda d, s: not d.btn_ok.isEnabled(),
+    "accepted": lambda d, s: d.result() == QDialog.DialogCode.Accepted,
+    "rejected": lambda d, s: d.result() == QDialog.DialogCode.Rejected and not d.isVisible(),
+}
+
+
+def _substitute(value, variables: Dict[str, str]):
+    if isinstance(value, str):
+        for key, repl in variables.items():
+            value = value.replace("{" + key + "}", repl)
+    return value
+
+
+def _perform(app: QApplication, dlg: launcher.ActivateDialog, step: dict):
+    action = step["action"]
+    target = TARGETS[step.get("target", "ed_code")](dlg)
+    if action == "type":
+        QTest.keyClicks(target, step["text"])
+    elif action == "clear":
+        target.clear()
+    elif action == "paste":
+        QApplication.clipboard().setText(step["text"], QClipboard.Mode.Clipboard)
+        QTest.mouseClick(dlg.btn_paste, Qt.MouseButton.LeftButton)
+    elif action == "click":
+        QTest.mouseClick(target, Qt.MouseButton.LeftButton)
+    elif action == "key":
+        QTest.keyClick(target, getattr(Qt.Key, f"Key_{step['key']}"))
+    elif action != "wait":
+        raise ValueError(f"未知动作：{action}")
+
+
+def _pump(app: QApplication, until: float, done: Callable[[], bool], last: float) -> tuple:
+    """处理事件直到 done() 成立或超过 until；返回 (是否成立, 最大事件循环间隔)。"""
+    gap = 0.0
+    while True:
+        if done():
+            return True, gap
+        now = time.perf_counter()
+        gap = max(gap, now - last)
+        if now >= until:
+            return False, gap
+        app.processEvents()
+        last = time.perf_counter()
+
+
+def run_step(app: QApplication, dlg: launcher.ActivateDialog, step: dict) -> dict:
+    expect = step.get("expect")
+    check = EXPECTATIONS[expect] if expect else None
+    start = time.perf_counter()
+    _perform(app, dlg, step)
+    handled = time.perf_counter()
+    # 输入处理本身在界面线程上同步执行，同样算作一次阻塞
+    gap = handled - start
+    if step["action"] == "wait":
+        _ok, wait_gap = _pump(app, start + step.get("ms", 0) / 1000.0, lambda: False, handled)
+        gap = max(gap, wait_gap)
+        handled = time.perf_counter()
+    ok = True
+    if check is not None:
+        ok, wait_gap = _pump(app, handled + step.get("timeout", FEEDBACK_TIMEOUT),
+                             lambda: check(dlg, step), handled)
+        gap = max(gap, wait_gap)
+    feedback = time.perf_counter()
+    return {
+        "action": step["action"],
+        "target": step.get("target"),
+        "expect": expect,
+        "ok": ok,
+        # 输入处理本身（同步执行）的耗时，与输入到反馈出现的总延迟
+        "handler_ms": round((handled - start) * 1000.0, 3),
+        "latency_ms": round((feedback - start) * 1000.0, 3),
+        "max_gap_ms": round(gap * 1000.0, 3),
+    }
+
+
+def run_scenario(app: QApplication, scenario: dict, budget_ms: float) -> dict:
+    mc = launcher._sanitize_machine_code(scenario.get("machine_code", SAMPLE_MACHINE_CODE))
+    variables = {
+        "machine_code": launcher.format_machine_code(mc),
+        "valid_code": launcher.format_activation_code(launcher.calc_activation_code_v3(mc)),
+        "wrong_code": WRONG_CODE,
+    }
+    # 每个场景都从冷状态开始，与新启动的进程一致
+    launcher.reset_date_code_cache()
+    if scenario.get("warm", True):
+        # 与启动流程一致：弹出激活窗前在后台预热 v2 日期表
+        launcher.warm_date_code_cache(mc)
+    dlg = launcher.ActivateDialog(mc)
+    dlg.show()
+    app.processEvents()
+    steps = []
+    for raw in scenario["steps"]:
+        step = {k: _substitute(v, variables) for k, v in raw.items()}
+        result = run_step(app, dlg, step)
+        result["stall"] = (result["latency_ms"] > budget_ms and step["action"] != "wait") \
+            or result["max_gap_ms"] > budget_ms
+        steps.append(result)
+    dlg.close()
+    dlg.deleteLater()
+    app.processEvents()
+    return {
+        "name": scenario.get("name", "unnamed"),
+        "ok": all(s["ok"] and not s["stall"] for s in steps),
+        "max_latency_ms": max((s["latency_ms"] for s in steps if s["action"] != "wait"), default=0.0),
+        "max_gap_ms": max((s["max_gap_ms"] for s in steps), default=0.0),
+        "steps": steps,
+    }
+
+
+class Recorder(QObject):
+    """在真实窗口中录制操作：点击已知控件、在激活码框中输入文本与按键。"""
+
+    def __init__(self, dlg: launcher.ActivateDialog):
+        super().__init__()
+        self.dlg = dlg
+        self.steps: List[dict] = []
+        self._names = {id(fn(dlg)): name for name, fn in TARGETS.items()}
+
+    def eventFilter(self, obj, event):
+        name = self._names.get(id(obj))
+        if name is None:
+            return False
+        if event.type() == QEvent.Type.MouseButtonRelease and name not in ("ed_code", "ed_mc"):
+            if name == "btn_paste":
+                self.steps.append({"action": "paste", "text": QApplication.clipboard().text(), "expect": "text"})
+            else:
+                self.steps.append({"action": "click", "target": name})
+        elif event.type() == QEvent.Type.KeyPress and name == "ed_code":
+            if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+                self.steps.append({"action": "key", "target": "ed_code", "key": "Return"})
+            elif event.text() and event.text().isprintable():
+                if self.steps and self.steps[-1]["action"] == "type":
+                    self.steps[-1]["text"] += event.text()
+                else:
+                    self.steps.append({"action": "type", "target": "ed_code", "text": event.text()})
+        return False
+
+
+def record(path: str, mc: str) -> int:
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    launcher.Theme.apply(app, launcher.RenderProfile.detect({}))
+    dlg = launcher.ActivateDialog(mc)
+    recorder = Recorder(dlg)
+    app.installEventFilter(recorder)
+    dlg.exec()
+    app.removeEventFilter(recorder)
+    scenario = {"name": Path(path).stem, "machine_code": launcher.format_machine_code(mc), "steps": recorder.steps}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(scenario, f, ensure_ascii=False, indent=2)
+    print(f"已录制 {len(recorder.steps)} 步：{path}（可手动补充 expect 字段）")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="flow_replay", description="激活对话框交互回放")
+    parser.add_argument("scenarios", nargs="*", help=f"场景文件，缺省为 {SCENARIO_DIR.name}/ 下全部")
+    parser.add_argument("-o", "--output", help="结果 JSON 路径")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="单步输入到反馈的延迟上限")
+    parser.add_argument("--profile", choices=("auto", "full", "lite"), default="full", help="渲染档位")
+    parser.add_argument("--record", metavar="PATH", help="打开真实窗口录制操作并写入场景文件")
+    parser.add_argument("--machine-code", default=SAMPLE_MACHINE_CODE, help="录制时使用的机器码")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        return record(args.record, args.machine_code)
+
+    paths = [Path(p) for p in args.scenarios] or sorted(SCENARIO_DIR.glob("*.json"))
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    profile = launcher.RenderProfile(args.profile, "replay") if args.profile != "auto" \
+        else launcher.RenderProfile.detect({})
+    launcher.Theme.apply(app, profile)
+
+    results = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+        result = run_scenario(app, scenario, args.budget_ms)
+        results.append(result)
+        print(f"{'通过' if result['ok'] else '失败'}  {result['name']:<28} 最大延迟 {result['max_latency_ms']:.1f} ms"
+              f"  最长阻塞 {result['max_gap_ms']:.1f} ms")
+        for i, step in enumerate(result["steps"], 1):
+            flag = "" if step["ok"] and not step["stall"] else ("  ← 卡顿" if step["ok"] else "  ← 未出现反馈")
+            print(f"    {i:>2}. {step['action']:<6} {step['target'] or '':<10} {step['expect'] or '':<14}"
+                  f"{step['latency_ms']:>9.2f} ms{step['max_gap_ms']:>9.2f} ms{flag}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"budget_ms": args.budget_ms, "render_profile": profile.describe(), "scenarios": results},
+                      f, ensure_ascii=False, indent=2)
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+iBase 启动器界面性能基准 · offscreen 平台
+
+    python benchmarks/gui_bench.py -o gui_bench.json
+    python benchmarks/gui_bench.py --compare baseline.json --threshold 1.25
+
+测量对话框与主题的构建耗时、首帧时间、动画稳态重绘开销与空闲 CPU、
+横幅与居中提示的显示开销，结果写为 JSON；指定 --compare 时与基线比较，超出阈值返回非零。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import QAbstractAnimation, QCoreApplication, QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+
+import ibase_launcher as launcher
+
+SAMPLE_MACHINE_CODE = "87A3-2510-F767-1734"
+
+
+def _summary(samples: List[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "median_ms": round(statistics.median(ordered) * 1000.0, 3),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))] * 1000.0, 3),
+        "min_ms": round(ordered[0] * 1000.0, 3),
+    }
+
+
+def _repeat(fn: Callable[[], object], runs: int, cleanup: Callable[[object], None] = None) -> dict:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        obj = fn()
+        samples.append(time.perf_counter() - start)
+        if cleanup is not None:
+            cleanup(obj)
+    return _summary(samples)
+
+
+def _dispose(widget):
+    """停止窗口及其子控件的定时器与动画并立即销毁，避免残留对象在后续测量中继续重绘、占用 CPU。"""
+    for timer in widget.findChildren(QTimer):
+        timer.stop()
+    for anim in widget.findChildren(QAbstractAnimation):
+        anim.stop()
+    widget.hide()
+    widget.deleteLater()
+    # processEvents 不投递 DeferredDelete，须显式发送
+    QCoreApplication.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def _spin(app: QApplication, seconds: float):
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+
+
+class _FirstPaint(QObject):
+    def __init__(self):
+        super().__init__()
+        self.at = None
+
+    def eventFilter(self, obj, event):
+        if self.at is None and event.type() == QEvent.Type.Paint:
+            self.at = time.perf_counter()
+        return False
+
+
+class _PaintMeter:
+    """包装 paintEvent，统计动画控件的帧数与绘制耗时。"""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.frames = 0
+        self.seconds = 0.0
+        self._orig = cls.paintEvent
+
+    def __enter__(self):
+        meter, orig = self, self._orig
+
+        def paintEvent(widget, event):
+            start = time.perf_counter()
+            orig(widget, event)
+            meter.seconds += time.perf_counter() - start
+            meter.frames += 1
+
+        self.cls.paintEvent = paintEvent
+        return self
+
+    def __exit__(self, *exc):
+        self.cls.paintEvent = self._orig
+
+    def result(self, wall: float) -> dict:
+        return {
+            "frames": self.frames,
+            "fps": round(self.frames / wall, 2) if wall else 0.0,
+            "paint_ms_per_frame": round(self.seconds / self.frames * 1000.0, 4) if self.frames else 0.0,
+            "paint_ms_per_s": round(self.seconds / wall * 1000.0, 3) if wall else 0.0,
+        }
+
+
+def bench_construction(app: QApplication, runs: int) -> dict:
+    return {
+        "theme_apply": _repeat(lambda: launcher.Theme.apply(app, launcher.Theme.profile), runs),
+        "activate_dialog": _repeat(lambda: launcher.ActivateDialog(SAMPLE_MACHINE_CODE), runs, _dispose),
+        "loading_dialog": _repeat(launcher.LoadingDialog, runs, _dispose),
+    }
+
+
+def bench_first_paint(app: QApplication, runs: int) -> dict:
+    results = {}
+    for name, factory in (("activate_dialog", lambda: launcher.ActivateDialog(SAMPLE_MACHINE_CODE)),
+                          ("loading_dialog", launcher.LoadingDialog)):
+        samples = []
+        for _ in range(runs):
+            probe = _FirstPaint()
+            start = time.perf_counter()
+            dlg = factory()
+            dlg.installEventFilter(probe)
+            dlg.show()
+            deadline = start + 5.0
+            while probe.at is None and time.perf_counter() < deadline:
+                app.processEvents()
+            samples.append((probe.at or time.perf_counter()) - start)
+            dlg.removeEventFilter(probe)
+            _dispose(dlg)
+        results[name] = _summary(samples)
+    return results
+
+
+def bench_steady_state(app: QApplication, seconds: float) -> dict:
+    dlg = launcher.ActivateDialog(SAMPLE_MACHINE_CODE)
+    loader = launcher.LoadingDialog()
+    dlg.show()
+    loader.show()
+    app.processEvents()
+    with _PaintMeter(launcher.AnimatedBar) as bar, _PaintMeter(launcher.SpinnerWidget) as spinner:
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        _spin(app, seconds)
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+    repaint = _repeat(dlg.grab, 50)
+    _dispose(loader)
+    _dispose(dlg)
+    return {
+        "seconds": round(wall, 3),
+        "idle_cpu_percent": round(cpu / wall * 100.0, 2) if wall else 0.0,
+        "animated_bar": bar.result(wall),
+        "spinner": spinner.result(wall),
+        "dialog_repaint": repaint,
+    }
+
+
+def bench_feedback(app: QApplication, cycles: int) -> dict:
+    dlg = launcher.ActivateDialog(SAMPLE_MACHINE_CODE)
+    dlg.show()
+    app.processEvents()
+
+    def banner_cycle():
+        dlg.banner.show_msg("激活码不正确，请核对后再试。", ok=False, duration_ms=4000)
+        app.processEvents()
+        dlg.banner.hide()
+        app.processEvents()
+
+    def popup():
+        dlg.copy_popup.show_message("机器码已复制", duration=3000)
+        app.processEvents()
+
+    result = {
+        "banner_show_hide": _repeat(banner_cycle, cycles),
+        "center_popup_show": _repeat(popup, cycles),
+    }
+    _dispose(dlg)
+    return result
+
+
+def run(args) -> dict:
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    profile = launcher.RenderProfile(args.profile, "bench") if args.profile != "auto" \
+        else launcher.RenderProfile.detect({})
+    launcher.Theme.apply(app, profile)
+    return {
+        "meta": {
+            "timestamp": int(time.time()),
+            "platform": os.environ.get("QT_QPA_PLATFORM"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "render_profile": profile.describe(),
+        },
+        "construction": bench_construction(app, args.runs),
+        "first_paint": bench_first_paint(app, args.runs),
+        "steady_state": bench_steady_state(app, args.seconds),
+        "feedback": bench_feedback(app, args.cycles),
+    }
+
+
+def _flatten(data, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and (key.endswith("_ms") or key.endswith("_percent")
+                                                  or key.endswith("_per_frame") or key.endswith("_per_s")):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(current: dict, baseline: dict, threshold: float, floor_ms: float = 0.05) -> List[str]:
+    """返回超出阈值的指标；仅比较中位数、单帧与 CPU 等“越小越好”的数值。"""
+    cur, base = _flatten(current), _flatten(baseline)
+    regressions = []
+    for key, old in base.items():
+        if key.startswith("meta.") or key.endswith(("min_ms", "p90_ms")) or key not in cur:
+            continue
+        new = cur[key]
+        if max(old, new) < floor_ms:
+            continue
+        if old > 0 and new / old > threshold:
+            regressions.append(f"{key}: {old:g} -> {new:g} (x{new / old:.2f})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="gui_bench", description="iBase 启动器界面性能基准")
+    parser.add_argument("-o", "--output", default="gui_bench.json", help="结果 JSON 路径")
+    parser.add_argument("--runs", type=int, default=10, help="构建与首帧测量次数")
+    parser.add_argument("--seconds", type=float, default=3.0, help="稳态重绘与空闲 CPU 采样时长")
+    parser.add_argument("--cycles", type=int, default=50, help="横幅 / 提示显示次数")
+    parser.add_argument("--profile", choices=("auto", "full", "lite"), default="full", help="渲染档位")
+    parser.add_argument("--compare", metavar="BASELINE", help="与基线 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=1.25, help="回归判定倍数")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print("回归：", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
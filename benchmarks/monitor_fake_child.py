@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+子进程监控 · 假子进程验证与采样文件查看
+
+    python benchmarks/monitor_fake_child.py --seconds 5 --interval-ms 200
+    python benchmarks/monitor_fake_child.py --dump %APPDATA%/iBaseWrapper/logs/ibase_samples.bin
+
+启动一个会逐步占用内存、开启线程、写临时文件并消耗 CPU 的假子进程，用 ProcessMonitor 采样，
+检查环形文件中的 CPU、内存、线程与 I/O 数值是否随之增长，并给出每次采样的开销。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ibase_launcher as launcher
+
+FAKE_CHILD = r"""
+import sys, time, threading, tempfile
+seconds = float(sys.argv[1])
+hold, threads = [], []
+stop = threading.Event()
+deadline = time.time() + seconds
+with tempfile.TemporaryFile() as f:
+    step = 0
+    while time.time() < deadline:
+        hold.append(bytearray(4 << 20))
+        if len(threads) < 8:
+            t = threading.Thread(target=stop.wait, daemon=True)
+            t.start()
+            threads.append(t)
+        f.write(b"x" * (1 << 20))
+        f.flush()
+        end = time.time() + 0.1
+        while time.time() < end:
+            step += 1
+        time.sleep(0.1)
+stop.set()
+"""
+
+
+def _print_samples(samples):
+    print(f"{'时间':>12} {'pid':>7} {'线程':>4} {'CPU s':>8} {'RSS MB':>8} {'读 MB':>8} {'写 MB':>8} {'整机%':>6}")
+    for s in samples:
+        print(f"{time.strftime('%H:%M:%S', time.localtime(s['ts'])):>12} {s['pid']:>7} {s['threads']:>4} "
+              f"{s['cpu_user_s'] + s['cpu_system_s']:>8.2f} {s['rss_bytes'] / (1 << 20):>8.1f} "
+              f"{s['read_bytes'] / (1 << 20):>8.1f} {s['write_bytes'] / (1 << 20):>8.1f} "
+              f"{s['host_cpu_percent']:>6.1f}")
+
+
+def run_fake_child(seconds: float, interval_ms: int, slots: int) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "samples.bin"
+        proc = subprocess.Popen([sys.executable, "-c", FAKE_CHILD, str(seconds)])
+        monitor = launcher.ProcessMonitor(proc.pid, interval_ms, slots, path, process=proc).start()
+        if not monitor.wait(seconds + 10):
+            monitor.stop()
+        samples = launcher.read_monitor_samples(path)
+    _print_samples(samples)
+    summary = monitor.summary()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    failures = []
+    if len(samples) < 2:
+        failures.append("采样条数不足")
+    else:
+        first, last = samples[0], samples[-1]
+        if last["rss_bytes"] <= first["rss_bytes"]:
+            failures.append("常驻内存没有增长")
+        if last["cpu_user_s"] + last["cpu_system_s"] <= first["cpu_user_s"] + first["cpu_system_s"]:
+            failures.append("CPU 时间没有增长")
+        if last["write_bytes"] <= first["write_bytes"]:
+            failures.append("写字节数没有增长")
+        if summary["peak_threads"] < 2:
+            failures.append("线程数未采到")
+        if len(samples) > slots:
+            failures.append("环形文件超出槽位数")
+    for line in failures:
+        print("失败：", line)
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="monitor_fake_child", description="子进程监控验证与采样文件查看")
+    parser.add_argument("--seconds", type=float, default=3.0, help="假子进程运行时长")
+    parser.add_argument("--interval-ms", type=int, default=200, help="采样间隔")
+    parser.add_argument("--slots", type=int, default=64, help="环形文件槽位数")
+    parser.add_argument("--dump", metavar="PATH", help="只打印已有采样文件的内容")
+    args = parser.parse_args(argv)
+    if args.dump:
+        _print_samples(launcher.read_monitor_samples(Path(os.path.expandvars(args.dump))))
+        return 0
+    return run_fake_child(args.seconds, args.interval_ms, args.slots)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+调度设置验证 · Linux 替身子进程
+
+    python benchmarks/scheduling_check.py
+    python benchmarks/scheduling_check.py --priority 15 --affinity 0 --io-priority idle
+
+用一个启动后立即创建若干线程的脚本替代 iBase.exe，经 start_ibase_exe 启动，
+逐线程读取 /proc 中的 nice 值、CPU 亲和性与 I/O 优先级，检查与配置（含 bind 覆盖及重新绑定后保留的覆盖）一致。
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ibase_launcher as launcher
+
+STAND_IN = """#!{python}
+import threading, time
+stop = threading.Event()
+for _ in range(4):
+    threading.Thread(target=stop.wait, daemon=True).start()
+time.sleep({seconds})
+"""
+
+
+def _thread_state(pid: int) -> dict:
+    state = {}
+    for tid in sorted(int(t) for t in os.listdir(f"/proc/{pid}/task")):
+        with open(f"/proc/{pid}/task/{tid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        value = launcher._ioprio_syscall(1, tid)
+        names = {v: k for k, v in launcher.IO_PRIORITY_LINUX.items()}
+        state[tid] = {
+            "nice": int(fields[16]),
+            "affinity": sorted(os.sched_getaffinity(tid)),
+            "io_priority": names.get((value >> 13, value & 0x1FFF), "normal" if value >> 13 == 0 else value),
+        }
+    return state
+
+
+def run_case(name: str, cfg: dict, expect: dict, seconds: float = 2.0) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        exe = Path(tmp) / "iBase.exe"
+        exe.write_text(STAND_IN.format(python=sys.executable, seconds=seconds), encoding="utf-8")
+        exe.chmod(0o755)
+        launcher.IBASE_EXE_PATH = exe
+        info: dict = {}
+        cfg = dict(cfg, integrity={"mode": "off"})
+        if launcher.start_ibase_exe(info, cfg) != 0:
+            print(f"[{name}] 启动失败")
+            return False
+        # 等替身进程的线程全部创建后再读取，确认创建后才出现的线程同样继承设置
+        time.sleep(0.3)
+        threads = _thread_state(info["pid"])
+        info["process"].kill()
+        info["process"].wait()
+    report = info.get("scheduling") or {}
+    print(f"[{name}] 报告：{json.dumps(report, ensure_ascii=False)}")
+    failures = []
+    if len(threads) < 2:
+        failures.append(f"只有 {len(threads)} 个线程")
+    for tid, state in threads.items():
+        for key, want in expect.items():
+            if state[key] != want:
+                failures.append(f"线程 {tid} 的 {key} 为 {state[key]}，期望 {want}")
+    for key, want in expect.items():
+        if report.get("effective", {}).get(key) != want:
+            failures.append(f"报告的 {key} 为 {report.get('effective', {}).get(key)}，期望 {want}")
+    for line in failures:
+        print(f"[{name}] 失败：", line)
+    if not failures:
+        print(f"[{name}] 通过（{len(threads)} 个线程）")
+    return not failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="scheduling_check", description="调度设置验证（Linux）")
+    parser.add_argument("--priority", default="below_normal", help="优先级名称或 nice 值")
+    parser.add_argument("--affinity", default="0", help="CPU 亲和性，如 0-1 或 0x3")
+    parser.add_argument("--io-priority", default="low", choices=sorted(launcher.IO_PRIORITY_LINUX))
+    args = parser.parse_args(argv)
+    if not sys.platform.startswith("linux"):
+        print("仅支持 Linux")
+        return 2
+
+    priority = int(args.priority) if args.priority.lstrip("-").isdigit() else args.priority
+    policy = launcher.SchedulingPolicy({"priority": priority, "affinity": args.affinity,
+                                        "io_priority": args.io_priority})
+    # 不可用的 CPU 会被剔除并记入 errors
+    usable = [c for c in policy.cpus if c in os.sched_getaffinity(0)] or sorted(os.sched_getaffinity(0))
+    expect = {"nice": policy.nice, "affinity": usable, "io_priority": policy.io_priority}
+    scheduling = {"priority": priority, "affinity": args.affinity, "io_priority": args.io_priority}
+
+    ok = run_case("全局", {"scheduling": scheduling}, expect)
+    # bind 中的设置覆盖全局同名项，未写的项沿用全局
+    ok &= run_case("绑定覆盖", {"scheduling": scheduling, "bind": {"scheduling": {"io_priority": "idle"}}},
+                   dict(expect, io_priority="idle"))
+    # 激活窗或授权包写入新绑定后，管理员写在 bind 中的覆盖项仍然有效
+    cfg = {"scheduling": scheduling, "bind": {"machine_code": "0" * 16, "scheduling": {"io_priority": "idle"}}}
+    launcher._store_binding(cfg, launcher.MachineCode.of("87A32510F7671734"), "30FFFFF9765897A5", None)
+    ok &= run_case("重新绑定后", cfg, dict(expect, io_priority="idle"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
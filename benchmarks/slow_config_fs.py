@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+配置目录本地镜像 · 慢速文件系统模拟
+
+    python benchmarks/slow_config_fs.py --latency-ms 40 --runs 5
+
+把临时目录当作“漫游配置目录”，对其中路径的 open / stat / replace / mkdir / unlink 逐次注入延迟，
+模拟重定向到 SMB 共享的 %APPDATA%。分别测量直接读写与经本地镜像读写时，启动路径上
+读取配置、完整性缓存、预读清单并保存配置的耗时；另验证镜像的开启条件、后台校验刷新、冲突副本（含基于旧副本的保存）、同机多个启动器的并发写回与退出前写回。
+"""
+import os
+import sys
+import json
+import time
+import builtins
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ibase_launcher as launcher
+
+
+class SlowFS:
+    """对 root 之下的路径操作注入固定延迟。"""
+
+    PATCHED = (("builtins", "open"), ("os", "stat"), ("os", "replace"), ("os", "mkdir"), ("os", "unlink"))
+
+    def __init__(self, root: Path, latency_ms: float):
+        self.root = os.path.normcase(str(root))
+        self.latency = latency_ms / 1000.0
+        self.calls = 0
+        self._saved = []
+
+    def _slow(self, path) -> bool:
+        try:
+            return os.path.normcase(os.fspath(path)).startswith(self.root)
+        except TypeError:
+            return False
+
+    def __enter__(self):
+        for module_name, attr in self.PATCHED:
+            module = builtins if module_name == "builtins" else os
+            orig = getattr(module, attr)
+            self._saved.append((module, attr, orig))
+
+            def wrapper(*args, __orig=orig, **kwargs):
+                if any(self._slow(a) for a in args[:2] if isinstance(a, (str, os.PathLike))):
+                    self.calls += 1
+                    time.sleep(self.latency)
+                return __orig(*args, **kwargs)
+
+            setattr(module, attr, wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        for module, attr, orig in reversed(self._saved):
+            setattr(module, attr, orig)
+        self._saved.clear()
+
+
+def _point_config_dir(remote: Path):
+    launcher.CONFIG_DIR = remote
+    launcher.CONFIG_PATH = remote / "config.json"
+    launcher.PREFETCH_MANIFEST_PATH = remote / "prefetch.json"
+    launcher.INTEGRITY_CACHE_PATH = remote / "integrity.json"
+
+
+def _new_process():
+    # 每次测量模拟一次新启动：丢弃进程内的镜像实例
+    launcher._CONFIG_MIRROR.clear()
+
+
+def _launch_io() -> float:
+    """启动路径上的配置访问：读配置、完整性缓存、预读清单，保存配置。"""
+    start = time.perf_counter()
+    cfg = launcher.load_config()
+    launcher.ExeIntegrity(cfg)._load_cache()
+    launcher._load_prefetch_manifest()
+    cfg["last_launch"] = time.time()
+    launcher.save_config(cfg)
+    return time.perf_counter() - start
+
+
+def _seed(remote: Path):
+    remote.mkdir(parents=True, exist_ok=True)
+    files = {
+        "config.json": {"activated": True, "bind": {"machine_code": "87A32510F7671734",
+                                                   "activation_code": "30FFFFF9765897A5", "expires_at": 4294967295}},
+        "prefetch.json": {"files": [f"lib{i}.dll" for i in range(40)]},
+        "integrity.json": {"path": "iBase.exe", "size": 1, "mtime_ns": 1, "inode": 1, "sha256": "0" * 64},
+    }
+    for name, data in files.items():
+        (remote / name).write_text(json.dumps(data), encoding="utf-8")
+
+
+def _ms(values):
+    return {"median_ms": round(statistics.median(values) * 1000.0, 2), "max_ms": round(max(values) * 1000.0, 2)}
+
+
+def run(args) -> dict:
+    report, failures = {}, []
+    with tempfile.TemporaryDirectory() as tmp:
+        remote, local = Path(tmp) / "roaming", Path(tmp) / "local"
+        _seed(remote)
+        _point_config_dir(remote)
+
+        # 镜像默认只在配置目录位于网络位置时开启
+        saved_env = {k: os.environ.pop(k, None) for k in (launcher.CONFIG_MIRROR_ENV, "LOCALAPPDATA")}
+        os.environ["LOCALAPPDATA"] = str(local)
+        enabled = {"local_dir": launcher._config_mirror_dir() is not None}
+        os.environ[launcher.CONFIG_MIRROR_ENV] = "on"
+        enabled["forced_on"] = launcher._config_mirror_dir() is not None
+        os.environ.pop(launcher.CONFIG_MIRROR_ENV)
+        launcher.CONFIG_DIR = Path("//fileserver/profiles/user/AppData/Roaming/iBase")
+        enabled["unc_dir"] = launcher._config_mirror_dir() is not None
+        _point_config_dir(remote)
+        for key, value in saved_env.items():
+            os.environ.pop(key, None)
+            if value is not None:
+                os.environ[key] = value
+        report["mirror_enabled"] = enabled
+        if enabled != {"local_dir": False, "forced_on": True, "unc_dir": True}:
+            failures.append(f"镜像开启条件不正确：{enabled}")
+        slow = SlowFS(remote, args.latency_ms)
+
+        os.environ[launcher.CONFIG_MIRROR_ENV] = "off"
+        with slow:
+            direct = []
+            for _ in range(args.runs):
+                _new_process()
+                direct.append(_launch_io())
+        report["direct"] = _ms(direct)
+
+        os.environ[launcher.CONFIG_MIRROR_ENV] = str(local)
+        with slow:
+            _new_process()
+            cold = _launch_io()
+            launcher.config_mirror().flush()
+            warm, flush = [], []
+            for _ in range(args.runs):
+                _new_process()
+                warm.append(_launch_io())
+                start = time.perf_counter()
+                launcher.config_mirror().flush()
+                flush.append(time.perf_counter() - start)
+        report["mirror_cold"] = _ms([cold])
+        report["mirror_warm"] = _ms(warm)
+        report["write_behind_flush"] = _ms(flush)
+        report["speedup"] = round(statistics.median(direct) / statistics.median(warm), 1)
+        remote_cfg = json.loads((remote / "config.json").read_text(encoding="utf-8"))
+        if remote_cfg.get("last_launch") != launcher.load_config().get("last_launch"):
+            failures.append("写回后远端配置与本地不一致")
+
+        # 其它机器修改了远端：本次读取仍用本地副本，后台校验后刷新
+        _new_process()
+        remote_cfg["render"] = "lite"
+        time.sleep(0.01)
+        (remote / "config.json").write_text(json.dumps(remote_cfg), encoding="utf-8")
+        launcher.load_config()
+        launcher.config_mirror().flush()
+        if launcher.load_config().get("render") != "lite":
+            failures.append("后台校验未刷新本地副本")
+
+        # 冲突：本机写入尚未写回时远端被改，写回时保留对方版本
+        _new_process()
+        mirror = launcher.config_mirror()
+        cfg = launcher.load_config()
+        mirror.flush()
+        remote_cfg["render"] = "full"
+        time.sleep(0.01)
+        (remote / "config.json").write_text(json.dumps(remote_cfg), encoding="utf-8")
+        cfg["mine"] = True
+        launcher.save_config(cfg)
+        mirror.flush()
+        conflicts = sorted(p.name for p in remote.glob("config.json.conflict-*"))
+        report["conflict_copies"] = conflicts
+        if mirror.conflicts != 1 or len(conflicts) != 1:
+            failures.append("冲突写回未保留对方版本")
+        elif json.loads((remote / conflicts[0]).read_text(encoding="utf-8")).get("render") != "full":
+            failures.append("冲突副本内容不正确")
+        if not json.loads((remote / "config.json").read_text(encoding="utf-8")).get("mine"):
+            failures.append("冲突后本机写入未生效")
+
+        # 镜像之后远端被改：本次启动读到的是旧副本，后台校验随即刷新副本；
+        # 基于旧内容的保存仍应判为冲突并保留对方版本，而不是静默覆盖
+        _new_process()
+        remote_cfg = json.loads((remote / "config.json").read_text(encoding="utf-8"))
+        remote_cfg["edited_elsewhere"] = True
+        time.sleep(0.01)
+        (remote / "config.json").write_text(json.dumps(remote_cfg), encoding="utf-8")
+        mirror = launcher.config_mirror()
+        stale = launcher.load_config()
+        mirror.flush()
+        # 直接查看本地副本，不再次读取（再次读取即表示已看到对方版本）
+        if not json.loads((local / "config.json").read_text(encoding="utf-8")).get("edited_elsewhere"):
+            failures.append("后台校验未刷新被远端修改的副本")
+        stale["saved_from_stale"] = True
+        launcher.save_config(stale)
+        mirror.flush()
+        copies = [p for p in remote.glob("config.json.conflict-*") if p.name not in conflicts]
+        report["stale_save_conflicts"] = mirror.conflicts
+        if mirror.conflicts != 1 or len(copies) != 1:
+            failures.append("基于旧副本的保存覆盖了远端修改且未报告冲突")
+        elif not json.loads(copies[0].read_text(encoding="utf-8")).get("edited_elsewhere"):
+            failures.append("旧副本冲突的备份内容不正确")
+
+        # 同机两个启动器共用镜像目录：先后写回同一文件不应判为冲突，也不应丢失后写入的内容
+        _new_process()
+        first, second = launcher.ConfigMirror(remote, local), launcher.ConfigMirror(remote, local)
+        first.read("config.json")
+        second.read("config.json")
+        first.flush()
+        second.flush()
+        first.write("config.json", json.dumps({"writer": "first"}).encode("utf-8"))
+        first.flush()
+        second.write("config.json", json.dumps({"writer": "second"}).encode("utf-8"))
+        second.flush()
+        first.write("config.json", json.dumps({"writer": "third"}).encode("utf-8"))
+        second.write("config.json", json.dumps({"writer": "fourth"}).encode("utf-8"))
+        first.flush()
+        second.flush()
+        report["concurrent_conflicts"] = first.conflicts + second.conflicts
+        if first.conflicts or second.conflicts:
+            failures.append("同机并发启动器的先后写回被误判为冲突")
+        if json.loads((remote / "config.json").read_text(encoding="utf-8")).get("writer") != "fourth":
+            failures.append("同机并发写回丢失了最后一次写入")
+        if json.loads((local / launcher.CONFIG_MIRROR_META).read_text(encoding="utf-8"))["files"]["config.json"]["dirty"]:
+            failures.append("并发写回完成后 mirror.json 仍标记为待写回")
+        report["slow_ops"] = slow.calls
+    os.environ.pop(launcher.CONFIG_MIRROR_ENV, None)
+    report["failures"] = failures
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="slow_config_fs", description="配置目录本地镜像的慢速文件系统验证")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="每次远端文件操作的注入延迟")
+    parser.add_argument("--runs", type=int, default=5, help="每种方式的测量次数")
+    args = parser.parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    for line in report["failures"]:
+        print("失败：", line)
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+界面卡顿监测验证 · offscreen 平台
+
+    python benchmarks/stall_watchdog_check.py
+    python benchmarks/stall_watchdog_check.py --threshold-ms 100 --keep stalls.log
+
+在事件循环里依次执行一次纯 Python 计算阻塞、一次 sleep 阻塞和一次低于阈值的短阻塞，
+检查 StallWatchdog 只报告前两次、时长接近实际、调用栈落在阻塞函数上，长时间卡顿先写 hang 记录；
+另测量开启监测时空闲事件循环的 CPU 占用。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+import ibase_launcher as launcher
+
+
+def busy_block(seconds: float):
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+def sleep_block(seconds: float):
+    time.sleep(seconds)
+
+
+def _spin(app: QApplication, seconds: float):
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+
+
+def run(args) -> int:
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "stalls.log"
+        # 缩短 hang 判定，使 busy_block 同时产生一条 hang 记录
+        launcher.WATCHDOG_HANG_SECONDS = args.busy_ms / 1000.0 * 0.6
+        watchdog = launcher.StallWatchdog(args.threshold_ms, args.interval_ms, path).start()
+
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        _spin(app, args.idle_s)
+        idle_cpu = (time.process_time() - cpu0) / (time.perf_counter() - wall0) * 100.0
+
+        short_ms = args.threshold_ms * 0.4
+        for fn, ms in ((busy_block, args.busy_ms), (sleep_block, args.sleep_ms), (busy_block, short_ms)):
+            QTimer.singleShot(0, lambda fn=fn, ms=ms: fn(ms / 1000.0))
+            _spin(app, 0.3)
+        summary = watchdog.stop()
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        if args.keep:
+            shutil.copyfile(path, args.keep)
+
+    stalls = [r for r in records if r["event"] == "stall"]
+    hangs = [r for r in records if r["event"] == "hang"]
+    print(json.dumps({"summary": summary, "idle_cpu_percent": round(idle_cpu, 2),
+                      "stalls": [{"duration_ms": r["duration_ms"], "samples": r["samples"],
+                                  "top": r["stacks"][0]["frames"][-1]} for r in stalls],
+                      "hangs": len(hangs)}, ensure_ascii=False, indent=2))
+
+    if len(stalls) != 2 or summary["stalls"] != 2:
+        failures.append(f"应报告 2 次卡顿，实际 {len(stalls)} 次（低于阈值的短阻塞不应计入）")
+    for record, (name, ms) in zip(stalls, (("busy_block", args.busy_ms), ("sleep_block", args.sleep_ms))):
+        if not any(name in frame for frame in record["stacks"][0]["frames"][-2:]):
+            failures.append(f"{name} 的调用栈未落在阻塞函数上：{record['stacks'][0]['frames'][-2:]}")
+        if not ms * 0.9 <= record["duration_ms"] <= ms + args.interval_ms * 3 + 50:
+            failures.append(f"{name} 的卡顿时长 {record['duration_ms']} ms 与实际 {ms} ms 相差过大")
+    if len(hangs) != 1:
+        failures.append(f"应写 1 条 hang 记录，实际 {len(hangs)} 条")
+    if summary["worst_at"] is None or "busy_block" not in summary["worst_at"]:
+        failures.append(f"摘要中最长卡顿位置不正确：{summary['worst_at']}")
+    for line in failures:
+        print("失败：", line)
+    return 1 if failures else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="stall_watchdog_check", description="界面卡顿监测验证")
+    parser.add_argument("--threshold-ms", type=int, default=200, help="卡顿判定阈值")
+    parser.add_argument("--interval-ms", type=int, default=50, help="心跳间隔")
+    parser.add_argument("--busy-ms", type=int, default=800, help="纯 Python 计算阻塞时长")
+    parser.add_argument("--sleep-ms", type=int, default=400, help="sleep 阻塞时长")
+    parser.add_argument("--idle-s", type=float, default=2.0, help="空闲 CPU 采样时长")
+    parser.add_argument("--keep", metavar="PATH", help="保留生成的 stalls.log")
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
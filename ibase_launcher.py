@@ -3,25 +3,42 @@
 iBase.exe 启动包装器 · PyQt6
 """
 import os
+import re
 import sys
 import json
+import mmap
 import time
+import struct
+import queue
+import logging
+import logging.handlers
 import uuid
+import hmac
 import hashlib
 import platform
+import threading
+import traceback
+import contextlib
 import subprocess
 import datetime as dt
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# 进程起点：在导入 PyQt6 之前记录，用于统计首帧时间
+_PROCESS_T0 = time.perf_counter()
 
 from PyQt6.QtCore import (
     Qt, QTimer, QPoint, QPointF, QRectF, QPropertyAnimation, QEasingCurve, QProcess,
-    QSize, QEvent, pyqtSignal, QVariantAnimation
+    QSize, QEvent, QEventLoop, pyqtSignal, QVariantAnimation
 )
 from PyQt6.QtGui import (
     QFont, QFontDatabase, QPalette, QColor, QClipboard,
     QPainter, QPainterPath, QLinearGradient, QRegion, QIcon, QPixmap, QPen,
-    QRadialGradient, QGuiApplication
+    QRadialGradient, QGuiApplication, QKeySequence
 )
 from PyQt6.QtWidgets import (
     QApplication, QDialog, QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout,
@@ -33,6 +50,9 @@ from PyQt6.QtWidgets import (
 APP_NAME   = "iBaseWrapper"
 CONFIG_DIR = Path(os.getenv("APPDATA", str(Path.home()))) / APP_NAME
 CONFIG_PATH= CONFIG_DIR / "config.json"
+LOG_DIR    = CONFIG_DIR / "logs"
+
+log = logging.getLogger(APP_NAME)
 
 def base_dir() -> Path:
     if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
@@ -44,6 +64,13 @@ IBASE_EXE_PATH = base_dir() / "iBase.exe"
 # !!! 将此密钥替换为你的私钥（至少 32 字符）
 SECRET_KEY  = "REPLACE_WITH_YOUR_SECRET_32_CHARS_MIN"
 
+# 密钥环：编号 0–15。v3 激活码的第 2 位记录签发所用的密钥编号，校验时直接选取，不逐个尝试；
+# v1 / v2 激活码没有编号，始终使用 0 号（即 SECRET_KEY）。
+# 轮换时新增一个编号并把 ACTIVE_KEY_ID 指向它；旧编号保留在环中，已签发的激活码继续有效。
+LEGACY_KEY_ID = 0
+SECRET_KEYS: Dict[int, str] = {LEGACY_KEY_ID: SECRET_KEY}
+ACTIVE_KEY_ID = LEGACY_KEY_ID
+
 # ======================= 机器码 / 激活码 =======================
 MACHINE_CODE_LENGTH = 16
 ACTIVATION_CODE_LENGTH = 16
@@ -53,7 +80,32 @@ HEX_DIGITS = "0123456789ABCDEF"
 PERMANENT_EXPIRY_SENTINEL = 0xFFFFFFFF
 DATE_RANGE_MIN = dt.date(1980, 1, 1)
 DATE_RANGE_MAX = dt.date(2300, 12, 31)
-_DATE_CODE_CACHE: Dict[str, Dict[str, int]] = {}
+
+# v3：版本(1) + 密钥编号(1) + 到期天数(5) + 截断 HMAC(9)，共 16 位十六进制，单次哈希即可校验
+CODE_VERSION_V3 = 3
+V3_EPOCH = DATE_RANGE_MIN
+V3_DAYS_LENGTH = 5
+V3_PERMANENT_DAYS = (1 << (4 * V3_DAYS_LENGTH)) - 1
+V3_HEAD_LENGTH = 2 + V3_DAYS_LENGTH
+
+# 校验路径标签，用于启动日志与性能计数
+VERIFY_PATH_V1 = "v1"
+VERIFY_PATH_V2_PERMANENT = "v2-permanent"
+VERIFY_PATH_V2_TABLE = "v2-table"
+VERIFY_PATH_V2_CACHE = "v2-cache"
+VERIFY_PATH_V2_SHARED = "v2-shared"
+VERIFY_PATH_V3 = "v3"
+VERIFY_PATH_MISS = "miss"
+VERIFY_PATH_REVOKED = "revoked"
+VERIFY_PATH_FORMAT = "format"
+VERIFY_PATH_PENDING = "pending"  # 不构建日期表时无法判定，需在后台线程中完整校验
+DATE_CODE_CACHE_LIMIT = 8
+_DATE_CODE_CACHE: "OrderedDict[str, DateCodeTable]" = OrderedDict()
+_DATE_CODE_BUILDING: Dict[str, threading.Lock] = {}
+_DATE_CODE_STATS = {"hits": 0, "misses": 0, "builds": 0, "evictions": 0}
+_DATE_CODE_LOCK = threading.Lock()
+# 进程内的 PackedDateTable，或共享缓存目录中内存映射的 SharedDateTable（二者都提供 get / in / len）
+DateCodeTable = Union["PackedDateTable", "SharedDateTable"]
 
 
 def _win_machine_guid() -> str:
@@ -73,6 +125,9 @@ def _win_machine_guid() -> str:
     except Exception:
         return ""
 
+WMIC_TIMEOUT = 5.0
+
+
 def _wmic_uuid() -> str:
     if os.name != "nt":
         return ""
@@ -84,7 +139,8 @@ def _wmic_uuid() -> str:
             capture_output=True,
             text=True,
             creationflags=subprocess.CREATE_NO_WINDOW,
-            check=True
+            check=True,
+            timeout=WMIC_TIMEOUT
         )
         lines = out.stdout.strip().splitlines()
         if len(lines) >= 2:
@@ -102,123 +158,2786 @@ def _mac_hex() -> str:
     except Exception:
         return ""
 
-def _sanitize_machine_code(raw: str) -> str:
+def _sanitize_machine_code(raw: "Union[str, MachineCode]") -> str:
+    if isinstance(raw, MachineCode):
+        return raw.sanitized
     raw = (raw or "").upper()
     filtered = [ch for ch in raw if ch in HEX_DIGITS]
     return "".join(filtered)[:MACHINE_CODE_LENGTH].ljust(MACHINE_CODE_LENGTH, "0")
 
 
-def format_machine_code(raw: str) -> str:
+def format_machine_code(raw: "Union[str, MachineCode]") -> str:
+    if isinstance(raw, MachineCode):
+        return raw.formatted
     cleaned = _sanitize_machine_code(raw)
     return "-".join(cleaned[i:i + 4] for i in range(0, len(cleaned), 4))
 
 
+MACHINE_CODE_CACHE_LIMIT = 64
+_MACHINE_CODES: "OrderedDict[str, MachineCode]" = OrderedDict()
+_MACHINE_CODES_LOCK = threading.Lock()
+
+
+class MachineCode:
+    """
+    机器码值对象：不可变、可哈希，创建时算好原始、整理后与格式化三种形式；
+    v2 永久码与 v1 / v2 哈希前缀状态首次使用时计算并缓存（随 0 号密钥内容失效）。
+    与 str 比较、作字典键时等同于整理后的 16 位字符串。
+    """
+    __slots__ = ("raw", "sanitized", "formatted", "_v1_prefix", "_v2_prefix", "_permanent_v2")
+
+    def __init__(self, raw: str):
+        sanitized = _sanitize_machine_code(raw)
+        for name, value in (("raw", raw or ""), ("sanitized", sanitized),
+                            ("formatted", format_machine_code(sanitized)), ("_v1_prefix", None),
+                            ("_v2_prefix", None), ("_permanent_v2", None)):
+            object.__setattr__(self, name, value)
+
+    @classmethod
+    def of(cls, value: "Union[str, MachineCode]") -> "MachineCode":
+        """返回 value 对应的值对象；同一字符串在进程内只构造一次（按最近使用保留 MACHINE_CODE_CACHE_LIMIT 个）。"""
+        if isinstance(value, cls):
+            return value
+        key = value or ""
+        with _MACHINE_CODES_LOCK:
+            mc = _MACHINE_CODES.get(key)
+            if mc is not None:
+                _MACHINE_CODES.move_to_end(key)
+                return mc
+        mc = cls(key)
+        with _MACHINE_CODES_LOCK:
+            mc = _MACHINE_CODES.setdefault(key, mc)
+            while len(_MACHINE_CODES) > MACHINE_CODE_CACHE_LIMIT:
+                _MACHINE_CODES.popitem(last=False)
+        return mc
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MachineCode 不可修改")
+
+    __delattr__ = __setattr__
+
+    def __eq__(self, other):
+        if isinstance(other, MachineCode):
+            return self.sanitized == other.sanitized
+        if isinstance(other, str):
+            return self.sanitized == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.sanitized)
+
+    def __str__(self):
+        return self.sanitized
+
+    def __repr__(self):
+        return f"MachineCode({self.formatted!r})"
+
+    def _cached(self, slot: str, make: Callable[[str], object]):
+        # 缓存值连同生成时的密钥内容一起保存，密钥被替换后重新生成
+        secret = _key_secret(LEGACY_KEY_ID)
+        cached = getattr(self, slot)
+        if cached is None or cached[0] is not secret:
+            cached = (secret, make(secret))
+            object.__setattr__(self, slot, cached)
+        return cached[1]
+
+    def v1_prefix(self):
+        """v1 签名的哈希前缀状态（整理后的机器码）；使用时 copy()。"""
+        return self._cached("_v1_prefix", lambda _secret: hashlib.sha256(self.sanitized.encode("utf-8")))
+
+    def v2_prefix(self):
+        """v2 派生的哈希前缀状态（“格式化机器码::密钥::”）；使用时 copy()。"""
+        return self._cached("_v2_prefix", lambda _secret: _v2_prefix_state(self.formatted))
+
+    def permanent_v2(self) -> str:
+        return self._cached("_permanent_v2", lambda _secret: _derive_activation_code_v2(self, "PERMANENT"))
+
+
+_CURRENT_MACHINE_CODE: Optional[MachineCode] = None
+
+
+def current_machine_code() -> MachineCode:
+    """本机机器码值对象；每个进程只探测、构造一次。"""
+    global _CURRENT_MACHINE_CODE
+    if _CURRENT_MACHINE_CODE is None:
+        _CURRENT_MACHINE_CODE = MachineCode.of(get_machine_code())
+    return _CURRENT_MACHINE_CODE
+
+
 def get_machine_code() -> str:
+    start = time.perf_counter()
+    try:
+        shared = shared_license_cache()
+        return shared.machine_code(_probe_machine_code) if shared is not None else _probe_machine_code()
+    finally:
+        METRICS.observe("machine_code_seconds", time.perf_counter() - start)
+
+
+def _host_parts() -> list:
+    return [platform.node(), platform.system(), platform.release(),
+            platform.version(), _mac_hex() or "UNKNOWNMAC"]
+
+
+def _probe_machine_code() -> str:
     parts = []
     if os.name == "nt":
         g = _win_machine_guid()
         if g: parts.append(g)
         u = _wmic_uuid()
         if u: parts.append(u)
-    parts += [platform.node(), platform.system(), platform.release(),
-              platform.version(), _mac_hex() or "UNKNOWNMAC"]
+    parts += _host_parts()
     raw = "|".join([p for p in parts if p])
     digest = hashlib.sha1(raw.encode("utf-8")).hexdigest().upper()
     return digest[:MACHINE_CODE_LENGTH]
 
 
-def _activation_signature(mc: str, expiry_hex: str) -> str:
-    payload = f"{mc}{expiry_hex}{SECRET_KEY}"
+def _key_secret(key_id: int) -> str:
+    try:
+        return SECRET_KEYS[key_id]
+    except KeyError:
+        raise ValueError(f"密钥环中没有编号 {key_id}") from None
+
+
+_KEY_STATE_LOCK = threading.Lock()
+_V3_MAC_STATE: Dict[Tuple[int, str], "hmac.HMAC"] = {}
+_V2_PREFIX_STATE: "OrderedDict[Tuple[int, str], object]" = OrderedDict()
+
+
+def _v3_mac_state(key_id: int) -> "hmac.HMAC":
+    """每个密钥只做一次 HMAC 密钥调度，之后 copy() 复用；密钥更换后按新内容重新生成。"""
+    secret = _key_secret(key_id)
+    state = _V3_MAC_STATE.get((key_id, secret))
+    if state is None:
+        state = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        with _KEY_STATE_LOCK:
+            _V3_MAC_STATE[(key_id, secret)] = state
+    return state
+
+
+def _v2_prefix_state(formatted_mc: str, key_id: int = LEGACY_KEY_ID):
+    """v2 派生的公共前缀“机器码::密钥::”只哈希一次，逐日派生时复制该状态。"""
+    cache_key = (key_id, f"{formatted_mc}::{_key_secret(key_id)}::")
+    with _KEY_STATE_LOCK:
+        state = _V2_PREFIX_STATE.get(cache_key)
+        if state is not None:
+            _V2_PREFIX_STATE.move_to_end(cache_key)
+            return state
+    state = hashlib.sha256(cache_key[1].encode("utf-8"))
+    with _KEY_STATE_LOCK:
+        _V2_PREFIX_STATE[cache_key] = state
+        while len(_V2_PREFIX_STATE) > DATE_CODE_CACHE_LIMIT:
+            _V2_PREFIX_STATE.popitem(last=False)
+    return state
+
+
+def _activation_signature(mc: "Union[str, MachineCode]", expiry_hex: str) -> str:
+    h = MachineCode.of(mc).v1_prefix().copy()
+    h.update(f"{expiry_hex}{_key_secret(LEGACY_KEY_ID)}".encode("utf-8"))
     sig_len = ACTIVATION_CODE_LENGTH - len(expiry_hex)
-    return hashlib.sha256(payload.encode("utf-8")).hexdigest().upper()[:sig_len]
+    return h.hexdigest().upper()[:sig_len]
 
 
 def normalize_activation_code(code: str) -> str:
     return "".join(ch for ch in (code or "").upper() if ch in HEX_DIGITS)
 
 
-def calc_activation_code(mc: str, expires_at: int) -> str:
+def calc_activation_code(mc: "Union[str, MachineCode]", expires_at: int) -> str:
     """生成 16 位激活码：前 8 位为到期 Unix 时间戳（十六进制），后 8 位为签名。"""
     expiry_hex = f"{max(0, int(expires_at)):0{EXPIRY_SEGMENT_LENGTH}X}"[-EXPIRY_SEGMENT_LENGTH:]
     signature = _activation_signature(mc, expiry_hex)
     return (expiry_hex + signature)[:ACTIVATION_CODE_LENGTH]
 
 
-def _derive_activation_code_v2(formatted_mc: str, token: str) -> str:
-    payload = f"{formatted_mc}::{SECRET_KEY}::{token}"
-    return hashlib.sha256(payload.encode("utf-8")).hexdigest().upper()[:ACTIVATION_CODE_LENGTH]
+def _derive_activation_code_v2(mc: "Union[str, MachineCode]", token: str) -> str:
+    """mc 为格式化后的机器码字符串或 MachineCode。"""
+    h = (mc.v2_prefix() if isinstance(mc, MachineCode) else _v2_prefix_state(mc)).copy()
+    h.update(token.encode("utf-8"))
+    return h.hexdigest().upper()[:ACTIVATION_CODE_LENGTH]
 
 
-def _ensure_date_code_cache(mc: str) -> Dict[str, int]:
-    cache = _DATE_CODE_CACHE.get(mc)
-    if cache is not None:
-        return cache
-    formatted_mc = format_machine_code(mc)
-    cache = {}
+def _day_expiry_timestamp(day: dt.date) -> int:
+    expires_dt = dt.datetime.combine(day, dt.time(23, 59, 59), tzinfo=dt.timezone.utc)
+    return int(expires_dt.timestamp())
+
+
+class PackedDateTable:
+    """
+    进程内的 v2 日期表：按激活码数值升序的 u64 / i64 两个数组，约 16 字节 / 项（dict 约 130 字节 / 项），
+    整张表约 1.9 MB。提供与 dict 相同的 get / in / len 接口。
+    """
+    __slots__ = ("_keys", "_expiry")
+
+    def __init__(self, records):
+        # records 为按激活码数值升序的 (激活码数值, 到期时间) 序列，数值不重复
+        self._keys = array("Q")
+        self._expiry = array("q")
+        for key, expires_at in records:
+            self._keys.append(key)
+            self._expiry.append(expires_at)
+
+    def get(self, code: str, default: Optional[int] = None) -> Optional[int]:
+        if len(code) != ACTIVATION_CODE_LENGTH:
+            return default
+        try:
+            key = _code_key(code)
+        except ValueError:
+            return default
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._expiry[i]
+        return default
+
+    def __contains__(self, code: str) -> bool:
+        return self.get(code) is not None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def records(self):
+        return zip(self._keys, self._expiry)
+
+
+def _build_date_code_table(mc: "Union[str, MachineCode]") -> PackedDateTable:
+    prefix = MachineCode.of(mc).v2_prefix()
+    records = []
     current = DATE_RANGE_MIN
     delta = dt.timedelta(days=1)
     while current <= DATE_RANGE_MAX:
-        token = current.isoformat()
-        code = _derive_activation_code_v2(formatted_mc, token)
-        expires_dt = dt.datetime.combine(current, dt.time(23, 59, 59), tzinfo=dt.timezone.utc)
-        cache[code] = int(expires_dt.timestamp())
+        h = prefix.copy()
+        h.update(current.isoformat().encode("utf-8"))
+        # 激活码为摘要的前 16 位十六进制，即前 8 字节
+        records.append((int.from_bytes(h.digest()[:8], "big"), _day_expiry_timestamp(current)))
         current += delta
-    _DATE_CODE_CACHE[mc] = cache
+    records.sort()
+    # 前缀碰撞时保留较晚的日期，与按日期顺序写入 dict 的结果一致
+    unique = [r for i, r in enumerate(records) if i + 1 == len(records) or records[i + 1][0] != r[0]]
+    return PackedDateTable(unique)
+
+
+def _timed_build_date_code_table(mc: str) -> PackedDateTable:
+    start = time.perf_counter()
+    table = _build_date_code_table(mc)
+    with _DATE_CODE_LOCK:
+        # 只统计本进程实际构建的次数；从共享目录映射的表不计入
+        _DATE_CODE_STATS["builds"] += 1
+    METRICS.inc("table_builds_total")
+    METRICS.observe("table_build_seconds", time.perf_counter() - start)
+    return table
+
+
+def _load_date_code_table(mc: str) -> "DateCodeTable":
+    shared = shared_license_cache()
+    if shared is not None:
+        table = shared.date_table(mc, _timed_build_date_code_table)
+        if table is not None:
+            return table
+    return _timed_build_date_code_table(mc)
+
+
+def _ensure_date_code_cache(mc: "Union[str, MachineCode]") -> "DateCodeTable":
+    # 缓存以整理后的字符串为键；MachineCode 与之哈希相等，可直接用于查找
+    mc = _sanitize_machine_code(mc)
+    with _DATE_CODE_LOCK:
+        cache = _DATE_CODE_CACHE.get(mc)
+        if cache is not None:
+            _DATE_CODE_CACHE.move_to_end(mc)
+            _DATE_CODE_STATS["hits"] += 1
+            return cache
+        _DATE_CODE_STATS["misses"] += 1
+        build_lock = _DATE_CODE_BUILDING.setdefault(mc, threading.Lock())
+    # 后台预热与界面线程可能同时请求同一张表：同一机器码只构建一次，不同机器码互不阻塞
+    with build_lock:
+        with _DATE_CODE_LOCK:
+            cache = _DATE_CODE_CACHE.get(mc)
+        if cache is not None:
+            return cache
+        cache = _load_date_code_table(mc)
+        with _DATE_CODE_LOCK:
+            _DATE_CODE_CACHE[mc] = cache
+            while len(_DATE_CODE_CACHE) > DATE_CODE_CACHE_LIMIT:
+                _DATE_CODE_CACHE.popitem(last=False)
+                _DATE_CODE_STATS["evictions"] += 1
+            _DATE_CODE_BUILDING.pop(mc, None)
     return cache
 
 
-def _verify_activation_code_v2(mc: str, normalized: str) -> Tuple[bool, Optional[int]]:
-    formatted_mc = format_machine_code(mc)
-    permanent_code = _derive_activation_code_v2(formatted_mc, "PERMANENT")
-    if normalized == permanent_code:
-        return True, PERMANENT_EXPIRY_SENTINEL
+def set_date_code_cache_limit(limit: int) -> None:
+    global DATE_CODE_CACHE_LIMIT
+    with _DATE_CODE_LOCK:
+        DATE_CODE_CACHE_LIMIT = max(1, int(limit))
+        while len(_DATE_CODE_CACHE) > DATE_CODE_CACHE_LIMIT:
+            _DATE_CODE_CACHE.popitem(last=False)
+            _DATE_CODE_STATS["evictions"] += 1
+
+
+def date_code_cache_info() -> Dict[str, int]:
+    with _DATE_CODE_LOCK:
+        info = dict(_DATE_CODE_STATS)
+        info.update(size=len(_DATE_CODE_CACHE), limit=DATE_CODE_CACHE_LIMIT)
+    return info
+
+
+def reset_date_code_cache() -> None:
+    """清空进程内的 v2 日期表与统计，回到新进程的冷状态；进行中的构建完成后仍会写入。"""
+    with _DATE_CODE_LOCK:
+        _DATE_CODE_CACHE.clear()
+        for key in _DATE_CODE_STATS:
+            _DATE_CODE_STATS[key] = 0
+
+
+def date_code_table_ready(mc: "Union[str, MachineCode]") -> bool:
+    with _DATE_CODE_LOCK:
+        return _sanitize_machine_code(mc) in _DATE_CODE_CACHE
+
+
+def warm_date_code_cache(mc: str) -> threading.Thread:
+    """在后台线程中预先构建 v2 日期表，供激活对话框显示期间使用。"""
+    mc = _sanitize_machine_code(mc)
+    t = threading.Thread(target=_ensure_date_code_cache, args=(mc,), name="v2-warm", daemon=True)
+    t.start()
+    return t
+
+
+def _verify_activation_code_v2(mc: MachineCode, normalized: str, build: bool = True) -> Tuple[bool, Optional[int], str]:
+    if normalized == mc.permanent_v2():
+        return True, PERMANENT_EXPIRY_SENTINEL, VERIFY_PATH_V2_PERMANENT
+    shared = shared_license_cache()
+    if shared is not None:
+        verdict = shared.verdict(mc.sanitized, normalized)
+        if verdict is not None:
+            return True, verdict[0], VERIFY_PATH_V2_SHARED
+    if not build and not date_code_table_ready(mc):
+        return False, None, VERIFY_PATH_PENDING
+    path = VERIFY_PATH_V2_CACHE if mc in _DATE_CODE_CACHE else VERIFY_PATH_V2_TABLE
     cache = _ensure_date_code_cache(mc)
     expires_at = cache.get(normalized)
     if expires_at is not None:
-        return True, expires_at
-    return False, None
+        if shared is not None:
+            shared.store_verdict(mc.sanitized, normalized, expires_at, path)
+        return True, expires_at, path
+    return False, None, path
+
+
+def _activation_mac_v3(mc: "Union[str, MachineCode]", head: str) -> str:
+    h = _v3_mac_state(int(head[1], 16)).copy()
+    h.update(f"{format_machine_code(mc)}|{head}".encode("utf-8"))
+    return h.hexdigest().upper()[:ACTIVATION_CODE_LENGTH - V3_HEAD_LENGTH]
+
+
+def calc_activation_code_v3(mc: "Union[str, MachineCode]", expires_on: Optional[dt.date] = None, key_id: Optional[int] = None) -> str:
+    """
+    生成 v3 激活码；expires_on 为 None 表示永久有效，否则在该日 23:59:59 (UTC) 到期。
+    key_id 缺省为 ACTIVE_KEY_ID。
+    """
+    key_id = ACTIVE_KEY_ID if key_id is None else key_id
+    _key_secret(key_id)
+    if expires_on is None:
+        days = V3_PERMANENT_DAYS
+    else:
+        days = (expires_on - V3_EPOCH).days
+        if not 0 <= days < V3_PERMANENT_DAYS:
+            raise ValueError(f"到期日期超出 v3 可表示范围：{expires_on.isoformat()}")
+    head = f"{CODE_VERSION_V3:X}{key_id:X}{days:0{V3_DAYS_LENGTH}X}"
+    return head + _activation_mac_v3(mc, head)
+
+
+def format_activation_code(code: str) -> str:
+    normalized = normalize_activation_code(code)
+    return "-".join(normalized[i:i + 4] for i in range(0, len(normalized), 4))
+
+
+def _code_version(normalized: str) -> Optional[int]:
+    # 第 2 位是密钥环中的编号才视为 v3，否则按无版本标记的旧码处理
+    if normalized[0] == f"{CODE_VERSION_V3:X}" and int(normalized[1], 16) in SECRET_KEYS:
+        return CODE_VERSION_V3
+    return None
+
+
+def _verify_activation_code_v3(mc: MachineCode, normalized: str) -> Tuple[bool, Optional[int]]:
+    head = normalized[:V3_HEAD_LENGTH]
+    if not hmac.compare_digest(normalized[V3_HEAD_LENGTH:], _activation_mac_v3(mc, head)):
+        return False, None
+    days = int(head[2:], 16)
+    if days == V3_PERMANENT_DAYS:
+        return True, PERMANENT_EXPIRY_SENTINEL
+    return True, _day_expiry_timestamp(V3_EPOCH + dt.timedelta(days=days))
+
+
+def _verify_activation_code_legacy(mc: MachineCode, normalized: str, build: bool = True) -> Tuple[bool, Optional[int], str]:
+    expires_at = int(normalized[:EXPIRY_SEGMENT_LENGTH], 16)
+    if normalized == calc_activation_code(mc, expires_at):
+        return True, expires_at, VERIFY_PATH_V1
+    return _verify_activation_code_v2(mc, normalized, build)
+
+
+def _verify_activation_code(mc: "Union[str, MachineCode]", code: str,
+                            build: bool = True) -> Tuple[bool, Optional[int], Optional[str], str, str]:
+    """
+    与 verify_activation_code 相同，额外返回命中的校验路径（v1 / v2-table / v2-cache / v3 …）。
+    build 为 False 时不构建 v2 日期表：需要查表而表尚未就绪的码返回 pending 路径，供界面线程转到后台校验。
+    """
+    start = time.perf_counter()
+    result = _verify_activation_code_impl(MachineCode.of(mc), code, build)
+    if result[4] != VERIFY_PATH_PENDING:
+        METRICS.observe("verify_seconds", time.perf_counter() - start, path=_verify_metric_path(result[4]))
+    return result
 
 
-def verify_activation_code(mc: str, code: str) -> Tuple[bool, Optional[int], Optional[str], str]:
+def _verify_activation_code_impl(mc: MachineCode, code: str,
+                                 build: bool = True) -> Tuple[bool, Optional[int], Optional[str], str, str]:
     normalized = normalize_activation_code(code)
     if len(normalized) != ACTIVATION_CODE_LENGTH:
-        return False, None, "激活码格式不正确，请确认后重新输入。", normalized
-    expiry_hex = normalized[:EXPIRY_SEGMENT_LENGTH]
+        return False, None, "激活码格式不正确，请确认后重新输入。", normalized, VERIFY_PATH_FORMAT
+    if is_code_revoked(normalized):
+        return False, None, "该激活码已被吊销，请联系管理员。", normalized, VERIFY_PATH_REVOKED
+    if _code_version(normalized) == CODE_VERSION_V3:
+        # 先按 v3 校验；MAC 不符时仍按 v1 / v2 校验：约每 256 个 v2 码（每个环中密钥编号）就有一个恰好带此标记，
+        # 服务台页面仍在签发这类码。界面线程以 build=False 调用，需要建表时返回 pending 转到后台，不会卡顿
+        ok, expires_at = _verify_activation_code_v3(mc, normalized)
+        path = VERIFY_PATH_V3
+        if not ok:
+            ok, expires_at, path = _verify_activation_code_legacy(mc, normalized, build)
+    else:
+        ok, expires_at, path = _verify_activation_code_legacy(mc, normalized, build)
+    if path == VERIFY_PATH_PENDING:
+        return False, None, None, normalized, path
+    if not ok:
+        return False, None, "激活码不正确，请核对后再试。", normalized, VERIFY_PATH_MISS
+    if expires_at is not None and expires_at < int(time.time()):
+        return False, expires_at, "激活码已过期，请联系管理员重新获取。", normalized, path
+    return True, expires_at, None, normalized, path
+
+
+def verify_activation_code(mc: "Union[str, MachineCode]", code: str) -> Tuple[bool, Optional[int], Optional[str], str]:
+    return _verify_activation_code(mc, code)[:4]
+
+
+# 粘贴识别：只扫描前 PASTE_MAX_CHARS 个字符，最多取 PASTE_MAX_CANDIDATES 个候选
+PASTE_MAX_CHARS = 64 * 1024
+PASTE_MAX_CANDIDATES = 32
+# 16 位十六进制，可按 4 位一组用连字符分隔；前后紧邻的十六进制位或分组说明是更长的串（如摘要），不算候选
+_CODE_CANDIDATE_RE = re.compile(
+    r"(?<![0-9A-F])(?<![0-9A-F]-)[0-9A-F]{4}(-?)[0-9A-F]{4}\1[0-9A-F]{4}\1[0-9A-F]{4}(?![0-9A-F]|-[0-9A-F])",
+    re.IGNORECASE
+)
+
+
+def extract_activation_candidates(text: str, exclude: str = "") -> list:
+    """从任意文本（如邮件正文）中按出现顺序提取去重后的候选激活码；exclude 通常为本机机器码。"""
+    skip = _sanitize_machine_code(exclude) if exclude else None
+    found = []
+    for match in _CODE_CANDIDATE_RE.finditer(text or "", 0, PASTE_MAX_CHARS):
+        code = match.group(0).replace("-", "").upper()
+        if code != skip and code not in found:
+            found.append(code)
+            if len(found) >= PASTE_MAX_CANDIDATES:
+                break
+    return found
+
+
+def verify_activation_codes(mc: "Union[str, MachineCode]", codes, build: bool = True) -> list:
+    """
+    批量校验同一机器码的多个激活码，按输入顺序返回 _verify_activation_code 的结果。
+    机器码只整理一次；v3 密钥状态、v2 前缀状态与日期表在各码之间共用，日期表仅在有旧码走到 v2 时构建。
+    """
+    mc = MachineCode.of(mc)
+    return [_verify_activation_code(mc, code, build=build) for code in codes]
+
+# ======================= 吊销列表 =======================
+REVOCATION_FILE_NAME = "revoked.bin"
+REVOCATION_BITS_PER_ENTRY = 10
+_SIGNATURE_SIZE = 32
+_REVOCATION_LOCK = threading.Lock()
+_REVOCATION_STATE: Dict[str, object] = {}
+
+
+def _blob_signing_key(label: str, key_id: int) -> bytes:
+    # 吊销列表、授权包与共享日期表在头部记录签名所用的密钥编号，校验时按编号取环中的密钥，
+    # 轮换 ACTIVE_KEY_ID 后旧文件继续有效；旧版文件该字节为 0，对应 0 号密钥
+    return hashlib.sha256(f"ibase-{label}|{_key_secret(key_id)}".encode("utf-8")).digest()
+
+
+def _code_key(normalized: str) -> int:
+    return int(normalized, 16)
+
+
+class RevocationList:
+    """
+    签名的离线吊销列表（内存映射）：
+        头部 | 布隆过滤器位图 | 升序排列的 64 位激活码 | HMAC-SHA256 签名
+    先查布隆过滤器，命中时再在有序数组上二分确认，百万条目仅需数 MB、单次查询微秒级。
+    """
+
+    MAGIC = b"IBRV"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHBBQQ")  # magic, version, hash_count, key_id, bloom_bits, count
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _parse(self):
+        mm = self._mm
+        if len(mm) < self.HEADER.size + _SIGNATURE_SIZE:
+            raise ValueError("吊销列表文件过短")
+        magic, version, self.hash_count, self.key_id, self.bloom_bits, self.count = self.HEADER.unpack_from(mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("吊销列表格式不受支持")
+        self._bloom_offset = self.HEADER.size
+        self._keys_offset = self._bloom_offset + self.bloom_bits // 8
+        body_end = self._keys_offset + self.count * 8
+        if body_end + _SIGNATURE_SIZE != len(mm) or self.bloom_bits % 8 or not self.bloom_bits:
+            raise ValueError("吊销列表长度不一致")
+        expected = hmac.new(_blob_signing_key("revocation", self.key_id), memoryview(mm)[:body_end],
+                            hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, mm[body_end:]):
+            raise ValueError("吊销列表签名无效")
+
+    @staticmethod
+    def _probes(key: int, hash_count: int, bloom_bits: int):
+        digest = hashlib.blake2b(key.to_bytes(8, "big"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % bloom_bits for i in range(hash_count)]
+
+    def _maybe_contains(self, key: int) -> bool:
+        mm, base = self._mm, self._bloom_offset
+        for bit in self._probes(key, self.hash_count, self.bloom_bits):
+            if not mm[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _contains_exact(self, key: int) -> bool:
+        mm, base = self._mm, self._keys_offset
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = int.from_bytes(mm[base + mid * 8:base + mid * 8 + 8], "big")
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def __contains__(self, code: str) -> bool:
+        normalized = normalize_activation_code(code)
+        if len(normalized) != ACTIVATION_CODE_LENGTH:
+            return False
+        key = _code_key(normalized)
+        return self._maybe_contains(key) and self._contains_exact(key)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    @classmethod
+    def build(cls, codes, bits_per_entry: int = REVOCATION_BITS_PER_ENTRY, key_id: Optional[int] = None) -> bytes:
+        key_id = ACTIVE_KEY_ID if key_id is None else key_id
+        keys = sorted({
+            _code_key(n) for n in (normalize_activation_code(c) for c in codes)
+            if len(n) == ACTIVATION_CODE_LENGTH
+        })
+        bloom_bits = max(64, (len(keys) * bits_per_entry + 63) // 64 * 64)
+        hash_count = max(1, round(bits_per_entry * 0.693))
+        bloom = bytearray(bloom_bits // 8)
+        for key in keys:
+            for bit in cls._probes(key, hash_count, bloom_bits):
+                bloom[bit >> 3] |= 1 << (bit & 7)
+        body = (
+            cls.HEADER.pack(cls.MAGIC, cls.VERSION, hash_count, key_id, bloom_bits, len(keys))
+            + bytes(bloom)
+            + struct.pack(f">{len(keys)}Q", *keys)
+        )
+        return body + hmac.new(_blob_signing_key("revocation", key_id), body, hashlib.sha256).digest()
+
+
+def _locate_data_file(env_name: str, file_name: str) -> Optional[Path]:
+    """按 环境变量 → 程序目录 → 配置目录 的顺序查找随程序分发的数据文件。"""
+    override = os.getenv(env_name)
+    candidates = [Path(override)] if override else [base_dir() / file_name, CONFIG_DIR / file_name]
+    for path in candidates:
+        if path.is_file():
+            return path
+    return None
+
+
+def _revocation_list_path() -> Optional[Path]:
+    return _locate_data_file("IBASE_REVOCATION_LIST", REVOCATION_FILE_NAME)
+
+
+def load_revocation_list() -> Optional[RevocationList]:
+    """每个进程只加载、验签一次；签名无效或格式错误时忽略并记录日志。"""
+    with _REVOCATION_LOCK:
+        if "list" in _REVOCATION_STATE:
+            return _REVOCATION_STATE["list"]
+        revoked = None
+        path = _revocation_list_path()
+        if path is not None:
+            try:
+                revoked = RevocationList(path)
+            except (OSError, ValueError) as e:
+                # 吊销列表失效时已吊销的激活码会重新通过校验，必须留下警告
+                log.warning("吊销列表不可用，本次不检查吊销（%s）：%s", path, e)
+        _REVOCATION_STATE["list"] = revoked
+        return revoked
+
+
+def is_code_revoked(normalized: str) -> bool:
+    revoked = load_revocation_list()
+    return revoked is not None and normalized in revoked
+
+# ======================= 批量授权包 =======================
+BUNDLE_FILE_NAME = "licenses.bin"
+
+
+class LicenseBundle:
+    """
+    签名的批量授权包（内存映射），用于批量部署时首次启动自动绑定：
+        头部 | 按机器码升序的 (u64 机器码, u64 激活码) 记录 | HMAC-SHA256 签名
+    """
+
+    MAGIC = b"IBLB"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQ")  # magic, version, key_id, count
+    RECORD = struct.Struct(">QQ")
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _parse(self):
+        mm = self._mm
+        if len(mm) < self.HEADER.size + _SIGNATURE_SIZE:
+            raise ValueError("授权包文件过短")
+        magic, version, self.key_id, self.count = self.HEADER.unpack_from(mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("授权包格式不受支持")
+        body_end = self.HEADER.size + self.count * self.RECORD.size
+        if body_end + _SIGNATURE_SIZE != len(mm):
+            raise ValueError("授权包长度不一致")
+        expected = hmac.new(_blob_signing_key("bundle", self.key_id), memoryview(mm)[:body_end],
+                            hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, mm[body_end:]):
+            raise ValueError("授权包签名无效")
+
+    def lookup(self, mc: str) -> Optional[str]:
+        """返回该机器码对应的激活码（16 位十六进制），不存在时返回 None。"""
+        key = int(_sanitize_machine_code(mc), 16)
+        mm, base, record = self._mm, self.HEADER.size, self.RECORD
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value, code = record.unpack_from(mm, base + mid * record.size)
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return f"{code:0{ACTIVATION_CODE_LENGTH}X}"
+        return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    @classmethod
+    def build(cls, pairs, key_id: Optional[int] = None) -> bytes:
+        """pairs 为 (机器码, 激活码) 序列；同一机器码出现多次时以最后一条为准，格式无效的激活码被跳过。"""
+        key_id = ACTIVE_KEY_ID if key_id is None else key_id
+        records: Dict[int, int] = {}
+        for mc, code in pairs:
+            normalized = normalize_activation_code(code)
+            if len(normalized) != ACTIVATION_CODE_LENGTH:
+                continue
+            records[int(_sanitize_machine_code(mc), 16)] = _code_key(normalized)
+        body = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, key_id, len(records)))
+        for key in sorted(records):
+            body += cls.RECORD.pack(key, records[key])
+        return bytes(body) + hmac.new(_blob_signing_key("bundle", key_id), body, hashlib.sha256).digest()
+
+
+def _license_bundle_path() -> Optional[Path]:
+    return _locate_data_file("IBASE_LICENSE_BUNDLE", BUNDLE_FILE_NAME)
+
+
+def find_bundled_code(mc: str) -> Optional[str]:
+    """在随程序分发的授权包中查找本机激活码；授权包缺失、签名无效或未收录本机时返回 None。"""
+    path = _license_bundle_path()
+    if path is None:
+        return None
+    try:
+        bundle = LicenseBundle(path)
+    except (OSError, ValueError) as e:
+        log.warning("授权包不可用（%s）：%s", path, e)
+        return None
+    try:
+        return bundle.lookup(mc)
+    finally:
+        bundle.close()
+
+# ======================= 共享授权缓存 =======================
+# 终端服务器上所有用户的机器码相同：由首个启动器在机器级目录中生成一次机器码、v2 日期表与校验结论，
+# 其余用户只读映射。目录由管理员创建后才启用（或用 IBASE_SHARED_CACHE 指定，设为 off 关闭）。
+SHARED_CACHE_ENV = "IBASE_SHARED_CACHE"
+SHARED_CACHE_LOCK_TIMEOUT = 30.0
+SHARED_CACHE_GUI_LOCK_TIMEOUT = 0.1  # 界面线程只短暂等待，之后自行计算
+_SHARED_CACHE_LOCK = threading.Lock()
+_SHARED_CACHE_STATE: Dict[str, object] = {}
+
+
+def _shared_cache_dir() -> Optional[Path]:
+    override = os.getenv(SHARED_CACHE_ENV)
+    if override is not None:
+        return None if override.strip().lower() in ("", "0", "off", "false") else Path(override)
+    program_data = os.getenv("PROGRAMDATA")
+    if program_data:
+        path = Path(program_data) / APP_NAME / "shared"
+        if path.is_dir():
+            return path
+    return None
+
+
+def _firmware_uuid() -> str:
+    """从 SMBIOS 系统信息（类型 1）读取主板 UUID，与 wmic csproduct 同源，但不启动子进程。"""
+    if os.name != "nt":
+        return ""
     try:
-        expires_at = int(expiry_hex, 16)
-    except ValueError:
-        return False, None, "激活码格式不正确，请确认后重新输入。", normalized
-    expected = calc_activation_code(mc, expires_at)
-    if normalized == expected:
-        now = int(time.time())
-        if expires_at < now:
-            return False, expires_at, "激活码已过期，请联系管理员重新获取。", normalized
-        return True, expires_at, None, normalized
-    new_ok, new_exp = _verify_activation_code_v2(mc, normalized)
-    if new_ok:
-        now = int(time.time())
-        if new_exp is not None and new_exp < now:
-            return False, new_exp, "激活码已过期，请联系管理员重新获取。", normalized
-        return True, new_exp, None, normalized
-    return False, None, "激活码不正确，请核对后再试。", normalized
+        import ctypes
+        k32 = ctypes.windll.kernel32
+        size = k32.GetSystemFirmwareTable(0x52534D42, 0, None, 0)  # 'RSMB'
+        if not size:
+            return ""
+        buf = ctypes.create_string_buffer(size)
+        if k32.GetSystemFirmwareTable(0x52534D42, 0, buf, size) != size:
+            return ""
+        data = buf.raw
+        # RawSMBIOSData：8 字节头部之后是结构表，每个结构为格式化区加以双 0 结尾的字符串区
+        pos, end = 8, min(size, 8 + struct.unpack_from("<I", data, 4)[0])
+        while pos + 4 <= end:
+            kind, length = data[pos], data[pos + 1]
+            if kind == 1 and length >= 0x18:
+                return data[pos + 8:pos + 24].hex().upper()
+            if kind == 127 or length < 4:
+                break
+            strings = data.find(b"\0\0", pos + length)
+            if strings < 0:
+                break
+            pos = strings + 2
+    except Exception:
+        pass
+    return ""
+
+
+def _host_fingerprint() -> str:
+    # 覆盖机器码的全部探测输入（wmic 的 UUID 改从固件表直接读取），任一变化都会使共享机器码失效
+    parts = [_win_machine_guid(), _firmware_uuid()] + _host_parts()
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class SharedDateTable:
+    """
+    内存映射的 v2 日期表：
+        头部 | 机器码(16) | 按激活码升序的 (u64 激活码, i64 到期时间) 记录 | HMAC-SHA256 签名
+    提供与 dict 相同的 get / in / len 接口。
+    """
+
+    MAGIC = b"IBDT"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHQ")  # magic, version, key_id, count
+    RECORD = struct.Struct(">Qq")
+
+    def __init__(self, path: Path, mc: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse(mc)
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _parse(self, mc: str):
+        mm = self._mm
+        offset = self.HEADER.size + MACHINE_CODE_LENGTH
+        if len(mm) < offset + _SIGNATURE_SIZE:
+            raise ValueError("共享日期表文件过短")
+        magic, version, key_id, self.count = self.HEADER.unpack_from(mm, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("共享日期表格式不受支持")
+        if mm[self.HEADER.size:offset] != mc.encode("ascii"):
+            raise ValueError("共享日期表与机器码不符")
+        body_end = offset + self.count * self.RECORD.size
+        if body_end + _SIGNATURE_SIZE != len(mm):
+            raise ValueError("共享日期表长度不一致")
+        expected = hmac.new(_blob_signing_key("shared-cache", key_id), memoryview(mm)[:body_end],
+                            hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, mm[body_end:]):
+            raise ValueError("共享日期表签名无效")
+        self._records_offset = offset
+
+    def get(self, code: str, default: Optional[int] = None) -> Optional[int]:
+        if len(code) != ACTIVATION_CODE_LENGTH:
+            return default
+        try:
+            key = _code_key(code)
+        except ValueError:
+            return default
+        mm, base, record = self._mm, self._records_offset, self.RECORD
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value, expires_at = record.unpack_from(mm, base + mid * record.size)
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return expires_at
+        return default
+
+    def __contains__(self, code: str) -> bool:
+        return self.get(code) is not None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    @classmethod
+    def build(cls, mc: str, table: PackedDateTable) -> bytes:
+        records = list(table.records())
+        key_id = ACTIVE_KEY_ID
+        body = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, key_id, len(records)) + mc.encode("ascii"))
+        for key, expires_at in records:
+            body += cls.RECORD.pack(key, expires_at)
+        return bytes(body) + hmac.new(_blob_signing_key("shared-cache", key_id), body, hashlib.sha256).digest()
+
+
+class SharedLicenseCache:
+    """机器级共享缓存目录；文件写入后设为只读，生成过程用锁文件上的字节锁串行化（持锁进程退出时自动释放）。"""
+
+    MACHINE_FILE = "machine.json"
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.host = _host_fingerprint()
+
+    @staticmethod
+    def _sign(*fields) -> str:
+        # JSON 条目只按当前密钥签名：轮换后验签失败，按缺失处理并重新生成
+        payload = "|".join(str(f) for f in fields).encode("utf-8")
+        return hmac.new(_blob_signing_key("shared-cache", ACTIVE_KEY_ID), payload, hashlib.sha256).hexdigest()
+
+    def _read_json(self, name: str) -> Optional[dict]:
+        try:
+            with open(self.root / name, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _publish(self, name: str, blob: bytes) -> None:
+        path = self.root / name
+        tmp = path.with_name(f".{name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.chmod(tmp, 0o444)
+        try:
+            # Windows 上只读文件不能被 os.replace 覆盖，先去掉只读属性
+            os.chmod(path, 0o644)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+
+    def _populate(self, name: str, read: Callable[[], object], produce: Callable[[], bytes]):
+        """
+        读取已有结果；缺失时只让一个进程生成，其余进程等待后直接读取。
+        界面线程最多等待 SHARED_CACHE_GUI_LOCK_TIMEOUT，超时返回 None，由调用方在本进程计算。
+        """
+        found = read()
+        if found is not None:
+            return found
+        on_gui = threading.current_thread() is threading.main_thread()
+        deadline = time.monotonic() + (SHARED_CACHE_GUI_LOCK_TIMEOUT if on_gui else SHARED_CACHE_LOCK_TIMEOUT)
+        try:
+            # 锁文件保留不删：锁随持有进程退出释放，不存在需要清理的残留锁
+            fd = _open_shared(self.root / f".{name}.lock")
+        except OSError as e:
+            log.warning("共享授权缓存加锁失败（%s）：%s", name, e)
+            return None
+        try:
+            while not _try_lock(fd):
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.05)
+                found = read()
+                if found is not None:
+                    return found
+            try:
+                found = read()
+                if found is None:
+                    self._publish(name, produce())
+                    found = read()
+                return found
+            finally:
+                _unlock(fd)
+        except OSError as e:
+            log.warning("写入共享授权缓存失败（%s）：%s", name, e)
+            return None
+        finally:
+            os.close(fd)
+
+    def machine_code(self, probe: Callable[[], str]) -> str:
+        def read():
+            data = self._read_json(self.MACHINE_FILE)
+            if not data or data.get("host") != self.host:
+                return None
+            mc = str(data.get("machine_code", ""))
+            if len(mc) != MACHINE_CODE_LENGTH or not hmac.compare_digest(
+                    str(data.get("sig", "")), self._sign(self.host, mc)):
+                return None
+            return mc
+
+        probed = []
+
+        def produce() -> bytes:
+            mc = probe()
+            probed.append(mc)
+            data = {"machine_code": mc, "host": self.host, "sig": self._sign(self.host, mc)}
+            return json.dumps(data).encode("utf-8")
+
+        mc = self._populate(self.MACHINE_FILE, read, produce)
+        if mc is not None:
+            return mc
+        return probed[0] if probed else probe()
+
+    def date_table(self, mc: str, build: Callable[[str], PackedDateTable]) -> Optional[SharedDateTable]:
+        name = f"v2-{mc}.bin"
+
+        def read():
+            path = self.root / name
+            if not path.is_file():
+                return None
+            try:
+                return SharedDateTable(path, mc)
+            except (OSError, ValueError) as e:
+                log.warning("共享日期表不可用（%s）：%s", path, e)
+                return None
+
+        return self._populate(name, read, lambda: SharedDateTable.build(mc, build(mc)))
+
+    def _verdict_name(self, mc: str, normalized: str) -> str:
+        return f"verdict-{hashlib.sha256(f'{mc}|{normalized}'.encode('utf-8')).hexdigest()[:24]}.json"
+
+    def verdict(self, mc: str, normalized: str) -> Optional[Tuple[int, str]]:
+        """已缓存的通过结论：(到期时间, 原校验路径)；结论只记录通过的激活码。"""
+        data = self._read_json(self._verdict_name(mc, normalized))
+        if not data:
+            return None
+        try:
+            expires_at, path = int(data["expires_at"]), str(data["path"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not hmac.compare_digest(str(data.get("sig", "")), self._sign(mc, normalized, expires_at, path)):
+            return None
+        return expires_at, path
+
+    def store_verdict(self, mc: str, normalized: str, expires_at: int, path: str) -> None:
+        data = {"expires_at": expires_at, "path": path, "sig": self._sign(mc, normalized, expires_at, path)}
+        try:
+            self._publish(self._verdict_name(mc, normalized), json.dumps(data).encode("utf-8"))
+        except OSError as e:
+            log.debug("写入共享校验结论失败：%s", e)
+
+
+def shared_license_cache() -> Optional[SharedLicenseCache]:
+    """每个进程只解析一次共享目录；目录不存在或不可用时返回 None，全部回落到按用户计算。"""
+    with _SHARED_CACHE_LOCK:
+        if "cache" in _SHARED_CACHE_STATE:
+            return _SHARED_CACHE_STATE["cache"]
+        cache = None
+        root = _shared_cache_dir()
+        if root is not None:
+            try:
+                root.mkdir(parents=True, exist_ok=True)
+                cache = SharedLicenseCache(root)
+            except OSError as e:
+                log.warning("共享授权缓存不可用（%s）：%s", root, e)
+        _SHARED_CACHE_STATE["cache"] = cache
+        return cache
 
 # ======================= 配置读写 =======================
+# CONFIG_DIR 位于网络位置（UNC 路径或映射的网络驱动器，常见于重定向的漫游配置）时，
+# 启动路径上的配置与缓存文件改为读写本地镜像。IBASE_CONFIG_MIRROR 可强制开启（on 或本地目录）或关闭（off）
+CONFIG_MIRROR_ENV = "IBASE_CONFIG_MIRROR"
+CONFIG_MIRROR_META = "mirror.json"
+CONFIG_MIRROR_FLUSH_TIMEOUT = 5.0
+CONFIG_MIRROR_LOCK_TIMEOUT = 2.0
+CONFIG_MIRROR_FILES = ("config.json", "prefetch.json", "integrity.json")
+_CONFIG_MIRROR_LOCK = threading.Lock()
+_CONFIG_MIRROR: Dict[str, Optional["ConfigMirror"]] = {}
+
+
+def _is_network_path(path: Path) -> bool:
+    text = str(path)
+    if text.startswith(("\\\\", "//")):
+        return True
+    if os.name != "nt" or not path.drive:
+        return False
+    try:
+        import ctypes
+        return ctypes.windll.kernel32.GetDriveTypeW(ctypes.c_wchar_p(path.drive + "\\")) == 4  # DRIVE_REMOTE
+    except Exception:
+        return False
+
+
+def _config_mirror_dir() -> Optional[Path]:
+    override = (os.getenv(CONFIG_MIRROR_ENV) or "").strip()
+    if override.lower() in ("0", "off", "false"):
+        return None
+    if override and override.lower() not in ("1", "on", "true"):
+        return Path(override)
+    if not override and not _is_network_path(CONFIG_DIR):
+        # 本地配置目录不需要镜像：直接读写才能立即看到外部修改
+        return None
+    local = os.getenv("LOCALAPPDATA")
+    if not local or _is_network_path(Path(local)):
+        return None
+    return Path(local) / APP_NAME / "mirror"
+
+
+def _file_stamp(path: Path) -> Optional[list]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ConfigMirror:
+    """
+    配置目录的本地镜像：读取直接使用本地副本，后台比对远端文件的 (size, mtime) 并在变化时刷新副本；
+    写入先原子写本地，再由后台线程写回远端。写回时远端若已在上次同步后被其它机器修改，
+    对方的版本改名为 .conflict-<时间> 保留，然后以本机写入为准；“已修改”相对于本进程读到的版本判断，
+    即使后台校验已把本地副本刷新为对方的版本，基于旧内容的写入仍按冲突处理。
+    mirror.json 记录每个文件上次同步时的远端指纹、是否待写回与本地写入版本，进程中断后下次启动继续写回。
+    同一用户的多个启动器共用镜像目录：mirror.json 每次在文件锁下重新读取、只改动当前文件的条目；
+    写回按文件加锁串行，冲突判断以最近一次（任一进程）写回记录的指纹为准。
+    只镜像 CONFIG_MIRROR_FILES：启动日志、卡顿记录与性能计数由后台线程或退出前写入，不在启动路径上读取；
+    吊销列表与授权包优先从程序目录读取，这些文件仍直接访问配置目录。
+    """
+
+    def __init__(self, remote: Path, local: Path):
+        self.remote = remote
+        self.local = local
+        self.conflicts = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._meta_lock = threading.Lock()
+        # 本进程读到的各文件内容对应的远端指纹，写入时记为冲突判断的基准
+        self._read_base: Dict[str, Optional[list]] = {}
+        self._queue: "queue.SimpleQueue[Tuple[str, str]]" = queue.SimpleQueue()
+        self._pending = 0
+        self._worker: Optional[threading.Thread] = None
+
+    @contextlib.contextmanager
+    def _file_lock(self, name: str):
+        """跨进程互斥：镜像目录中锁文件上的字节锁，持有进程退出时自动释放。"""
+        self.local.mkdir(parents=True, exist_ok=True)
+        fd = _open_shared(self.local / f".{name}.lock")
+        try:
+            deadline = time.monotonic() + CONFIG_MIRROR_LOCK_TIMEOUT
+            while not _try_lock(fd):
+                if time.monotonic() >= deadline:
+                    raise OSError(f"等待镜像锁 {name} 超时")
+                time.sleep(0.01)
+            try:
+                yield
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def _meta(self):
+        """在锁内读取最新的 mirror.json，产出文件条目字典；修改后写回。"""
+        with self._meta_lock, self._file_lock(CONFIG_MIRROR_META):
+            files = self._load_meta()
+            snapshot = json.dumps(files, sort_keys=True)
+            yield files
+            if json.dumps(files, sort_keys=True) != snapshot:
+                blob = json.dumps({"remote": str(self.remote), "files": files}, ensure_ascii=False).encode("utf-8")
+                _atomic_write(self.local / CONFIG_MIRROR_META, blob)
+
+    def _load_meta(self) -> dict:
+        try:
+            with open(self.local / CONFIG_MIRROR_META, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("remote") == str(self.remote):
+                files = data.get("files")
+                return files if isinstance(files, dict) else {}
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _submit(self, op: str, name: str):
+        with self._lock:
+            self._pending += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="config-mirror", daemon=True)
+                self._worker.start()
+        self._queue.put((op, name))
+
+    def _run(self):
+        while True:
+            op, name = self._queue.get()
+            try:
+                if op == "flush":
+                    self._flush_one(name)
+                else:
+                    self._validate_one(name)
+            except OSError as e:
+                log.warning("配置镜像同步失败（%s）：%s", name, e)
+            finally:
+                with self._lock:
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+    def read(self, name: str) -> Optional[bytes]:
+        with self._meta() as files:
+            entry = files.get(name)
+        if entry is None:
+            # 首次使用：同步读取远端并建立本地副本
+            return self._pull(name, record_base=True)
+        self._read_base[name] = entry.get("base", entry.get("remote")) if entry.get("dirty") else entry.get("remote")
+        try:
+            with open(self.local / name, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+        self._submit("flush" if entry.get("dirty") else "validate", name)
+        return data
+
+    def _pull(self, name: str, record_base: bool = False) -> Optional[bytes]:
+        stamp = _file_stamp(self.remote / name)
+        data = None
+        if stamp is not None:
+            with open(self.remote / name, "rb") as f:
+                data = f.read()
+        with self._meta() as files:
+            if files.get(name, {}).get("dirty"):
+                return data  # 读取期间本机已写入新内容，以本机为准
+            if data is None:
+                try:
+                    (self.local / name).unlink()
+                except FileNotFoundError:
+                    pass
+            else:
+                _atomic_write(self.local / name, data)
+            files[name] = {"remote": stamp, "dirty": False}
+        if record_base:
+            self._read_base[name] = stamp
+        return data
+
+    def _validate_one(self, name: str):
+        with self._meta() as files:
+            entry = files.get(name) or {}
+        if entry.get("dirty") or _file_stamp(self.remote / name) == entry.get("remote"):
+            return
+        self._pull(name)
+        log.info("远端配置 %s 已变化，本地副本已刷新", name)
+
+    def write(self, name: str, data: bytes) -> None:
+        with self._meta() as files:
+            _atomic_write(self.local / name, data)
+            # 未读过的文件没有远端指纹，写回时不做冲突判断（避免在调用线程访问远端）
+            entry = files.setdefault(name, {})
+            if name in self._read_base:
+                entry["base"] = self._read_base[name]
+            elif "remote" in entry:
+                entry.setdefault("base", entry["remote"])
+            entry["dirty"] = True
+            entry["rev"] = f"{os.getpid()}-{time.time_ns()}"
+        self._submit("flush", name)
+
+    def _flush_one(self, name: str):
+        # 同一文件的写回在各进程间串行，基准指纹取锁内最新的 mirror.json
+        with self._file_lock(f"{name}.flush"):
+            with self._meta() as files:
+                entry = files.get(name)
+                if not entry or not entry.get("dirty"):
+                    return
+                rev, known = entry.get("rev"), "base" in entry
+                base, written = entry.get("base"), entry.get("written")
+                with open(self.local / name, "rb") as f:
+                    data = f.read()
+            target = self.remote / name
+            current = _file_stamp(target)
+            # 远端仍是写入所依据的版本，或是本机（任一启动器）最近写回的版本，都不算冲突
+            if known and current is not None and current != base and current != written:
+                suffix = f"{dt.datetime.now():%Y%m%d-%H%M%S}"
+                backup = target.with_name(f"{name}.conflict-{suffix}")
+                n = 1
+                while backup.exists():
+                    # 同一秒内的多次冲突不互相覆盖
+                    n += 1
+                    backup = target.with_name(f"{name}.conflict-{suffix}-{n}")
+                os.replace(target, backup)
+                self.conflicts += 1
+                log.warning("配置 %s 在其它机器上已被修改，原内容另存为 %s", name, backup.name)
+            _atomic_write(target, data)
+            stamp = _file_stamp(target)
+            with self._meta() as files:
+                entry = files.setdefault(name, {})
+                entry["remote"] = entry["written"] = stamp
+                # 写回期间本机（或同机其它启动器）又有新写入时保持待写回状态，由对应的 flush 处理
+                if entry.get("rev") == rev:
+                    entry["dirty"] = False
+                    entry.pop("base", None)
+                    self._read_base[name] = stamp
+
+    def flush(self, timeout: float = CONFIG_MIRROR_FLUSH_TIMEOUT) -> bool:
+        """等待排队中的写回与校验完成；超时返回 False，未写回的内容下次启动继续。"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+
+def config_mirror() -> Optional[ConfigMirror]:
+    key = str(CONFIG_DIR)
+    with _CONFIG_MIRROR_LOCK:
+        if key not in _CONFIG_MIRROR:
+            local = _config_mirror_dir()
+            _CONFIG_MIRROR[key] = ConfigMirror(CONFIG_DIR, local) if local is not None else None
+        return _CONFIG_MIRROR[key]
+
+
+def _mirror_name(path: Path) -> Optional[str]:
+    return path.name if path.parent == CONFIG_DIR and path.name in CONFIG_MIRROR_FILES else None
+
+
+def read_config_file(path: Path) -> Optional[bytes]:
+    """读取配置目录中的文件，不存在时返回 None；镜像启用时读本地副本。"""
+    name = _mirror_name(path)
+    mirror = config_mirror() if name else None
+    if mirror is not None:
+        return mirror.read(name)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_config_file(path: Path, data: bytes) -> None:
+    """原子写入配置目录中的文件；镜像启用时写本地副本并在后台写回。"""
+    name = _mirror_name(path)
+    mirror = config_mirror() if name else None
+    if mirror is not None:
+        mirror.write(name, data)
+    else:
+        _atomic_write(path, data)
+
+
 def load_config() -> dict:
     try:
-        if CONFIG_PATH.exists():
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
+        data = read_config_file(CONFIG_PATH)
+        if data:
+            return json.loads(data.decode("utf-8"))
     except Exception:
         pass
     return {}
 
 def save_config(cfg: dict) -> None:
     try:
-        CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        write_config_file(CONFIG_PATH, json.dumps(cfg, ensure_ascii=False, indent=2).encode("utf-8"))
+    except Exception as e:
+        log.error("保存配置失败：%s", e)
+
+# ======================= 启动日志 =======================
+JOURNAL_PATH = LOG_DIR / "launch.log"
+JOURNAL_MAX_BYTES = 512 * 1024
+JOURNAL_BACKUPS = 3
+
+
+class _JsonLineFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": dt.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")}
+        journal = getattr(record, "journal", None)
+        if isinstance(journal, dict):
+            entry.update(journal)
+        else:
+            entry.update(level=record.levelname.lower(), msg=record.getMessage())
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class _JournalFileHandler(logging.handlers.RotatingFileHandler):
+    def _open(self):
+        # 在写线程中首次写入时才创建目录，避免在界面线程访问磁盘
+        Path(self.baseFilename).parent.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+class LaunchJournal:
+    """
+    启动日志：每次启动写入一条紧凑的 JSON 记录（阶段耗时、校验路径、结果、子进程 PID），
+    错误信息也写入同一文件。记录先入队，由后台线程写入按大小轮转的追加文件，不阻塞界面与启动。
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = JOURNAL_MAX_BYTES,
+                 backups: int = JOURNAL_BACKUPS):
+        self.path = path or JOURNAL_PATH
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self._handler: Optional[logging.Handler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def start(self) -> "LaunchJournal":
+        target = _JournalFileHandler(
+            str(self.path), maxBytes=self.max_bytes, backupCount=self.backups,
+            encoding="utf-8", delay=True
+        )
+        target.setFormatter(_JsonLineFormatter())
+        self._listener = logging.handlers.QueueListener(self._queue, target)
+        self._listener.start()
+        self._handler = logging.handlers.QueueHandler(self._queue)
+        log.addHandler(self._handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        return self
+
+    def record_launch(self, **fields):
+        log.info("launch", extra={"journal": dict(event="launch", **fields)})
+
+    def record_supervision(self, **fields):
+        log.info("supervise", extra={"journal": dict(event="supervise", **fields)})
+
+    def stop(self):
+        if self._handler is not None:
+            log.removeHandler(self._handler)
+            self._handler = None
+        if self._listener is not None:
+            # 停止时会写完队列中剩余的记录
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
+# ======================= 性能计数 =======================
+METRICS_PROM_PATH = CONFIG_DIR / "metrics.prom"
+METRICS_JSON_PATH = CONFIG_DIR / "metrics.json"
+METRICS_PREFIX = "ibase_launcher"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+
+class LauncherMetrics:
+    """
+    进程内计数器与直方图：在现有代码路径上打点，退出时原子写出
+    Prometheus textfile 与 JSON 两种格式；只写不读，不依赖上一次导出的文件。
+    """
+
+    HELP = {
+        "launches_total": ("counter", "启动次数（按结果）"),
+        "verify_seconds": ("histogram", "激活码校验耗时（按路径 v1/v2/v3/revoked/miss）"),
+        "table_builds_total": ("counter", "v2 日期表构建次数"),
+        "table_build_seconds": ("histogram", "v2 日期表构建耗时"),
+        "machine_code_seconds": ("histogram", "机器码探测耗时"),
+        "spawn_seconds": ("histogram", "iBase.exe 进程创建耗时"),
+        "first_frame_seconds": ("histogram", "进程启动到首帧（启动画面）耗时"),
+        "admission_total": ("counter", "启动准入次数（按结果 admitted/timeout/cancelled/error）"),
+        "admission_wait_seconds": ("histogram", "等待启动准入的耗时"),
+        "startup_overruns_total": ("counter", "启动步骤超过汇合时限的次数（按步骤）"),
+        "ui_stalls_total": ("counter", "界面事件循环卡顿次数（需开启卡顿监测）"),
+        "ui_stall_seconds": ("histogram", "界面事件循环卡顿时长"),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_MetricKey, float] = {}
+        self._histograms: Dict[_MetricKey, _Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+
+    @staticmethod
+    def _labels(pairs, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        items = tuple(pairs) + extra
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, text) in self.HELP.items():
+                full = f"{METRICS_PREFIX}_{name}"
+                counters = sorted((labels, v) for (n, labels), v in self._counters.items() if n == name)
+                histograms = sorted(
+                    ((labels, h) for (n, labels), h in self._histograms.items() if n == name),
+                    key=lambda item: item[0]
+                )
+                if not counters and not histograms:
+                    continue
+                lines.append(f"# HELP {full} {text}")
+                lines.append(f"# TYPE {full} {kind}")
+                for labels, value in counters:
+                    lines.append(f"{full}{self._labels(labels)} {value:g}")
+                for labels, hist in histograms:
+                    cumulative = 0
+                    for bound, n in zip(hist.buckets, hist.counts):
+                        cumulative += n
+                        lines.append(f"{full}_bucket{self._labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{full}_bucket{self._labels(labels, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{full}_sum{self._labels(labels)} {hist.total:.6f}")
+                    lines.append(f"{full}_count{self._labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = [
+                {"name": n, "labels": dict(labels), "value": v}
+                for (n, labels), v in sorted(self._counters.items())
+            ]
+            histograms = [
+                {
+                    "name": n, "labels": dict(labels), "count": h.count, "sum": round(h.total, 6),
+                    "buckets": dict(zip([f"{b:g}" for b in h.buckets] + ["+Inf"], h.counts)),
+                }
+                for (n, labels), h in sorted(self._histograms.items(), key=lambda kv: kv[0])
+            ]
+        return {"generated": int(time.time()), "counters": counters, "histograms": histograms}
+
+    def export(self, prom_path: Optional[Path] = None, json_path: Optional[Path] = None):
+        targets = (
+            (prom_path or METRICS_PROM_PATH, self.render_prometheus()),
+            (json_path or METRICS_JSON_PATH, json.dumps(self.snapshot(), ensure_ascii=False, indent=2)),
+        )
+        try:
+            for path, text in targets:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # 先写临时文件再替换，采集端不会读到写了一半的内容
+                tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp, path)
+        except Exception as e:
+            log.warning("导出性能计数失败：%s", e)
+
+
+METRICS = LauncherMetrics()
+
+
+def _verify_metric_path(path: Optional[str]) -> str:
+    if path in (VERIFY_PATH_V2_PERMANENT, VERIFY_PATH_V2_TABLE, VERIFY_PATH_V2_CACHE, VERIFY_PATH_V2_SHARED):
+        return "v2"
+    if path in (VERIFY_PATH_V1, VERIFY_PATH_V3, VERIFY_PATH_REVOKED):
+        return path
+    return "miss"
+
+# ======================= 冷启动预读 =======================
+PREFETCH_MANIFEST_PATH = CONFIG_DIR / "prefetch.json"
+PREFETCH_CHUNK_SIZE = 1 << 20
+PREFETCH_MAX_FILES = 256
+PREFETCH_DEFAULTS = {"enabled": True, "method": "auto", "max_mb": 512, "learn": True}
+# 尚未学习到清单时，预读 iBase.exe 同目录下的这些文件
+PREFETCH_FALLBACK_SUFFIXES = (".dll", ".dat")
+
+
+def _prefetch_settings(cfg: dict) -> dict:
+    settings = dict(PREFETCH_DEFAULTS)
+    user = cfg.get("prefetch")
+    if isinstance(user, dict):
+        settings.update(user)
+    elif user is False:
+        settings["enabled"] = False
+    return settings
+
+
+def _load_prefetch_manifest() -> dict:
+    try:
+        data = json.loads((read_config_file(PREFETCH_MANIFEST_PATH) or b"{}").decode("utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _prefetch_candidates(manifest: dict) -> list:
+    root = base_dir()
+    files = [IBASE_EXE_PATH]
+    learned = manifest.get("files")
+    if isinstance(learned, list) and learned:
+        files += [root / name for name in learned if isinstance(name, str)]
+    else:
+        try:
+            files += sorted(
+                p for p in root.iterdir()
+                if p.suffix.lower() in PREFETCH_FALLBACK_SUFFIXES and p.is_file()
+            )
+        except OSError:
+            pass
+    seen = set()
+    unique = []
+    for path in files:
+        key = os.path.normcase(str(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique[:PREFETCH_MAX_FILES]
+
+
+class Prefetcher:
+    """在后台线程中把 iBase.exe 及其依赖文件读入页缓存，与授权校验、加载窗口并行。"""
+
+    def __init__(self, files: list, method: str = "auto", max_bytes: int = 512 << 20):
+        self.files = files
+        if method == "auto":
+            method = "fadvise" if hasattr(os, "posix_fadvise") else "read"
+        self.method = method
+        self.max_bytes = max_bytes
+        self.bytes_warmed = 0
+        self.files_warmed = 0
+        self.elapsed = 0.0
+        self.ahead = 0.0
+        self.complete_at_launch = False
+        self._started = 0.0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+
+    def start(self) -> "Prefetcher":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _warm(self, path: Path, budget: int) -> int:
+        with open(path, "rb", buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if self.method == "fadvise":
+                os.posix_fadvise(f.fileno(), 0, min(size, budget), os.POSIX_FADV_WILLNEED)
+                return min(size, budget)
+            buf = bytearray(PREFETCH_CHUNK_SIZE)
+            view = memoryview(buf)
+            total = 0
+            while total < budget:
+                n = f.readinto(view)
+                if not n:
+                    break
+                total += n
+            return min(total, budget)
+
+    def _run(self):
+        try:
+            for path in self.files:
+                budget = self.max_bytes - self.bytes_warmed
+                if budget <= 0:
+                    break
+                try:
+                    self.bytes_warmed += self._warm(path, budget)
+                    self.files_warmed += 1
+                except OSError:
+                    continue
+        finally:
+            self.elapsed = time.perf_counter() - self._started
+            self._done.set()
+
+    def mark_launch(self):
+        # 记录启动子进程前预读已进行的时长，即与授权校验、加载窗口重叠的部分。
+        # 这只是从关键路径上移开的读盘时间的上限，实际节省需对比冷启动前后的 spawn 耗时
+        if self._started:
+            self.complete_at_launch = self._done.is_set()
+            self.ahead = self.elapsed if self.complete_at_launch else time.perf_counter() - self._started
+
+    def report(self) -> dict:
+        return {
+            "method": self.method,
+            "files": self.files_warmed,
+            "bytes": self.bytes_warmed,
+            "elapsed_ms": round(self.elapsed * 1000.0, 2),
+            "ahead_of_launch_ms": round(self.ahead * 1000.0, 2),
+            "complete_at_launch": self.complete_at_launch,
+        }
+
+
+def start_prefetch(cfg: dict) -> Optional[Prefetcher]:
+    settings = _prefetch_settings(cfg)
+    if not settings.get("enabled"):
+        return None
+    files = _prefetch_candidates(_load_prefetch_manifest())
+    max_bytes = int(float(settings.get("max_mb", PREFETCH_DEFAULTS["max_mb"])) * (1 << 20))
+    return Prefetcher(files, str(settings.get("method", "auto")), max_bytes).start()
+
+
+def _open_process(access: int, pid: int):
+    """打开进程句柄；OpenProcess 默认按 int 返回，64 位下句柄会被截断，因此按指针宽度声明原型。"""
+    import ctypes
+    from ctypes import wintypes
+    k32 = ctypes.windll.kernel32
+    k32.OpenProcess.restype = wintypes.HANDLE
+    k32.OpenProcess.argtypes = (wintypes.DWORD, wintypes.BOOL, wintypes.DWORD)
+    handle = k32.OpenProcess(access, False, pid)
+    if not handle:
+        raise OSError(f"无法打开进程 {pid}")
+    # 包装成 HANDLE 再传给未声明 argtypes 的函数，避免按 int 传参
+    return wintypes.HANDLE(handle)
+
+
+def _process_file_paths(pid: int) -> list:
+    """列出子进程已映射/打开的文件（Linux 读 /proc，Windows 枚举已加载模块）。"""
+    paths = []
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            k32 = ctypes.windll.kernel32
+            psapi = ctypes.windll.psapi
+            handle = _open_process(0x0400 | 0x0010, pid)  # QUERY_INFORMATION | VM_READ
+            try:
+                mods = (wintypes.HMODULE * 1024)()
+                needed = wintypes.DWORD()
+                if psapi.EnumProcessModulesEx(handle, mods, ctypes.sizeof(mods), ctypes.byref(needed), 0x03):
+                    buf = ctypes.create_unicode_buffer(32768)
+                    for i in range(min(1024, needed.value // ctypes.sizeof(wintypes.HMODULE))):
+                        if psapi.GetModuleFileNameExW(handle, mods[i], buf, len(buf)):
+                            paths.append(buf.value)
+            finally:
+                k32.CloseHandle(handle)
+        except Exception:
+            pass
+        return paths
+    try:
+        with open(f"/proc/{pid}/maps", "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields = line.split(None, 5)
+                if len(fields) == 6 and fields[5].startswith("/"):
+                    paths.append(fields[5].strip())
+    except OSError:
+        pass
+    try:
+        fd_dir = f"/proc/{pid}/fd"
+        for fd in os.listdir(fd_dir):
+            try:
+                target = os.readlink(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if target.startswith("/"):
+                paths.append(target)
+    except OSError:
+        pass
+    return paths
+
+
+def learn_prefetch_manifest(pid: int, report: Optional[dict] = None) -> None:
+    """根据本次启动子进程实际访问的文件更新预读清单，供下次冷启动使用。"""
+    root = os.path.normcase(str(base_dir().resolve()))
+    touched = []
+    for raw in _process_file_paths(pid):
+        try:
+            full = os.path.normcase(str(Path(raw).resolve()))
+        except OSError:
+            continue
+        if full.startswith(root + os.sep) and os.path.isfile(full):
+            rel = os.path.relpath(full, root)
+            if rel not in touched and os.path.normcase(rel) != os.path.normcase(IBASE_EXE_PATH.name):
+                touched.append(rel)
+    manifest = _load_prefetch_manifest()
+    previous = manifest.get("files") if isinstance(manifest.get("files"), list) else []
+    if touched:
+        # 本次访问过的文件排在前面，旧条目保留在后面直至超出上限
+        merged = touched + [name for name in previous if name not in touched]
+        manifest["files"] = merged[:PREFETCH_MAX_FILES]
+    if report is not None:
+        manifest["last"] = report
+    try:
+        write_config_file(PREFETCH_MANIFEST_PATH, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
     except Exception as e:
-        print("保存配置失败：", e)
+        log.warning("保存预读清单失败：%s", e)
+
+# ======================= 完整性校验 =======================
+INTEGRITY_CACHE_PATH = CONFIG_DIR / "integrity.json"
+INTEGRITY_CHUNK_SIZE = 8 << 20
+# mode：off 不校验；before 启动前校验；after 元数据变化时先启动、随后在后台重新计算。
+# 没有期望摘要时无从发现篡改，默认跳过计算并告警；record 为 True 时仍计算并记录摘要
+INTEGRITY_DEFAULTS = {"mode": "before", "sha256": "", "record": False}
+
+
+def hash_file_mmap(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(0, size, INTEGRITY_CHUNK_SIZE):
+                    h.update(view[offset:offset + INTEGRITY_CHUNK_SIZE])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+class ExeIntegrity:
+    """
+    iBase.exe 完整性校验：以 (size, mtime, inode) 为键缓存摘要，元数据不变时不重新计算。
+    期望摘要取自配置 integrity.sha256 或同目录的 iBase.exe.sha256；两者皆无时不校验（record 开启时仅记录摘要）。
+    """
+
+    def __init__(self, cfg: Optional[dict] = None, path: Optional[Path] = None):
+        self.path = path or IBASE_EXE_PATH
+        self.settings = dict(INTEGRITY_DEFAULTS)
+        user = (cfg or {}).get("integrity")
+        if isinstance(user, dict):
+            self.settings.update(user)
+        self.digest: Optional[str] = None
+        self.rehashed = False
+
+    @property
+    def mode(self) -> str:
+        return str(self.settings.get("mode", "before")).lower()
+
+    def _expected(self) -> Optional[str]:
+        pinned = str(self.settings.get("sha256") or "").strip().lower()
+        if pinned:
+            return pinned
+        sidecar = self.path.with_name(self.path.name + ".sha256")
+        try:
+            with open(sidecar, "r", encoding="utf-8") as f:
+                token = f.read().split()
+            return token[0].lower() if token else None
+        except OSError:
+            return None
+
+    def _fingerprint(self) -> dict:
+        st = os.stat(self.path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "inode": st.st_ino}
+
+    @staticmethod
+    def _load_cache() -> dict:
+        try:
+            data = json.loads((read_config_file(INTEGRITY_CACHE_PATH) or b"{}").decode("utf-8"))
+            return data if isinstance(data, dict) else {}
+        except Exception:
+            return {}
+
+    def _store(self, fingerprint: dict, digest: str):
+        record = dict(fingerprint, path=str(self.path), sha256=digest)
+        try:
+            write_config_file(INTEGRITY_CACHE_PATH, json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"))
+        except Exception as e:
+            log.warning("保存完整性缓存失败：%s", e)
+
+    def _cached_digest(self, fingerprint: dict) -> Optional[str]:
+        cache = self._load_cache()
+        if cache.get("path") != str(self.path):
+            return None
+        if any(cache.get(k) != v for k, v in fingerprint.items()):
+            return None
+        digest = cache.get("sha256")
+        return digest if isinstance(digest, str) else None
+
+    def _verdict(self, digest: str) -> bool:
+        expected = self._expected()
+        return expected is None or hmac.compare_digest(digest, expected)
+
+    def rehash(self) -> bool:
+        fingerprint = self._fingerprint()
+        digest = hash_file_mmap(self.path)
+        # 计算期间文件若被替换，则以计算前的元数据为准，下次启动会重新计算
+        self._store(fingerprint, digest)
+        self.digest = digest
+        self.rehashed = True
+        return self._verdict(digest)
+
+    def preflight(self) -> Tuple[bool, bool]:
+        """返回 (是否允许启动, 是否需要在启动后后台重新计算)。"""
+        if self.mode == "off":
+            return True, False
+        if self._expected() is None and not self.settings.get("record"):
+            log.warning("未配置 iBase.exe 期望摘要（integrity.sha256 或 %s.sha256），跳过完整性校验", self.path.name)
+            return True, False
+        try:
+            fingerprint = self._fingerprint()
+        except OSError:
+            return False, False
+        cached = self._cached_digest(fingerprint)
+        if cached is not None:
+            self.digest = cached
+            return self._verdict(cached), False
+        if self.mode == "after":
+            return True, True
+        try:
+            return self.rehash(), False
+        except OSError:
+            return False, False
+
+    def rehash_in_background(self) -> threading.Thread:
+        def run():
+            try:
+                if not self.rehash():
+                    log.error("iBase.exe 完整性校验失败，下次启动将被阻止")
+            except OSError as e:
+                log.error("iBase.exe 完整性校验出错：%s", e)
+        t = threading.Thread(target=run, name="integrity", daemon=True)
+        t.start()
+        return t
+
+# ======================= 子进程监控 =======================
+MONITOR_PATH = LOG_DIR / "ibase_samples.bin"
+# 默认关闭；启用后启动器在 iBase 运行期间常驻（无窗口），按 interval_ms 采样，环形文件保留最近 slots 条
+MONITOR_DEFAULTS = {"enabled": False, "interval_ms": 1000, "slots": 3600}
+MONITOR_MIN_INTERVAL_MS = 100
+MONITOR_JOIN_TIMEOUT = 5.0
+
+
+def _monitor_settings(cfg: dict) -> dict:
+    settings = dict(MONITOR_DEFAULTS)
+    user = cfg.get("monitor")
+    if isinstance(user, dict):
+        settings.update(user)
+    elif user is True:
+        settings["enabled"] = True
+    return settings
+
+
+class _ProcfsSampler:
+    """Linux：/proc/<pid>/stat、/proc/<pid>/io 与 /proc/stat 常开，每次采样各 pread 一次。"""
+
+    def __init__(self, pid: int):
+        self._fds = {"stat": os.open(f"/proc/{pid}/stat", os.O_RDONLY)}
+        for name, path in (("io", f"/proc/{pid}/io"), ("host", "/proc/stat")):
+            try:
+                self._fds[name] = os.open(path, os.O_RDONLY)
+            except OSError:
+                pass  # 部分内核或容器中不可读，对应字段记为 0
+        self._tick = float(os.sysconf("SC_CLK_TCK"))
+        self._page = os.sysconf("SC_PAGE_SIZE")
+
+    def _read(self, name: str) -> Optional[bytes]:
+        fd = self._fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, 4096, 0)
+        except OSError:
+            return None
+
+    def sample(self) -> Optional[Tuple[float, float, int, int, int, int]]:
+        """返回 (用户态 CPU 秒, 内核态 CPU 秒, 常驻内存字节, 线程数, 读字节, 写字节)；进程已退出时返回 None。"""
+        raw = self._read("stat")
+        if not raw:
+            return None
+        # 进程名可能含空格或括号，字段从最后一个 ')' 之后开始计
+        fields = raw[raw.rindex(b")") + 2:].split()
+        if fields[0] in (b"Z", b"X"):
+            return None
+        read_bytes = write_bytes = 0
+        io = self._read("io")
+        if io:
+            # rchar / wchar 包含缓存命中，与 Windows 的 Read/WriteTransferCount 口径一致
+            for line in io.splitlines():
+                if line.startswith(b"rchar:"):
+                    read_bytes = int(line[6:])
+                elif line.startswith(b"wchar:"):
+                    write_bytes = int(line[6:])
+        return (int(fields[11]) / self._tick, int(fields[12]) / self._tick,
+                int(fields[21]) * self._page, int(fields[17]), read_bytes, write_bytes)
+
+    def host_cpu(self) -> Optional[Tuple[int, int]]:
+        """返回本机累计 (忙碌, 总计) CPU 时间片，用于计算两次采样间的整机负载。"""
+        raw = self._read("host")
+        if not raw:
+            return None
+        ticks = [int(v) for v in raw.split(b"\n", 1)[0].split()[1:9]]
+        total = sum(ticks)
+        return total - ticks[3] - ticks[4], total
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+
+class _WindowsSampler:
+    """Windows：GetProcessTimes / GetProcessMemoryInfo / GetProcessIoCounters，线程数取自进程快照。"""
+
+    def __init__(self, pid: int):
+        import ctypes
+        from ctypes import wintypes
+
+        class MemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        class ProcessEntry(ctypes.Structure):
+            _fields_ = [("dwSize", wintypes.DWORD), ("cntUsage", wintypes.DWORD),
+                        ("th32ProcessID", wintypes.DWORD), ("th32DefaultHeapID", ctypes.c_size_t),
+                        ("th32ModuleID", wintypes.DWORD), ("cntThreads", wintypes.DWORD),
+                        ("th32ParentProcessID", wintypes.DWORD), ("pcPriClassBase", wintypes.LONG),
+                        ("dwFlags", wintypes.DWORD), ("szExeFile", wintypes.WCHAR * 260)]
+
+        self._ct = ctypes
+        self._k32 = ctypes.windll.kernel32
+        self._pid = pid
+        self._handle = _open_process(0x1000 | 0x0010, pid)  # QUERY_LIMITED_INFORMATION | VM_READ
+        self._k32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+        self._times = (ctypes.c_ulonglong * 4)()
+        self._io = (ctypes.c_ulonglong * 6)()
+        self._mem = MemoryCounters()
+        self._mem.cb = ctypes.sizeof(MemoryCounters)
+        self._entry = ProcessEntry()
+        self._entry_size = ctypes.sizeof(ProcessEntry)
+        self._exit_code = wintypes.DWORD()
+        self._host = (ctypes.c_ulonglong * 3)()
+
+    def _threads(self) -> int:
+        snapshot = self._k32.CreateToolhelp32Snapshot(0x2, 0)  # TH32CS_SNAPPROCESS
+        if snapshot in (None, self._ct.c_void_p(-1).value):
+            return 0
+        snapshot = self._ct.c_void_p(snapshot)
+        try:
+            entry = self._entry
+            entry.dwSize = self._entry_size
+            ok = self._k32.Process32FirstW(snapshot, self._ct.byref(entry))
+            while ok:
+                if entry.th32ProcessID == self._pid:
+                    return int(entry.cntThreads)
+                ok = self._k32.Process32NextW(snapshot, self._ct.byref(entry))
+            return 0
+        finally:
+            self._k32.CloseHandle(snapshot)
+
+    def sample(self) -> Optional[Tuple[float, float, int, int, int, int]]:
+        ct, k32 = self._ct, self._k32
+        if not k32.GetExitCodeProcess(self._handle, ct.byref(self._exit_code)) or self._exit_code.value != 259:
+            return None  # 259 = STILL_ACTIVE
+        t = self._times
+        if not k32.GetProcessTimes(self._handle, ct.byref(t, 0), ct.byref(t, 8), ct.byref(t, 16), ct.byref(t, 24)):
+            return None
+        rss = self._mem.WorkingSetSize if k32.K32GetProcessMemoryInfo(
+            self._handle, ct.byref(self._mem), self._mem.cb) else 0
+        io = self._io
+        if not k32.GetProcessIoCounters(self._handle, ct.byref(io)):
+            io[3] = io[4] = 0
+        # FILETIME 以 100 ns 为单位
+        return t[3] / 1e7, t[2] / 1e7, int(rss), self._threads(), int(io[3]), int(io[4])
+
+    def host_cpu(self) -> Optional[Tuple[int, int]]:
+        h = self._host
+        ct = self._ct
+        if not self._k32.GetSystemTimes(ct.byref(h, 0), ct.byref(h, 8), ct.byref(h, 16)):
+            return None
+        # 内核时间包含空闲时间
+        total = h[1] + h[2]
+        return total - h[0], total
+
+    def close(self):
+        if self._handle:
+            self._k32.CloseHandle(self._handle)
+            self._handle = None
+
+
+def _open_sampler(pid: int):
+    if os.name == "nt":
+        return _WindowsSampler(pid)
+    if os.path.isdir("/proc"):
+        return _ProcfsSampler(pid)
+    raise OSError("当前平台不支持子进程采样")
+
+
+class SampleRing:
+    """
+    定长环形采样文件：文件头记录槽位数与累计写入条数，第 n 条写入槽位 n % slots。
+    文件预先分配并映射到内存，每次写入只修改一条记录与文件头，不产生额外系统调用。
+    """
+    MAGIC = b"IBMR"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIIQ8x")        # magic, version, 记录长度, 槽位数, 采样间隔 ms, 累计条数
+    RECORD = struct.Struct("<dIIddQQQf4x")      # 时间戳, pid, 线程数, 用户态秒, 内核态秒, 常驻内存, 读字节, 写字节, 整机 CPU%
+    FIELDS = ("ts", "pid", "threads", "cpu_user_s", "cpu_system_s", "rss_bytes", "read_bytes", "write_bytes",
+              "host_cpu_percent")
+
+    def __init__(self, path: Path, slots: int, interval_ms: int):
+        self.path = path
+        self.slots = max(1, int(slots))
+        size = self.HEADER.size + self.slots * self.RECORD.size
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "r+b" if path.exists() else "w+b") as f:
+            head = f.read(self.HEADER.size)
+            written = 0
+            if len(head) == self.HEADER.size:
+                magic, version, rec_size, old_slots, _interval, count = self.HEADER.unpack(head)
+                # 格式一致时续写，否则重建
+                if (magic, version, rec_size, old_slots) == (self.MAGIC, self.VERSION, self.RECORD.size, self.slots):
+                    written = count
+            f.truncate(size)
+            self._mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE)
+        self.written = written
+        self.interval_ms = int(interval_ms)
+        self._write_header()
+
+    def _write_header(self):
+        self.HEADER.pack_into(self._mm, 0, self.MAGIC, self.VERSION, self.RECORD.size, self.slots,
+                              self.interval_ms, self.written)
+
+    def append(self, *values):
+        offset = self.HEADER.size + (self.written % self.slots) * self.RECORD.size
+        self.RECORD.pack_into(self._mm, offset, *values)
+        # 先写记录再推进计数，读取方不会看到写了一半的槽位
+        self.written += 1
+        self._write_header()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+
+    @classmethod
+    def read(cls, path: Path) -> list:
+        """按时间顺序返回环形文件中的全部采样。"""
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < cls.HEADER.size:
+            return []
+        magic, version, rec_size, slots, _interval, written = cls.HEADER.unpack_from(data, 0)
+        if magic != cls.MAGIC or version != cls.VERSION or rec_size != cls.RECORD.size:
+            raise ValueError("采样文件格式无效")
+        count = min(written, slots)
+        first = written - count
+        samples = []
+        for n in range(first, written):
+            offset = cls.HEADER.size + (n % slots) * rec_size
+            if offset + rec_size > len(data):
+                break
+            samples.append(dict(zip(cls.FIELDS, cls.RECORD.unpack_from(data, offset))))
+        return samples
+
+
+def read_monitor_samples(path: Optional[Path] = None) -> list:
+    return SampleRing.read(path or MONITOR_PATH)
+
+
+class ProcessMonitor:
+    """
+    子进程资源监控：后台线程按固定间隔采样 CPU 时间、常驻内存、线程数与 I/O 字节数，
+    连同整机 CPU 负载写入环形文件，便于把 iBase 卡顿与机器负载对照；子进程退出后自动结束。
+    """
+
+    def __init__(self, pid: int, interval_ms: int = MONITOR_DEFAULTS["interval_ms"],
+                 slots: int = MONITOR_DEFAULTS["slots"], path: Optional[Path] = None,
+                 process: Optional[subprocess.Popen] = None):
+        self.pid = pid
+        self.interval = max(MONITOR_MIN_INTERVAL_MS, int(interval_ms)) / 1000.0
+        self.slots = slots
+        self.path = path or MONITOR_PATH
+        self.process = process
+        self.samples = 0
+        self.overhead = 0.0
+        self._peak_rss = 0
+        self._peak_threads = 0
+        self._last: Optional[tuple] = None
+        self._host_sum = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = time.monotonic()
+
+    def start(self) -> "ProcessMonitor":
+        self._thread = threading.Thread(target=self._run, name="monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _exited(self) -> bool:
+        # 子进程由本进程创建时用 poll() 判断（顺带回收僵尸进程），否则以采样失败为准
+        return self.process is not None and self.process.poll() is not None
+
+    def _run(self):
+        try:
+            sampler = _open_sampler(self.pid)
+        except OSError as e:
+            log.warning("无法监控子进程 %s：%s", self.pid, e)
+            return
+        try:
+            ring = SampleRing(self.path, self.slots, int(self.interval * 1000))
+        except (OSError, ValueError) as e:
+            log.warning("无法打开采样文件 %s：%s", self.path, e)
+            sampler.close()
+            return
+        host_prev = sampler.host_cpu()
+        try:
+            while not self._exited():
+                start = time.perf_counter()
+                values = sampler.sample()
+                if values is None:
+                    break
+                host_now = sampler.host_cpu()
+                host_pct = 0.0
+                if host_prev and host_now and host_now[1] > host_prev[1]:
+                    host_pct = (host_now[0] - host_prev[0]) * 100.0 / (host_now[1] - host_prev[1])
+                host_prev = host_now
+                ring.append(time.time(), self.pid, values[3], values[0], values[1],
+                            values[2], values[4], values[5], host_pct)
+                self.samples += 1
+                self._last = values
+                self._peak_rss = max(self._peak_rss, values[2])
+                self._peak_threads = max(self._peak_threads, values[3])
+                self._host_sum += host_pct
+                self.overhead += time.perf_counter() - start
+                if self._stop.wait(self.interval):
+                    break
+        except Exception as e:
+            log.warning("子进程采样中断：%s", e)
+        finally:
+            ring.close()
+            sampler.close()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待子进程退出（采样线程结束）；超时返回 False。"""
+        if self._thread is None:
+            return True
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        self.wait(MONITOR_JOIN_TIMEOUT)
+
+    def summary(self) -> dict:
+        last = self._last or (0.0, 0.0, 0, 0, 0, 0)
+        return {
+            "pid": self.pid,
+            "samples": self.samples,
+            "duration_s": round(time.monotonic() - self._started, 1),
+            "cpu_s": round(last[0] + last[1], 2),
+            "peak_rss_mb": round(self._peak_rss / (1 << 20), 1),
+            "peak_threads": self._peak_threads,
+            "read_mb": round(last[4] / (1 << 20), 1),
+            "write_mb": round(last[5] / (1 << 20), 1),
+            "host_cpu_avg_percent": round(self._host_sum / self.samples, 1) if self.samples else 0.0,
+            "overhead_ms_per_sample": round(self.overhead / self.samples * 1000.0, 3) if self.samples else 0.0,
+        }
+
+
+def start_monitor(cfg: dict, launch: dict) -> Optional[ProcessMonitor]:
+    settings = _monitor_settings(cfg)
+    if not settings.get("enabled") or not launch.get("pid"):
+        return None
+    return ProcessMonitor(
+        launch["pid"], int(settings.get("interval_ms", MONITOR_DEFAULTS["interval_ms"])),
+        int(settings.get("slots", MONITOR_DEFAULTS["slots"])), process=launch.get("process")
+    ).start()
+
+# ======================= 调度设置 =======================
+# priority：idle / below_normal / normal / above_normal / high，或 nice 值（-20–19）
+# affinity：CPU 编号列表、"0-3,6" 形式的字符串或位掩码（整数或 "0x0F"）
+# io_priority：idle / low / normal / high
+# 全局写在 config.json 的 scheduling 中；bind.scheduling 中的同名项覆盖全局设置
+SCHEDULING_DEFAULTS = {"priority": None, "affinity": None, "io_priority": None}
+PRIORITY_NICE = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5, "high": -10}
+PRIORITY_CLASS_FLAGS = {"idle": 0x40, "below_normal": 0x4000, "normal": 0x20, "above_normal": 0x8000, "high": 0x80}
+# Linux 的 (class, level)：class 2 为 best-effort，3 为 idle；Windows 的 IoPriority 取值 0–3
+IO_PRIORITY_LINUX = {"idle": (3, 0), "low": (2, 7), "normal": (2, 4), "high": (2, 0)}
+IO_PRIORITY_WINDOWS = {"idle": 0, "low": 1, "normal": 2, "high": 3}
+_IOPRIO_SYSCALLS = {"x86_64": (251, 252), "amd64": (251, 252), "aarch64": (30, 31), "arm64": (30, 31),
+                    "i386": (289, 290), "i686": (289, 290), "armv7l": (314, 315)}
+
+
+def _scheduling_settings(cfg: dict) -> dict:
+    settings = dict(SCHEDULING_DEFAULTS)
+    bind = cfg.get("bind")
+    for source in (cfg.get("scheduling"), bind.get("scheduling") if isinstance(bind, dict) else None):
+        if isinstance(source, dict):
+            settings.update({k: v for k, v in source.items() if k in settings})
+    return settings
+
+
+def _parse_affinity(value) -> Optional[list]:
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(value)
+    if isinstance(value, int) or (isinstance(value, str) and value.strip().lower().startswith("0x")):
+        mask = value if isinstance(value, int) else int(value, 16)
+        cpus = [i for i in range(mask.bit_length()) if mask >> i & 1]
+    elif isinstance(value, str):
+        cpus = []
+        for part in filter(None, (p.strip() for p in value.split(","))):
+            lo, _, hi = part.partition("-")
+            cpus.extend(range(int(lo), int(hi or lo) + 1))
+    elif isinstance(value, list):
+        cpus = [int(v) for v in value]
+    else:
+        raise ValueError(value)
+    if not cpus or min(cpus) < 0:
+        raise ValueError(value)
+    return sorted(set(cpus))
+
+
+def _ioprio_syscall(op: int, tid: int, value: int = 0) -> int:
+    import ctypes
+    numbers = _IOPRIO_SYSCALLS.get(platform.machine().lower())
+    if numbers is None:
+        raise OSError(f"不支持的架构：{platform.machine()}")
+    libc = ctypes.CDLL(None, use_errno=True)
+    args = (numbers[op], 1, tid) + ((value,) if op == 0 else ())  # 1 = IOPRIO_WHO_PROCESS
+    result = libc.syscall(*args)
+    if result < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    return result
+
+
+class SchedulingPolicy:
+    """
+    子进程调度设置：Windows 的优先级类经 creationflags 在创建时生效；
+    nice、CPU 亲和性与 I/O 优先级在创建后立即应用到子进程的全部线程，并回读实际值供记录。
+    """
+
+    def __init__(self, settings: dict):
+        self.errors = []
+        self.priority: Optional[str] = None
+        self.nice: Optional[int] = None
+        self.cpus: Optional[list] = None
+        self.io_priority: Optional[str] = None
+        priority = settings.get("priority")
+        if isinstance(priority, str) and priority.lower() in PRIORITY_NICE:
+            self.priority = priority.lower()
+            self.nice = PRIORITY_NICE[self.priority]
+        elif isinstance(priority, int) and not isinstance(priority, bool) and -20 <= priority <= 19:
+            self.nice = priority
+            # nice 值折算为最接近的 Windows 优先级类
+            self.priority = min(PRIORITY_NICE, key=lambda name: abs(PRIORITY_NICE[name] - priority))
+        elif priority is not None:
+            self.errors.append(f"无效的优先级：{priority}")
+        try:
+            self.cpus = _parse_affinity(settings.get("affinity"))
+        except (TypeError, ValueError):
+            self.errors.append(f"无效的 CPU 亲和性：{settings.get('affinity')}")
+        io = settings.get("io_priority")
+        if isinstance(io, str) and io.lower() in IO_PRIORITY_LINUX:
+            self.io_priority = io.lower()
+        elif io is not None:
+            self.errors.append(f"无效的 I/O 优先级：{io}")
+        for message in self.errors:
+            log.warning("调度设置已忽略：%s", message)
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "SchedulingPolicy":
+        return cls(_scheduling_settings(cfg))
+
+    def __bool__(self) -> bool:
+        return self.priority is not None or self.cpus is not None or self.io_priority is not None
+
+    def requested(self) -> dict:
+        return {"priority": self.priority, "nice": self.nice, "affinity": self.cpus, "io_priority": self.io_priority}
+
+    def creationflags(self) -> int:
+        return PRIORITY_CLASS_FLAGS[self.priority] if os.name == "nt" and self.priority else 0
+
+    def apply(self, pid: int) -> dict:
+        """应用设置并返回 {"requested", "effective", "errors"}；失败不影响启动。"""
+        errors = list(self.errors)
+        try:
+            effective = self._apply_windows(pid, errors) if os.name == "nt" else self._apply_posix(pid, errors)
+        except Exception as e:
+            errors.append(str(e))
+            effective = {}
+        for message in errors[len(self.errors):]:
+            log.warning("调度设置未完全生效：%s", message)
+        return {"requested": self.requested(), "effective": effective, "errors": errors}
+
+    def _usable_cpus(self, available: list, errors: list) -> Optional[list]:
+        cpus = [c for c in self.cpus if c in available]
+        if len(cpus) < len(self.cpus):
+            errors.append(f"CPU {sorted(set(self.cpus) - set(cpus))} 不可用")
+        return cpus or None
+
+    def _apply_posix(self, pid: int, errors: list) -> dict:
+        # Linux 上 nice、亲和性与 I/O 优先级都按线程生效，子进程此时可能已创建线程，需逐一设置
+        try:
+            tids = [int(t) for t in os.listdir(f"/proc/{pid}/task")]
+        except OSError:
+            tids = [pid]
+        cpus = None
+        if self.cpus is not None:
+            if hasattr(os, "sched_setaffinity"):
+                cpus = self._usable_cpus(sorted(os.sched_getaffinity(0)), errors)
+            else:
+                errors.append("当前平台不支持设置 CPU 亲和性")
+        steps = []
+        if self.nice is not None:
+            steps.append(("nice", lambda tid: os.setpriority(os.PRIO_PROCESS, tid, self.nice)))
+        if cpus:
+            steps.append(("affinity", lambda tid: os.sched_setaffinity(tid, cpus)))
+        if self.io_priority is not None:
+            klass, level = IO_PRIORITY_LINUX[self.io_priority]
+            steps.append(("io_priority", lambda tid: _ioprio_syscall(0, tid, klass << 13 | level)))
+        for name, step in steps:
+            failed = None
+            for tid in tids:
+                try:
+                    step(tid)
+                except OSError as e:
+                    failed = e
+            if failed is not None:
+                errors.append(f"{name}：{failed}")
+
+        effective = {}
+        try:
+            effective["nice"] = os.getpriority(os.PRIO_PROCESS, pid)
+        except OSError:
+            pass
+        if hasattr(os, "sched_getaffinity"):
+            try:
+                effective["affinity"] = sorted(os.sched_getaffinity(pid))
+            except OSError:
+                pass
+        try:
+            value = _ioprio_syscall(1, pid)
+            klass, level = value >> 13, value & 0x1FFF
+            names = {v: k for k, v in IO_PRIORITY_LINUX.items()}
+            # class 0 表示未设置，由内核按 nice 值推算 best-effort 级别
+            effective["io_priority"] = "normal" if klass == 0 else names.get((klass, level), f"class{klass}/{level}")
+        except OSError:
+            pass
+        return effective
+
+    def _apply_windows(self, pid: int, errors: list) -> dict:
+        import ctypes
+        k32 = ctypes.windll.kernel32
+        ntdll = ctypes.windll.ntdll
+        handle = _open_process(0x0200 | 0x0400, pid)  # SET_INFORMATION | QUERY_INFORMATION
+        try:
+            proc_mask, sys_mask = ctypes.c_size_t(), ctypes.c_size_t()
+            k32.GetProcessAffinityMask(handle, ctypes.byref(proc_mask), ctypes.byref(sys_mask))
+            if self.cpus is not None:
+                available = [i for i in range(sys_mask.value.bit_length()) if sys_mask.value >> i & 1]
+                cpus = self._usable_cpus(available, errors)
+                if cpus and not k32.SetProcessAffinityMask(handle, ctypes.c_size_t(sum(1 << c for c in cpus))):
+                    errors.append(f"affinity：错误码 {k32.GetLastError()}")
+            io = ctypes.c_ulong()
+            if self.io_priority is not None:
+                io.value = IO_PRIORITY_WINDOWS[self.io_priority]
+                # ProcessIoPriority = 33；high 需要 SeIncreaseBasePriorityPrivilege
+                status = ntdll.NtSetInformationProcess(handle, 33, ctypes.byref(io), ctypes.sizeof(io))
+                if status:
+                    errors.append(f"io_priority：NTSTATUS 0x{status & 0xFFFFFFFF:08X}")
+
+            effective = {}
+            klass = k32.GetPriorityClass(handle)
+            names = {v: k for k, v in PRIORITY_CLASS_FLAGS.items()}
+            if klass in names:
+                effective["priority"] = names[klass]
+            if k32.GetProcessAffinityMask(handle, ctypes.byref(proc_mask), ctypes.byref(sys_mask)):
+                effective["affinity"] = [i for i in range(proc_mask.value.bit_length()) if proc_mask.value >> i & 1]
+            if ntdll.NtQueryInformationProcess(handle, 33, ctypes.byref(io), ctypes.sizeof(io), None) == 0:
+                effective["io_priority"] = {v: k for k, v in IO_PRIORITY_WINDOWS.items()}.get(io.value, io.value)
+            return effective
+        finally:
+            k32.CloseHandle(handle)
+
+# ======================= 启动准入 =======================
+# 同一主机上同时启动的 iBase 数量上限：槽位文件加字节锁实现计数信号量，持锁进程退出时锁自动释放；
+# 排队者各持一个票据文件，按文件名（创建时刻）先来先得。启动后槽位继续保留 settle_s 秒，等待磁盘读取平缓。
+ADMISSION_DIR_ENV = "IBASE_ADMISSION_DIR"
+ADMISSION_DEFAULTS = {"enabled": True, "max_concurrent": 2, "timeout_s": 120, "settle_s": 8}
+ADMISSION_POLL_INTERVAL = 0.1
+# 新票据在创建与加锁之间短暂无锁，此时间内不视为失效
+ADMISSION_TICKET_GRACE = 2.0
+# Windows 的字节锁是强制锁，锁定远离内容的偏移，不影响读取文件内容
+ADMISSION_LOCK_OFFSET = 1 << 20
+# Windows 下 chmod 只影响只读属性：目录创建时写入 DACL，SYSTEM / 管理员完全控制，
+# 已登录用户可修改（读写、删除），OICI 使其中新建的槽位与票据文件继承同样的权限
+ADMISSION_DIR_SDDL = "D:(A;OICI;FA;;;SY)(A;OICI;FA;;;BA)(A;OICI;0x1301bf;;;AU)"
+_RELEASE_AT = struct.Struct("<d")
+
+
+def _admission_settings(cfg: dict) -> dict:
+    settings = dict(ADMISSION_DEFAULTS)
+    user = cfg.get("admission")
+    if isinstance(user, dict):
+        settings.update(user)
+    elif user is False:
+        settings["enabled"] = False
+    return settings
+
+
+def _admission_dir() -> Path:
+    override = os.getenv(ADMISSION_DIR_ENV)
+    if override:
+        return Path(override)
+    program_data = os.getenv("PROGRAMDATA")
+    if program_data:
+        return Path(program_data) / APP_NAME / "admission"
+    import tempfile
+    return Path(tempfile.gettempdir()) / f"{APP_NAME}-admission"
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(fd, ADMISSION_LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            # flock 锁属于打开的文件描述，同一进程内关闭其它描述符不会连带释放
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd: int) -> None:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            os.lseek(fd, ADMISSION_LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    except OSError:
+        pass
+
+
+def _open_shared(path: Path) -> int:
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+    if os.name != "nt":
+        try:
+            # 不同用户的会话共用同一目录，需要互相可写才能加锁；Windows 上由目录 DACL 继承
+            os.chmod(path, 0o666)
+        except OSError:
+            pass
+    return fd
+
+
+def _make_shared_dir(path: Path) -> None:
+    """创建所有登录用户均可读写的目录；Windows 上通过 CreateDirectoryW 直接带上 ADMISSION_DIR_SDDL。"""
+    if os.name != "nt":
+        path.mkdir(parents=True, exist_ok=True)
+        try:
+            os.chmod(path, 0o1777)
+        except OSError:
+            pass
+        return
+    import ctypes
+    from ctypes import wintypes
+
+    class SecurityAttributes(ctypes.Structure):
+        _fields_ = [("nLength", wintypes.DWORD), ("lpSecurityDescriptor", ctypes.c_void_p),
+                    ("bInheritHandle", wintypes.BOOL)]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    advapi = ctypes.WinDLL("advapi32", use_last_error=True)
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    sd = ctypes.c_void_p()
+    if not advapi.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+            ctypes.c_wchar_p(ADMISSION_DIR_SDDL), 1, ctypes.byref(sd), None):  # SDDL_REVISION_1
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        attrs = SecurityAttributes(ctypes.sizeof(SecurityAttributes), sd, False)
+        if not k32.CreateDirectoryW(ctypes.c_wchar_p(str(path)), ctypes.byref(attrs)):
+            error = ctypes.get_last_error()
+            if error != 183:  # ERROR_ALREADY_EXISTS：其它会话同时创建
+                raise ctypes.WinError(error)
+    finally:
+        k32.LocalFree(sd)
+
+
+class AdmissionController:
+    """主机级启动准入：限制同时启动数，其余按先来先得排队，可超时。"""
+
+    def __init__(self, root: Path, max_concurrent: int, timeout_s: float, settle_s: float):
+        self.root = root
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.timeout = max(0.0, float(timeout_s))
+        self.settle = max(0.0, float(settle_s))
+        self.waited = 0.0
+        self.first_position: Optional[int] = None
+        self.outcome: Optional[str] = None
+        self.ticket: Optional[str] = None
+        self._slot_fd: Optional[int] = None
+        self._cancel = threading.Event()
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> Optional["AdmissionController"]:
+        settings = _admission_settings(cfg)
+        if not settings.get("enabled"):
+            return None
+        return cls(_admission_dir(), settings.get("max_concurrent", ADMISSION_DEFAULTS["max_concurrent"]),
+                   settings.get("timeout_s", ADMISSION_DEFAULTS["timeout_s"]),
+                   settings.get("settle_s", ADMISSION_DEFAULTS["settle_s"]))
+
+    def _prepare_root(self):
+        if not self.root.is_dir():
+            _make_shared_dir(self.root)
+
+    def _tickets_ahead(self, mine: str) -> int:
+        ahead = 0
+        now = time.time()
+        for name in sorted(os.listdir(self.root)):
+            if not name.startswith("t-") or name >= mine:
+                continue
+            path = self.root / name
+            try:
+                if now - path.stat().st_mtime < ADMISSION_TICKET_GRACE:
+                    ahead += 1
+                    continue
+                fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+            except OSError:
+                continue
+            try:
+                if _try_lock(fd):
+                    # 票据无人持锁：排队进程已退出，清理掉
+                    _unlock(fd)
+                    os.close(fd)
+                    fd = None
+                    path.unlink()
+                else:
+                    ahead += 1
+            except OSError:
+                pass
+            finally:
+                if fd is not None:
+                    os.close(fd)
+        return ahead
+
+    def _claim_slot(self, index: int, take: bool) -> bool:
+        """槽位空闲时返回 True；take 为真时保持锁并占用。"""
+        fd = _open_shared(self.root / f"slot-{index}")
+        if not _try_lock(fd):
+            os.close(fd)
+            return False
+        os.lseek(fd, 0, os.SEEK_SET)
+        raw = os.read(fd, _RELEASE_AT.size)
+        # 上一个持有者释放时写入的保留截止时间；崩溃退出的持有者留下 0，槽位立即可用
+        free = len(raw) < _RELEASE_AT.size or _RELEASE_AT.unpack(raw)[0] <= time.time()
+        if free and take:
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, _RELEASE_AT.pack(0.0))
+            self._slot_fd = fd
+            return True
+        _unlock(fd)
+        os.close(fd)
+        return free
+
+    def acquire(self, on_wait: Optional[Callable[[int], None]] = None) -> bool:
+        """
+        阻塞直至取得槽位；on_wait(position) 在排队名次变化时调用（1 为队首）。
+        超时或出错返回 False，调用方照常启动，只是不再受准入控制。
+        """
+        start = time.monotonic()
+        try:
+            self._prepare_root()
+            mine = self.ticket = f"t-{time.time_ns():020d}-{os.getpid()}"
+            ticket_path = self.root / mine
+            ticket = _open_shared(ticket_path)
+        except OSError as e:
+            log.warning("启动准入不可用：%s", e)
+            self.outcome = "error"
+            METRICS.inc("admission_total", result=self.outcome)
+            return False
+        _try_lock(ticket)
+        position = None
+        try:
+            while True:
+                ahead = self._tickets_ahead(mine)
+                free = [i for i in range(self.max_concurrent) if self._claim_slot(i, take=False)]
+                if ahead < len(free) and any(self._claim_slot(i, take=True) for i in free):
+                    self.outcome = "admitted"
+                    return True
+                if ahead + 1 != position:
+                    position = ahead + 1
+                    if self.first_position is None:
+                        self.first_position = position
+                    if on_wait is not None:
+                        on_wait(position)
+                if time.monotonic() - start >= self.timeout:
+                    log.warning("等待启动准入超时（%g 秒），直接启动", self.timeout)
+                    self.outcome = "timeout"
+                    return False
+                if self._cancel.wait(ADMISSION_POLL_INTERVAL):
+                    log.info("用户取消了排队启动")
+                    self.outcome = "cancelled"
+                    return False
+        except OSError as e:
+            log.warning("启动准入出错：%s", e)
+            self.outcome = "error"
+            return False
+        finally:
+            self.waited = time.monotonic() - start
+            METRICS.observe("admission_wait_seconds", self.waited)
+            METRICS.inc("admission_total", result=self.outcome)
+            _unlock(ticket)
+            os.close(ticket)
+            try:
+                ticket_path.unlink()
+            except OSError:
+                pass
+
+    def cancel(self):
+        """放弃排队（可从任意线程调用）；acquire 随即以 cancelled 返回。"""
+        self._cancel.set()
+
+    def release(self, launched: bool = True):
+        fd = self._slot_fd
+        if fd is None:
+            return
+        self._slot_fd = None
+        try:
+            if launched and self.settle:
+                # 槽位在 settle 秒内仍视为占用，即使本进程随即退出
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, _RELEASE_AT.pack(time.time() + self.settle))
+        except OSError:
+            pass
+        finally:
+            _unlock(fd)
+            os.close(fd)
+
+    def describe(self) -> dict:
+        return {"result": self.outcome, "waited_ms": round(self.waited * 1000.0, 1),
+                "position": self.first_position or 0, "max_concurrent": self.max_concurrent}
+
+# ======================= 渲染档位 =======================
+RENDER_PROFILE_FULL = "full"
+RENDER_PROFILE_LITE = "lite"
+
+
+def _remote_session_reason() -> Optional[str]:
+    """检测远程桌面 / VDI / 软件渲染会话，返回命中原因；普通本地会话返回 None。"""
+    session = os.getenv("SESSIONNAME", "")
+    if session.upper().startswith(("RDP-", "ICA-")):
+        return f"session:{session}"
+    if os.name == "nt":
+        try:
+            import ctypes
+            if ctypes.windll.user32.GetSystemMetrics(0x1000):  # SM_REMOTESESSION
+                return "rdp"
+        except Exception:
+            pass
+    for var in ("ViewClient_Machine_Name", "CITRIX_SESSION_ID"):
+        if os.getenv(var):
+            return f"vdi:{var}"
+    if os.getenv("QT_OPENGL", "").lower() == "software" or os.getenv("LIBGL_ALWAYS_SOFTWARE") == "1":
+        return "software-gl"
+    if os.getenv("QT_QUICK_BACKEND", "").lower() == "software":
+        return "software-gl"
+    if os.name != "nt" and os.getenv("SSH_CONNECTION") and os.getenv("DISPLAY"):
+        return "x11-forwarding"
+    return None
+
+
+class RenderProfile:
+    """
+    渲染档位：full 为默认效果；lite 为不透明、无阴影、少动画的低开销版本，
+    用于 RDP、VDI 与软件渲染会话。可用环境变量 IBASE_RENDER_PROFILE 或配置 render_profile 覆盖（full / lite / auto）。
+    """
+
+    def __init__(self, name: str = RENDER_PROFILE_FULL, reason: str = "default"):
+        self.name = name
+        self.reason = reason
+
+    @property
+    def lite(self) -> bool:
+        return self.name == RENDER_PROFILE_LITE
+
+    @property
+    def translucent(self) -> bool:
+        return not self.lite
+
+    @property
+    def effects(self) -> bool:
+        return not self.lite
+
+    @property
+    def animations(self) -> bool:
+        return not self.lite
+
+    def describe(self) -> dict:
+        return {"profile": self.name, "reason": self.reason}
+
+    @classmethod
+    def detect(cls, cfg: Optional[dict] = None) -> "RenderProfile":
+        env = os.getenv("IBASE_RENDER_PROFILE", "").strip().lower()
+        if env in (RENDER_PROFILE_FULL, RENDER_PROFILE_LITE):
+            return cls(env, "env")
+        configured = str((cfg or {}).get("render_profile", "auto")).strip().lower()
+        if configured in (RENDER_PROFILE_FULL, RENDER_PROFILE_LITE):
+            return cls(configured, "config")
+        reason = _remote_session_reason()
+        if reason:
+            return cls(RENDER_PROFILE_LITE, reason)
+        return cls(RENDER_PROFILE_FULL, "local")
+
 
 # ======================= 主题与样式 =======================
 class Theme:
@@ -232,6 +2951,13 @@ class Theme:
     A2   = QColor(183, 168, 255)
     A3   = QColor(245, 177, 210)
 
+    profile = RenderProfile()
+
+    @staticmethod
+    def _flatten_gradients(css: str) -> str:
+        # 低开销档位：渐变改为首个色标的纯色
+        return re.sub(r"qlineargradient\([^;]*?stop:0\s+(rgba\([^)]*\))[^;]*\)", r"\1", css)
+
     @staticmethod
     def _available_fonts() -> set:
         try:
@@ -246,7 +2972,9 @@ class Theme:
             return set()
 
     @staticmethod
-    def apply(app: QApplication):
+    def apply(app: QApplication, profile: Optional[RenderProfile] = None):
+        if profile is not None:
+            Theme.profile = profile
         QApplication.setStyle("Fusion")
         # 更优中文字体优先级
         prefer = [
@@ -280,7 +3008,7 @@ class Theme:
         pal.setColor(QPalette.ColorRole.HighlightedText, QColor(255, 255, 255))
         app.setPalette(pal)
 
-        app.setStyleSheet(f"""
+        css = f"""
         QWidget{{ color:{Theme.TXT.name()}; font-size:12pt; background: transparent; }}
         .Card{{
             background: qlineargradient(x1:0,y1:0,x2:1,y2:1,
@@ -426,19 +3154,26 @@ class Theme:
             font-size:15px;
             letter-spacing:0.6px;
         }}
-        """)
+        """
+        if Theme.profile.lite:
+            css = Theme._flatten_gradients(css)
+        app.setStyleSheet(css)
 
     @staticmethod
     def elevate_button(btn: QPushButton, blur: int = 24, y_offset: int = 6, alpha: int = 65):
+        btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        if not Theme.profile.effects:
+            return
         effect = QGraphicsDropShadowEffect(btn)
         effect.setBlurRadius(blur)
         effect.setOffset(0, y_offset)
         effect.setColor(QColor(15, 23, 42, alpha))
         btn.setGraphicsEffect(effect)
-        btn.setCursor(Qt.CursorShape.PointingHandCursor)
 
     @staticmethod
     def frost_field(field: QWidget, blur: int = 24, y_offset: int = 3, alpha: int = 48):
+        if not Theme.profile.effects:
+            return
         effect = QGraphicsDropShadowEffect(field)
         effect.setBlurRadius(blur)
         effect.setOffset(0, y_offset)
@@ -553,6 +3288,8 @@ class PasswordLineEdit(QLineEdit):
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        # 返回 True 表示粘贴已由外部处理，否则按默认方式插入剪贴板内容
+        self.paste_handler: Optional[Callable[[], bool]] = None
         self._eye = EyeToggleButton(self)
         self._eye.toggled.connect(self._on_toggle)
         self._update_margins()
@@ -577,6 +3314,12 @@ class PasswordLineEdit(QLineEdit):
         self.setEchoMode(QLineEdit.EchoMode.Password if hidden else QLineEdit.EchoMode.Normal)
         self.toggled.emit(hidden)
 
+    def keyPressEvent(self, e):
+        if e.matches(QKeySequence.StandardKey.Paste) and self.paste_handler is not None and self.paste_handler():
+            e.accept()
+            return
+        super().keyPressEvent(e)
+
     def showEvent(self, e):
         super().showEvent(e)
         self._position_eye()
@@ -595,7 +3338,10 @@ class AnimatedBar(QWidget):
         self._timer = QTimer(self)
         self._timer.setInterval(28)
         self._timer.timeout.connect(self._tick)
-        self._timer.start()
+        if Theme.profile.animations:
+            self._timer.start()
+        else:
+            self.t = 0.5
     def _tick(self):
         self.t = (self.t + 0.006) % 1.0
         self.update()
@@ -614,7 +3360,8 @@ class SpinnerWidget(QWidget):
         super().__init__(parent)
         self._angle = 0
         self._timer = QTimer(self)
-        self._timer.setInterval(80)
+        # 低开销档位降低刷新频率
+        self._timer.setInterval(80 if Theme.profile.animations else 240)
         self._timer.timeout.connect(self._tick)
         self._timer.start()
         self.setFixedSize(72, 72)
@@ -639,10 +3386,12 @@ class SpinnerWidget(QWidget):
 
 
 class LoadingDialog(QDialog):
+    LOADING_TEXT = "加载中，请稍等"
+
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Dialog)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, Theme.profile.translucent)
         self.setModal(True)
 
         outer = QVBoxLayout(self)
@@ -656,18 +3405,34 @@ class LoadingDialog(QDialog):
         card_layout.setSpacing(18)
 
         spinner = SpinnerWidget(card)
-        label = QLabel("加载中，请稍等", card)
+        label = QLabel(self.LOADING_TEXT, card)
         label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         label.setObjectName("Sub")
         label.setStyleSheet("color: black;")  # 设置字体颜色为黑色
+        self.label = label
+
+        # 仅在排队时显示，允许用户放弃等待
+        self.btn_cancel = QPushButton("取消", card)
+        self.btn_cancel.setObjectName("Secondary")
+        self.btn_cancel.hide()
 
         card_layout.addWidget(spinner, 0, Qt.AlignmentFlag.AlignCenter)
         card_layout.addWidget(label, 0, Qt.AlignmentFlag.AlignCenter)
+        card_layout.addWidget(self.btn_cancel, 0, Qt.AlignmentFlag.AlignCenter)
         outer.addWidget(card)
 
         Theme.frost_field(card, blur=40, y_offset=10, alpha=90)
+        Theme.elevate_button(self.btn_cancel, blur=24, y_offset=5, alpha=70)
         self.setFixedSize(self.sizeHint())
 
+    def set_queue_position(self, position: int):
+        """显示启动排队名次与取消按钮；0 表示已轮到，恢复加载提示。"""
+        self.label.setText(f"排队启动中，第 {position} 位" if position > 0 else self.LOADING_TEXT)
+        if self.btn_cancel.isHidden() == (position > 0):
+            self.btn_cancel.setVisible(position > 0)
+            self.setFixedSize(self.sizeHint())
+            self._center()
+
     def showEvent(self, event):
         super().showEvent(event)
         self._center()
@@ -691,13 +3456,13 @@ class LoadingDialog(QDialog):
         self.move(x, y)
 
     def sizeHint(self):
-        return QSize(260, 220)
+        return QSize(260, 220 if self.btn_cancel.isHidden() else 276)
 
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.setPen(Qt.PenStyle.NoPen)
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 0))
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 0) if Theme.profile.translucent else Theme.BG)
 
 # ======================= 激活对话框 =======================
 class TitleButton(QPushButton):
@@ -710,7 +3475,7 @@ class TitleButton(QPushButton):
         self.setFixedSize(28, 28)
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, Theme.profile.translucent)
         self._hover_anim = QVariantAnimation(self)
         self._hover_anim.setDuration(180)
         self._hover_anim.setEasingCurve(QEasingCurve.Type.InOutQuad)
@@ -786,12 +3551,18 @@ class TitleButton(QPushButton):
         return grad, radius
 
     def _animate_hover(self, target: float):
+        if not Theme.profile.animations:
+            self._on_hover_changed(max(0.0, min(1.0, target)))
+            return
         self._hover_anim.stop()
         self._hover_anim.setStartValue(self._hover_progress)
         self._hover_anim.setEndValue(max(0.0, min(1.0, target)))
         self._hover_anim.start()
 
     def _animate_press(self, target: float):
+        if not Theme.profile.animations:
+            self._on_press_changed(max(0.0, min(1.0, target)))
+            return
         self._press_anim.stop()
         self._press_anim.setStartValue(self._press_progress)
         self._press_anim.setEndValue(max(0.0, min(1.0, target)))
@@ -891,40 +3662,52 @@ class TitleBar(QWidget):
     def mouseReleaseEvent(self, e):
         self.drag = None; e.accept()
 
+# 合并重排：同一轮事件循环内的多次请求只处理一次。
+# 普通优先级的投递事件先于低优先级的重绘请求（UpdateRequest）执行，重排完成后只绘制一次。
+DEFERRED_LAYOUT_EVENT = QEvent.Type(QEvent.registerEventType())
+
+
 class Banner(QLabel):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._hide_timer = QTimer(self)
         self._hide_timer.setSingleShot(True)
         self._hide_timer.timeout.connect(self._fade_out)
+        # 淡入淡出共用一个动画对象，避免每条提示新建 QPropertyAnimation
         self._fade = QPropertyAnimation(self, b"windowOpacity", self)
         self._fade.setDuration(160)
         self._fade.finished.connect(self._on_fade_finished)
         self._fading_out = False
+        self._tone = None
+        self._relayout_pending = False
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         self.setMinimumHeight(0)
         self.setMaximumHeight(0)
 
     def show_msg(self, text: str, ok=True, duration_ms: Optional[int] = None):
+        """ok 为 True / False 时显示成功 / 失败配色，为 None 时显示中性的进行中提示。"""
         self._hide_timer.stop()
         if self._fade.state() == QPropertyAnimation.State.Running:
             self._fade.stop()
         self._fading_out = False
         self.setText(text)
-        c = Theme.OK if ok else Theme.BAD
-        self.setObjectName("Banner")
-        self.setStyleSheet(
-            f"QLabel#Banner{{background:rgba({c.red()},{c.green()},{c.blue()},220);color:white;}}"
-        )
+        tone = None if ok is None else bool(ok)
+        if self._tone != tone or not self.styleSheet():
+            # 样式表重算开销较大，只在配色切换时更新
+            self._tone = tone
+            c = Theme.A2 if tone is None else (Theme.OK if tone else Theme.BAD)
+            self.setObjectName("Banner")
+            self.setStyleSheet(
+                f"QLabel#Banner{{background:rgba({c.red()},{c.green()},{c.blue()},220);color:white;}}"
+            )
         self.setMaximumHeight(QWIDGETSIZE_MAX)
         self.show()
         self.adjustSize()
         self.setWindowOpacity(0.0)
-        ani = QPropertyAnimation(self, b"windowOpacity", self)
-        ani.setDuration(120)
-        ani.setStartValue(0.0)
-        ani.setEndValue(1.0)
-        ani.start(QPropertyAnimation.DeletionPolicy.DeleteWhenStopped)
+        self._fade.setDuration(120)
+        self._fade.setStartValue(0.0)
+        self._fade.setEndValue(1.0)
+        self._fade.start()
         self._request_parent_resize()
         if duration_ms:
             self._hide_timer.start(max(0, duration_ms))
@@ -964,6 +3747,18 @@ class Banner(QLabel):
         self._request_parent_resize()
 
     def _request_parent_resize(self):
+        if not self._relayout_pending:
+            self._relayout_pending = True
+            QApplication.postEvent(self, QEvent(DEFERRED_LAYOUT_EVENT))
+
+    def event(self, e):
+        if e.type() == DEFERRED_LAYOUT_EVENT:
+            self._relayout_pending = False
+            self._apply_parent_resize()
+            return True
+        return super().event(e)
+
+    def _apply_parent_resize(self):
         parent = self.parentWidget()
         if parent is None:
             return
@@ -973,7 +3768,9 @@ class Banner(QLabel):
             return
         hint = window.sizeHint()
         if hint.isValid():
-            window.resize(window.width(), max(window.minimumHeight(), hint.height()))
+            height = max(window.minimumHeight(), hint.height())
+            if height != window.height():
+                window.resize(window.width(), height)
 
 # ======================= 激活对话框 =======================
 class CenterPopup(QFrame):
@@ -994,11 +3791,12 @@ class CenterPopup(QFrame):
         self.label.setWordWrap(True)
         layout.addWidget(self.label)
 
-        shadow = QGraphicsDropShadowEffect(self.label)
-        shadow.setBlurRadius(36)
-        shadow.setOffset(0, 8)
-        shadow.setColor(QColor(15, 23, 42, 150))
-        self.label.setGraphicsEffect(shadow)
+        if Theme.profile.effects:
+            shadow = QGraphicsDropShadowEffect(self.label)
+            shadow.setBlurRadius(36)
+            shadow.setOffset(0, 8)
+            shadow.setColor(QColor(15, 23, 42, 150))
+            self.label.setGraphicsEffect(shadow)
 
         self._opacity = QGraphicsOpacityEffect(self)
         self._opacity.setOpacity(0.0)
@@ -1010,15 +3808,26 @@ class CenterPopup(QFrame):
         self._timer.setSingleShot(True)
         self._timer.timeout.connect(self._start_fade_out)
         self._is_hiding = False
+        self._recenter_pending = False
 
         if parent:
             parent.installEventFilter(self)
 
     def eventFilter(self, obj, event):
-        if obj is self.parent() and self.isVisible() and event.type() in (QEvent.Type.Resize, QEvent.Type.Move):
-            self._center()
+        # 坐标相对父窗口，父窗口移动无需重新居中
+        if obj is self.parent() and self.isVisible() and event.type() == QEvent.Type.Resize \
+                and not self._recenter_pending:
+            self._recenter_pending = True
+            QApplication.postEvent(self, QEvent(DEFERRED_LAYOUT_EVENT))
         return super().eventFilter(obj, event)
 
+    def event(self, e):
+        if e.type() == DEFERRED_LAYOUT_EVENT:
+            self._recenter_pending = False
+            self._center()
+            return True
+        return super().event(e)
+
     def _center(self):
         parent = self.parentWidget()
         if not parent:
@@ -1060,18 +3869,94 @@ class CenterPopup(QFrame):
             self._opacity.setOpacity(0.0)
 
 
+class Toast(QLabel):
+    """
+    轻量提示窗：进程内只保留一个实例，重复提示只更新文字与配色并重新计时，
+    不再为每条消息新建顶层窗口。
+    """
+
+    DURATION_MS = 3200
+    _instance: Optional["Toast"] = None
+
+    def __init__(self):
+        super().__init__(None, Qt.WindowType.ToolTip | Qt.WindowType.FramelessWindowHint
+                         | Qt.WindowType.WindowStaysOnTopHint)
+        self.setObjectName("Toast")
+        self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, True)
+        self.setWordWrap(True)
+        self.setMaximumWidth(420)
+        self.setContentsMargins(18, 12, 18, 12)
+        self._color: Optional[QColor] = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.hide)
+
+    @classmethod
+    def instance(cls) -> "Toast":
+        if cls._instance is None:
+            cls._instance = cls()
+            cls._instance.destroyed.connect(cls._forget)
+        return cls._instance
+
+    @classmethod
+    def _forget(cls, *_):
+        cls._instance = None
+
+    def show_message(self, text: str, color: Optional[QColor] = None, duration_ms: Optional[int] = None,
+                     anchor: Optional[QWidget] = None):
+        color = color or Theme.BAD
+        if color != self._color:
+            self._color = QColor(color)
+            self.setStyleSheet(
+                f"QLabel#Toast{{background:rgba({color.red()},{color.green()},{color.blue()},235);"
+                f"color:white;border-radius:10px;}}"
+            )
+        self.setText(text)
+        self.adjustSize()
+        self._place(anchor)
+        self.show()
+        self._timer.start(max(0, duration_ms if duration_ms is not None else self.DURATION_MS))
+
+    def _place(self, anchor: Optional[QWidget]):
+        # 贴在锚点窗口（默认当前活动窗口）下方居中，没有窗口时放在主屏底部
+        anchor = anchor or QApplication.activeWindow()
+        if anchor is not None and anchor.isVisible():
+            geo = anchor.frameGeometry()
+            x = geo.x() + (geo.width() - self.width()) // 2
+            self.move(x, geo.bottom() + 12)
+            return
+        screen = QGuiApplication.primaryScreen()
+        if screen:
+            geo = screen.availableGeometry()
+            self.move(geo.x() + (geo.width() - self.width()) // 2, geo.bottom() - self.height() - 48)
+
+
+# 激活码输入框的长度上限（16 位加分隔符与空白绰绰有余），过长的粘贴内容会被截断
+ACTIVATION_INPUT_MAX_LENGTH = 64
+
+
 class ActivateDialog(QDialog):
+    # 后台校验完成：(请求序号, {候选下标: 校验结果})，经排队连接回到界面线程
+    verified = pyqtSignal(object)
+
     RADIUS = 14.0  # 圆角半径（逻辑像素）
+    _mask_size = None  # 上次设置窗口掩码时的尺寸，尺寸未变则跳过
+    _motion: Optional[QPropertyAnimation] = None  # 入场浮动与抖动共用的位移动画
 
-    def __init__(self, mc: str, parent: QWidget = None):
+    def __init__(self, mc: Union[str, MachineCode], parent: QWidget = None):
         super().__init__(parent)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Dialog)
-        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, Theme.profile.translucent)
         self.setModal(True)
-        self.mc = _sanitize_machine_code(mc)
-        self.mc_display = format_machine_code(self.mc)
+        self.mc = MachineCode.of(mc)
+        self.mc_display = self.mc.formatted
         self.activation_code: Optional[str] = None
         self.expires_at: Optional[int] = None
+        self.verify_path: Optional[str] = None
+        self._verify_seq = 0
+        self._pending: Optional[tuple] = None  # 进行中的后台校验：(序号, 结果列表, 回调)
+        self.verified.connect(self._on_verified)
 
         # 外层布局（边距=0，卡片铺满圆角，不留黑圈）
         outer = QVBoxLayout(self); outer.setContentsMargins(0, 0, 0, 0)
@@ -1114,6 +3999,8 @@ class ActivateDialog(QDialog):
         # —— 激活码（右侧内嵌眼睛） —— #
         lab_cd = QLabel("激活码"); lab_cd.setObjectName("Sub")
         self.ed_code = PasswordLineEdit(); self.ed_code.setPlaceholderText("请输入激活码")
+        self.ed_code.setMaxLength(ACTIVATION_INPUT_MAX_LENGTH)
+        self.ed_code.paste_handler = self._paste_candidates
         self.ed_code.textChanged.connect(self.on_code_change)
         self.ed_code.returnPressed.connect(self.on_accept)
         self.ed_code.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
@@ -1145,24 +4032,33 @@ class ActivateDialog(QDialog):
         Theme.elevate_button(self.btn_ok, blur=32, y_offset=7, alpha=90)
         self.btn_ok.setEnabled(False); actions.addWidget(self.btn_cancel); actions.addWidget(self.btn_ok)
         card.addLayout(actions)
+        # 回车只由激活码输入框处理：否则对话框会把回车再转给自动默认按钮（首个即“复制”），横幅随即被隐藏
+        for button in container.findChildren(QPushButton):
+            button.setAutoDefault(False)
 
         # 尺寸与圆角掩码
         self.setMinimumSize(520, 320); self.adjustSize()
         self.update_mask()
         self.copy_popup = CenterPopup(self)
 
-        # 入场轻浮动
+        # 入场轻浮动（低开销档位不播放）
+        if not Theme.profile.animations:
+            return
         container.move(container.x(), container.y() + 8)
-        ani = QPropertyAnimation(container, b"pos", self)
-        ani.setDuration(220); ani.setStartValue(container.pos())
+        ani = self._motion_anim(container)
+        ani.setStartValue(container.pos())
         ani.setEndValue(QPoint(container.x(), container.y() - 8))
         ani.setEasingCurve(QEasingCurve.Type.OutCubic)
-        ani.start(QPropertyAnimation.DeletionPolicy.DeleteWhenStopped)
+        ani.start()
 
     # ========= 圆角掩码 =========
     def update_mask(self):
-        if self.width() <= 0 or self.height() <= 0:
+        # 低开销档位使用不透明矩形窗口，不设置窗口掩码
+        if self.width() <= 0 or self.height() <= 0 or not Theme.profile.translucent:
             return
+        if self.size() == self._mask_size:
+            return
+        self._mask_size = self.size()
         r = self.rect().adjusted(0, 0, -1, -1)
         path = QPainterPath(); path.addRoundedRect(QRectF(r), self.RADIUS, self.RADIUS)
         region = QRegion(path.toFillPolygon().toPolygon())
@@ -1176,22 +4072,40 @@ class ActivateDialog(QDialog):
         p = QPainter(self)
         p.setRenderHint(QPainter.RenderHint.Antialiasing)
         p.setPen(Qt.PenStyle.NoPen)
+        if not Theme.profile.translucent:
+            p.fillRect(self.rect(), Theme.BG)
+            return
         p.fillRect(self.rect(), Qt.GlobalColor.transparent)
         r = self.rect().adjusted(0, 0, -1, -1)
         path = QPainterPath(); path.addRoundedRect(QRectF(r), self.RADIUS, self.RADIUS)
         p.fillPath(path, Theme.BG)
 
     # —— 交互逻辑 —— #
-    def _shake(self, w: QWidget):
-        ani = QPropertyAnimation(w, b"pos", self)
+    def _motion_anim(self, target: QWidget) -> QPropertyAnimation:
+        """复用同一个位移动画；上一段尚未播完时先把目标放到终点，避免连续抖动后位置漂移。"""
+        ani = self._motion
+        if ani is None:
+            ani = self._motion = QPropertyAnimation(target, b"pos", self)
+        elif ani.state() == QPropertyAnimation.State.Running:
+            ani.stop()
+            ani.targetObject().move(ani.endValue())
+        ani.setKeyValues([])
+        ani.setTargetObject(target)
         ani.setDuration(220)
+        ani.setEasingCurve(QEasingCurve.Type.Linear)
+        return ani
+
+    def _shake(self, w: QWidget):
+        if not Theme.profile.animations:
+            return
+        ani = self._motion_anim(w)
         ox, oy = w.x(), w.y()
         ani.setKeyValueAt(0.0, QPoint(ox, oy))
         ani.setKeyValueAt(0.25, QPoint(ox - 5, oy))
         ani.setKeyValueAt(0.50, QPoint(ox + 5, oy))
         ani.setKeyValueAt(0.75, QPoint(ox - 3, oy))
         ani.setKeyValueAt(1.0,  QPoint(ox, oy))
-        ani.start(QPropertyAnimation.DeletionPolicy.DeleteWhenStopped)
+        ani.start()
 
     def copy_mc(self):
         QApplication.clipboard().setText(self.mc_display, QClipboard.Mode.Clipboard)
@@ -1199,21 +4113,88 @@ class ActivateDialog(QDialog):
         self.copy_popup.show_message("机器码已复制", duration=3000)
 
     def paste_code(self):
-        self.ed_code.setText(QApplication.clipboard().text(QClipboard.Mode.Clipboard))
+        if not self._paste_candidates():
+            text = QApplication.clipboard().text(QClipboard.Mode.Clipboard)
+            self.ed_code.setText(text[:ACTIVATION_INPUT_MAX_LENGTH].strip())
+
+    def _paste_candidates(self) -> bool:
+        """从剪贴板文本中识别候选激活码并批量校验，填入第一个有效的；没有候选时返回 False。"""
+        text = QApplication.clipboard().text(QClipboard.Mode.Clipboard)
+        candidates = extract_activation_candidates(text, exclude=self.mc)
+        if not candidates:
+            return False
+        # 先填入第一个候选，校验完成后再换成有效的那个
+        self.ed_code.setText(format_activation_code(candidates[0]))
+        self._verify_codes(candidates, self._apply_paste_results)
+        return True
+
+    def _apply_paste_results(self, results: list):
+        chosen = next((r for r in results if r[0]), None)
+        self.ed_code.setText(format_activation_code((chosen or results[0])[3]))
+        if chosen is not None:
+            self.banner.show_msg("已从剪贴板识别出有效激活码", ok=True)
+        else:
+            error = results[0][2]
+            if len(results) > 1:
+                error = f"剪贴板中的 {len(results)} 个激活码均无效：{error}"
+            self.banner.show_msg(error, ok=False, duration_ms=4000)
+            self._shake(self)
+
+    def _verify_codes(self, codes: list, done: Callable[[list], None]):
+        """
+        校验激活码并以结果列表调用 done。不需要 v2 日期表即可判定时同步完成；
+        否则（旧码且日期表尚未构建完）转到后台线程，期间显示进行中提示并禁用确认按钮，界面线程不阻塞。
+        """
+        results = verify_activation_codes(self.mc, codes, build=False)
+        pending = [i for i, r in enumerate(results) if r[4] == VERIFY_PATH_PENDING]
+        if not pending:
+            done(results)
+            return
+        self._verify_seq += 1
+        seq, mc = self._verify_seq, self.mc
+        self._pending = (seq, results, done)
+        self.btn_ok.setEnabled(False)
+        self.banner.show_msg("正在校验激活码…", ok=None)
+
+        def work():
+            resolved = dict(zip(pending, verify_activation_codes(mc, [codes[i] for i in pending])))
+            try:
+                self.verified.emit((seq, resolved))
+            except RuntimeError:
+                pass  # 对话框已销毁
+
+        threading.Thread(target=work, name="verify", daemon=True).start()
+
+    def _on_verified(self, payload):
+        seq, resolved = payload
+        if self._pending is None or self._pending[0] != seq:
+            return  # 期间输入已改变，结果作废
+        _, results, done = self._pending
+        self._pending = None
+        for i, result in resolved.items():
+            results[i] = result
+        self.btn_ok.setEnabled(len(normalize_activation_code(self.ed_code.text())) >= 8)
+        done(results)
 
     def on_code_change(self, s: str):
+        self._pending = None
         normalized = normalize_activation_code(s)
         self.btn_ok.setEnabled(len(normalized) >= 8)
         self.banner.hide()
 
     def on_accept(self):
+        if self._pending is not None:
+            return
         raw_input = (self.ed_code.text() or "").strip()
         normalized = normalize_activation_code(raw_input)
         if not normalized:
             self.banner.show_msg("请输入激活码", ok=False, duration_ms=4000)
             self._shake(self)
             return
-        ok, expires_at, error_msg, normalized_code = verify_activation_code(self.mc, raw_input)
+        self._verify_codes([raw_input], lambda results: self._finish_accept(results[0]))
+
+    def _finish_accept(self, result: tuple):
+        ok, expires_at, error_msg, normalized_code, self.verify_path = result
         if not ok:
             if error_msg:
                 self.banner.show_msg(error_msg, ok=False, duration_ms=4000)
@@ -1225,34 +4206,463 @@ class ActivateDialog(QDialog):
         QTimer.singleShot(200, self.accept)
 
 
-def start_ibase_exe() -> int:
+# CREATE_NO_WINDOW 与 DETACHED_PROCESS 结合使用；非 Windows 平台无此标志
+_SPAWN_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0) | getattr(subprocess, "DETACHED_PROCESS", 0)
+
+
+# 启动成功后加载窗保留的时长；失败时改为保留到错误提示播完
+LOADER_CLOSE_DELAY_MS = 600
+
+
+def _show_launch_error(message: str):
+    if QApplication.instance() is None:
+        return
+    Toast.instance().show_message(message, Theme.BAD)
+
+
+def _await_admission(admission: AdmissionController, loader: LoadingDialog) -> bool:
+    """在后台线程中排队，界面线程保持响应并刷新排队名次；用户点“取消”时放弃排队。"""
+    positions: list = []
+    outcome: dict = {}
+    worker = threading.Thread(
+        target=lambda: outcome.update(ok=admission.acquire(positions.append)), name="admission", daemon=True
+    )
+    loop = QEventLoop()
+    timer = QTimer()
+    shown = [0]
+
+    def poll():
+        if positions and positions[-1] != shown[0]:
+            shown[0] = positions[-1]
+            loader.set_queue_position(shown[0])
+        if not worker.is_alive():
+            timer.stop()
+            loop.quit()
+
+    timer.timeout.connect(poll)
+    loader.btn_cancel.clicked.connect(admission.cancel)
+    worker.start()
+    worker.join(ADMISSION_POLL_INTERVAL)
+    if worker.is_alive():
+        timer.start(int(ADMISSION_POLL_INTERVAL * 1000))
+        loop.exec()
+    loader.btn_cancel.clicked.disconnect(admission.cancel)
+    if shown[0]:
+        loader.set_queue_position(0)
+    return bool(outcome.get("ok"))
+
+
+def start_ibase_exe(info: Optional[dict] = None, cfg: Optional[dict] = None) -> int:
     exe = str(IBASE_EXE_PATH)
     if not os.path.isfile(exe):
-        w = QWidget()
-        w.hide()
-        t = Toast(w, "未找到 iBase.exe", Theme.BAD)
-        t.show_at(40, 40)
+        log.error("未找到 iBase.exe：%s", exe)
+        _show_launch_error("未找到 iBase.exe")
         return 1
+    integrity = ExeIntegrity(cfg)
+    policy = SchedulingPolicy.from_config(cfg or {})
+    allowed, background = integrity.preflight()
+    if not allowed:
+        log.error("iBase.exe 完整性校验失败：%s", integrity.digest)
+        _show_launch_error("iBase.exe 完整性校验失败，文件可能已被篡改或损坏")
+        return 3
     try:
+        spawn_start = time.perf_counter()
         # 使用 subprocess.Popen，设置 CREATE_NO_WINDOW 和 DETACHED_PROCESS
-        subprocess.Popen(
+        proc = subprocess.Popen(
             [exe],
             shell=False,
-            creationflags=subprocess.CREATE_NO_WINDOW | subprocess.DETACHED_PROCESS,  # 结合两种标志
+            creationflags=_SPAWN_FLAGS | policy.creationflags(),
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,  # 确保输入也重定向
             start_new_session=True,
             close_fds=True  # 关闭文件描述符以避免继承
         )
-        return 0
+        METRICS.observe("spawn_seconds", time.perf_counter() - spawn_start)
+        if info is not None:
+            info["pid"] = proc.pid
+            info["process"] = proc
+        if policy:
+            scheduling = policy.apply(proc.pid)
+            log.info("调度设置：%s", scheduling["effective"])
+            if info is not None:
+                info["scheduling"] = scheduling
     except Exception as e:
-        print(f"启动 iBase.exe 失败：{e}")
-        w = QWidget()
-        w.hide()
-        t = Toast(w, f"启动 iBase.exe 失败：{str(e)}", Theme.BAD)
-        t.show_at(40, 40)
+        log.error("启动 iBase.exe 失败：%s", e)
+        _show_launch_error(f"启动 iBase.exe 失败：{str(e)}")
         return 2
+    if background:
+        thread = integrity.rehash_in_background()
+        if info is not None:
+            info["integrity_thread"] = thread
+    return 0
+
+# ======================= 启动画面 =======================
+SPLASH_IMAGE_NAME = "splash.png"
+SPLASH_SIZE = QSize(360, 160)
+
+
+def _render_splash_pixmap(translucent: bool = True) -> QPixmap:
+    """
+    优先使用随程序分发的预渲染图片；没有时用 QPainter 直接绘制，不依赖样式表与特效。
+    translucent 为 False 时绘制不透明的矩形底色，不使用圆角透明区域。
+    """
+    image = base_dir() / SPLASH_IMAGE_NAME
+    if image.is_file():
+        pm = QPixmap(str(image))
+        if not pm.isNull():
+            return pm
+    screen = QGuiApplication.primaryScreen()
+    ratio = screen.devicePixelRatio() if screen else 1.0
+    pm = QPixmap(int(SPLASH_SIZE.width() * ratio), int(SPLASH_SIZE.height() * ratio))
+    pm.setDevicePixelRatio(ratio)
+    pm.fill(Qt.GlobalColor.transparent if translucent else Theme.BG)
+    p = QPainter(pm)
+    p.setRenderHint(QPainter.RenderHint.Antialiasing)
+    rect = QRectF(0, 0, SPLASH_SIZE.width(), SPLASH_SIZE.height())
+    if translucent:
+        path = QPainterPath(); path.addRoundedRect(rect.adjusted(0.5, 0.5, -0.5, -0.5), 14.0, 14.0)
+        p.fillPath(path, Theme.BG)
+    g = QLinearGradient(0, 0, rect.width(), 0)
+    g.setColorAt(0.0, Theme.A1); g.setColorAt(0.5, Theme.A2); g.setColorAt(1.0, Theme.A3)
+    p.fillRect(QRectF(28, rect.height() - 44, rect.width() - 56, 2), g)
+    f = QFont(); f.setPointSize(17); f.setBold(True)
+    p.setFont(f); p.setPen(Theme.TXT)
+    p.drawText(rect.adjusted(0, 0, 0, -24), Qt.AlignmentFlag.AlignCenter, "iBase")
+    f.setPointSize(10); f.setBold(False)
+    p.setFont(f); p.setPen(Theme.MUT)
+    p.drawText(QRectF(0, rect.height() - 36, rect.width(), 24), Qt.AlignmentFlag.AlignCenter, "正在启动…")
+    p.end()
+    return pm
+
+
+class Splash(QWidget):
+    """
+    最简启动画面：在主题与对话框构建前显示，记录首帧时间。
+    不使用 QSplashScreen，以免其显示时同步等待窗口曝光。低开销档位下为不透明窗口。
+    """
+
+    def __init__(self, profile: Optional[RenderProfile] = None):
+        super().__init__(None, Qt.WindowType.SplashScreen | Qt.WindowType.FramelessWindowHint
+                         | Qt.WindowType.WindowStaysOnTopHint)
+        self._translucent = (profile or Theme.profile).translucent
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground, self._translucent)
+        self._pixmap = _render_splash_pixmap(self._translucent)
+        self.first_frame: Optional[float] = None
+        size = self._pixmap.deviceIndependentSize().toSize()
+        self.setFixedSize(size)
+        screen = QGuiApplication.primaryScreen()
+        if screen:
+            geo = screen.availableGeometry()
+            self.move(geo.x() + (geo.width() - size.width()) // 2, geo.y() + (geo.height() - size.height()) // 2)
+
+    def paintEvent(self, e):
+        p = QPainter(self)
+        if not self._translucent:
+            p.fillRect(self.rect(), Theme.BG)
+        p.drawPixmap(0, 0, self._pixmap)
+        p.end()
+        if self.first_frame is None:
+            self.first_frame = time.perf_counter() - _PROCESS_T0
+            METRICS.observe("first_frame_seconds", self.first_frame)
+
+    def handoff(self, widget: QWidget):
+        """完整界面显示后再关闭启动画面，避免中间出现空白。"""
+        widget.show()
+        QTimer.singleShot(0, self.close)
+
+
+def show_splash(app: QApplication, profile: Optional[RenderProfile] = None) -> Optional[Splash]:
+    if os.getenv("IBASE_NO_SPLASH"):
+        return None
+    splash = Splash(profile)
+    splash.show()
+    splash.repaint()
+    app.processEvents()
+    return splash
+
+# ======================= 启动流水线 =======================
+STARTUP_JOIN_TIMEOUT = 8.0
+STARTUP_POLL_INTERVAL_MS = 50
+
+
+def _store_binding(cfg: dict, mc: MachineCode, code: str, expires_at: Optional[int]):
+    """写入绑定；原地更新 bind，保留管理员写入的 scheduling 等其它项。"""
+    bind = cfg.get("bind")
+    if not isinstance(bind, dict):
+        bind = cfg["bind"] = {}
+    bind.update({
+        "machine_code": str(mc),
+        "activation_code": code,
+        "expires_at": expires_at,
+    })
+    cfg["activated"] = True
+
+
+def _check_stored_binding(cfg: dict, mc: MachineCode) -> Tuple[bool, Optional[int], bool, Optional[str]]:
+    """校验配置中已保存的绑定，返回 (是否已激活, 到期时间, 配置是否需要回写, 校验路径)。"""
+    bind = cfg.get("bind")
+    if not isinstance(bind, dict):
+        return False, None, False, None
+    saved_mc = _sanitize_machine_code(bind.get("machine_code", ""))
+    if saved_mc != mc:
+        return False, None, False, None
+    stored_code = bind.get("activation_code", "")
+    ok, exp, _err, normalized, path = _verify_activation_code(mc, stored_code or "")
+    if not ok:
+        return False, None, False, path
+    needs_save = False
+    if not cfg.get("activated"):
+        cfg["activated"] = True
+        needs_save = True
+    if (
+        normalized != (stored_code or "")
+        or bind.get("expires_at") != exp
+        or saved_mc != mc
+    ):
+        _store_binding(cfg, mc, normalized, exp)
+        needs_save = True
+    return True, exp, needs_save, path
+
+
+def _check_bundled_binding(cfg: dict, mc: MachineCode) -> Tuple[bool, Optional[int], bool, Optional[str]]:
+    """未绑定时在授权包中查找本机激活码，校验通过则直接写入绑定。"""
+    code = find_bundled_code(mc)
+    if code is None:
+        return False, None, False, None
+    ok, exp, err, normalized, path = _verify_activation_code(mc, code)
+    if not ok:
+        log.warning("授权包中本机激活码不可用：%s", err)
+        return False, None, False, path
+    _store_binding(cfg, mc, normalized, exp)
+    return True, exp, True, path
+
+
+def _resolve_binding(cfg: dict, mc: MachineCode) -> Tuple[bool, Optional[int], bool, Optional[str], str]:
+    """依次尝试已存绑定与授权包，额外返回绑定来源（stored / bundle / dialog）。"""
+    activated, exp, needs_save, path = _check_stored_binding(cfg, mc)
+    if activated:
+        return activated, exp, needs_save, path, "stored"
+    bundled = _check_bundled_binding(cfg, mc)
+    if bundled[0]:
+        return bundled + ("bundle",)
+    return activated, exp, needs_save, path, "dialog"
+
+
+class StartupPipeline:
+    """
+    启动编排：机器码探测、配置读取与已存绑定校验在工作线程中并行执行，
+    主线程同时完成 QApplication 与主题初始化，随后在首次弹窗前汇合。
+    """
+
+    def __init__(self, timeout: float = STARTUP_JOIN_TIMEOUT):
+        self.timeout = timeout
+        self.timings: Dict[str, float] = {}
+        self.prefetcher: Optional[Prefetcher] = None
+        self._t0 = time.perf_counter()
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+        self._cfg_future = self._pool.submit(self._timed, "config", self._load_config)
+        self._mc_future = self._pool.submit(self._timed, "machine_code", current_machine_code)
+        self._verify_future = self._pool.submit(self._timed, "verify", self._verify)
+
+    def _timed(self, name: str, fn: Callable):
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def _load_config(self) -> dict:
+        # 预读在配置任务内部启动：future 完成时 prefetcher 已就绪，汇合后读取不会落空
+        cfg = load_config()
+        try:
+            self.prefetcher = start_prefetch(cfg)
+        except Exception as e:
+            log.warning("启动预读失败：%s", e)
+        return cfg
+
+    def _verify(self) -> Tuple[dict, MachineCode, bool, Optional[int], bool, Optional[str], str]:
+        cfg = self._cfg_future.result()
+        mc = self._mc_future.result()
+        return (cfg, mc) + _resolve_binding(cfg, mc)
+
+    def _join(self, future, name: str):
+        remaining = max(0.0, self.timeout - (time.perf_counter() - self._t0))
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            pass
+        # 超时后不在主线程重复执行同一步骤：工作线程仍在读写同一份配置，且慢的正是这些探测。
+        # 继续等待，期间处理事件，启动画面保持响应
+        log.warning("启动步骤 %s 超过 %g 秒仍未完成，继续等待", name, self.timeout)
+        METRICS.inc("startup_overruns_total", step=name)
+        if QApplication.instance() is not None and not future.done():
+            loop = QEventLoop()
+            timer = QTimer()
+            timer.timeout.connect(lambda: future.done() and loop.quit())
+            timer.start(STARTUP_POLL_INTERVAL_MS)
+            loop.exec()
+            timer.stop()
+        return future.result()
+
+    def config(self) -> dict:
+        """只等待配置读取，供主题初始化前选择渲染档位。"""
+        return self._join(self._cfg_future, "config")
+
+    def join(self) -> Tuple[dict, MachineCode, bool, Optional[int], bool, Optional[str], str]:
+        result = self._join(self._verify_future, "verify")
+        self._pool.shutdown(wait=False)
+        self.timings["join"] = time.perf_counter() - self._t0
+        return result
+
+
+# ======================= 卡顿监测 =======================
+# 默认关闭；config.json 中 watchdog.enabled 或环境变量 IBASE_WATCHDOG=1 开启
+WATCHDOG_ENV = "IBASE_WATCHDOG"
+WATCHDOG_DEFAULTS = {"enabled": False, "threshold_ms": 200, "interval_ms": 50}
+WATCHDOG_REPORT_PATH = LOG_DIR / "stalls.log"
+WATCHDOG_REPORT_MAX_BYTES = 1 << 20
+WATCHDOG_HANG_SECONDS = 5.0
+WATCHDOG_MAX_FRAMES = 40
+WATCHDOG_STACKS_PER_REPORT = 3
+
+
+def _watchdog_settings(cfg: dict) -> dict:
+    settings = dict(WATCHDOG_DEFAULTS)
+    user = cfg.get("watchdog")
+    if isinstance(user, dict):
+        settings.update(user)
+    elif user is True:
+        settings["enabled"] = True
+    env = os.getenv(WATCHDOG_ENV)
+    if env is not None:
+        settings["enabled"] = env.strip().lower() not in ("", "0", "off", "false")
+    return settings
+
+
+class StallWatchdog:
+    """
+    界面事件循环卡顿监测：主线程定时器按 interval_ms 刷新心跳，监测线程发现心跳停滞超过 threshold_ms 后，
+    每个间隔用 sys._current_frames 采样一次主线程的 Python 调用栈；卡顿结束时把时长与按出现次数合并的
+    调用栈写入 stalls.log。持续超过 WATCHDOG_HANG_SECONDS 的卡顿先写一条 hang 记录，进程被强制结束也留有证据。
+    """
+
+    def __init__(self, threshold_ms: int = WATCHDOG_DEFAULTS["threshold_ms"],
+                 interval_ms: int = WATCHDOG_DEFAULTS["interval_ms"], path: Optional[Path] = None):
+        self.interval = max(10, int(interval_ms)) / 1000.0
+        self.threshold = max(self.interval * 2, int(threshold_ms) / 1000.0)
+        self.path = path or WATCHDOG_REPORT_PATH
+        self.stalls: list = []
+        self._worst: Optional[Tuple[float, str]] = None
+        self._beat = time.monotonic()
+        self._main = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._timer: Optional[QTimer] = None
+        self._write_failed = False
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> Optional["StallWatchdog"]:
+        settings = _watchdog_settings(cfg)
+        if not settings.get("enabled"):
+            return None
+        return cls(int(settings.get("threshold_ms", WATCHDOG_DEFAULTS["threshold_ms"])),
+                   int(settings.get("interval_ms", WATCHDOG_DEFAULTS["interval_ms"])))
+
+    def start(self) -> "StallWatchdog":
+        self._beat = time.monotonic()
+        self._timer = QTimer()
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self._heartbeat)
+        self._timer.start(int(self.interval * 1000))
+        self._thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self._thread.start()
+        return self
+
+    def _heartbeat(self):
+        self._beat = time.monotonic()
+
+    def _sample(self) -> Tuple[str, ...]:
+        frame = sys._current_frames().get(self._main)
+        if frame is None:
+            return ()
+        stack = traceback.extract_stack(frame, limit=WATCHDOG_MAX_FRAMES)
+        return tuple(f"{os.path.basename(f.filename)}:{f.lineno} {f.name}" for f in stack)
+
+    @staticmethod
+    def _stacks(samples: Dict[Tuple[str, ...], int]) -> list:
+        ranked = sorted(samples.items(), key=lambda item: -item[1])[:WATCHDOG_STACKS_PER_REPORT]
+        return [{"samples": count, "frames": list(frames)} for frames, count in ranked]
+
+    def _run(self):
+        stalled_since: Optional[float] = None
+        samples: Dict[Tuple[str, ...], int] = {}
+        hang_reported = False
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            if stalled_since is not None and beat != stalled_since:
+                self._finish(beat - stalled_since, samples)
+                stalled_since, samples, hang_reported = None, {}, False
+            lag = time.monotonic() - beat
+            if lag <= self.threshold:
+                continue
+            if stalled_since is None:
+                stalled_since = beat
+            stack = self._sample()
+            samples[stack] = samples.get(stack, 0) + 1
+            if not hang_reported and lag >= WATCHDOG_HANG_SECONDS:
+                hang_reported = True
+                self._write({"event": "hang", "lag_ms": _ms(lag), "stacks": self._stacks(samples)})
+        if stalled_since is not None:
+            # stop() 由主线程调用，说明卡顿已结束，只是心跳尚未刷新
+            self._finish(time.monotonic() - stalled_since, samples)
+
+    def _finish(self, duration: float, samples: Dict[Tuple[str, ...], int]):
+        stacks = self._stacks(samples)
+        self.stalls.append(duration)
+        top = stacks[0]["frames"][-1] if stacks and stacks[0]["frames"] else "?"
+        if self._worst is None or duration > self._worst[0]:
+            self._worst = (duration, top)
+        METRICS.inc("ui_stalls_total")
+        METRICS.observe("ui_stall_seconds", duration)
+        self._write({"event": "stall", "duration_ms": _ms(duration), "samples": sum(samples.values()),
+                     "stacks": stacks})
+
+    def _write(self, record: dict):
+        record = dict(ts=dt.datetime.now().isoformat(timespec="milliseconds"), pid=os.getpid(), **record)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                if self.path.stat().st_size > WATCHDOG_REPORT_MAX_BYTES:
+                    os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        except OSError as e:
+            if not self._write_failed:
+                self._write_failed = True
+                log.warning("写入卡顿报告失败：%s", e)
+
+    def stop(self) -> dict:
+        """停止监测并返回摘要（次数、总时长、最长一次及其所在位置）。"""
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        summary = {
+            "stalls": len(self.stalls),
+            "total_ms": _ms(sum(self.stalls)),
+            "max_ms": _ms(self._worst[0]) if self._worst else 0.0,
+            "worst_at": self._worst[1] if self._worst else None,
+        }
+        if self.stalls:
+            log.info("界面卡顿 %d 次，共 %.0f ms，最长 %.0f ms（%s），详见 %s",
+                     summary["stalls"], summary["total_ms"], summary["max_ms"], summary["worst_at"], self.path)
+        return summary
 
 # ======================= 主流程 =======================
 def _safe_set_attr(name: str, value: bool = True):
@@ -1262,71 +4672,127 @@ def _safe_set_attr(name: str, value: bool = True):
     except AttributeError:
         pass
 
-def main():
-    _safe_set_attr("AA_EnableHighDpiScaling", True)
-    _safe_set_attr("AA_UseHighDpiPixmaps", True)
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000.0, 1)
 
-    app = QApplication(sys.argv)
-    Theme.apply(app)
 
-    cfg = load_config()
-    mc = get_machine_code()
+def _launch_flow(journal: LaunchJournal) -> int:
+    t0 = time.perf_counter()
+    pipeline = StartupPipeline()
+    phases: Dict[str, float] = {}
 
-    activated = False
-    expires_at: Optional[int] = None
-    stored_code: Optional[str] = None
+    _safe_set_attr("AA_EnableHighDpiScaling", True)
+    _safe_set_attr("AA_UseHighDpiPixmaps", True)
 
-    bind = cfg.get("bind")
-    if isinstance(bind, dict):
-        saved_mc = _sanitize_machine_code(bind.get("machine_code", ""))
-        if saved_mc == mc:
-            stored_code = bind.get("activation_code", "")
-            ok, exp, _err, normalized = verify_activation_code(mc, stored_code or "")
-            if ok:
-                activated = True
-                expires_at = exp
-                needs_save = False
-                if not cfg.get("activated"):
-                    cfg["activated"] = True
-                    needs_save = True
-                if (
-                    normalized != (stored_code or "")
-                    or bind.get("expires_at") != exp
-                    or _sanitize_machine_code(bind.get("machine_code", "")) != mc
-                ):
-                    bind.update({
-                        "activation_code": normalized,
-                        "expires_at": exp,
-                        "machine_code": mc,
-                    })
-                    cfg["bind"] = bind
-                    needs_save = True
-                if needs_save:
-                    save_config(cfg)
+    app = QApplication(sys.argv)
+    # 启动画面不等配置读取：按环境变量与会话类型预判档位（配置中的 render_profile 稍后才生效）
+    splash = show_splash(app, RenderProfile.detect())
+    if splash and splash.first_frame is not None:
+        phases["first_frame"] = splash.first_frame
+    profile = RenderProfile.detect(pipeline.config())
+    log.info("渲染档位：%s（%s）", profile.name, profile.reason)
+    Theme.apply(app, profile)
+    phases["qt_init"] = time.perf_counter() - t0
+    watchdog = StallWatchdog.from_config(pipeline.config())
+    if watchdog:
+        watchdog.start()
+
+    cfg, mc, activated, expires_at, needs_save, verify_path, binding = pipeline.join()
+    if needs_save:
+        save_config(cfg)
+    entry = {"verify": verify_path, "binding": binding, "render": profile.describe()}
+
+    def finish(code: int, outcome: str, **extra) -> int:
+        phases.update(pipeline.timings)
+        phases["total"] = time.perf_counter() - t0
+        if watchdog:
+            entry["stalls"] = watchdog.stop()
+        entry.update(extra)
+        METRICS.inc("launches_total", result=outcome)
+        journal.record_launch(
+            result=outcome, code=code, phases={k: _ms(v) for k, v in phases.items()}, **entry
+        )
+        return code
 
     if not activated:
+        warm_date_code_cache(mc)
+        t_dialog = time.perf_counter()
         dlg = ActivateDialog(mc)
-        if dlg.exec() != QDialog.DialogCode.Accepted:
-            return 0
+        if splash:
+            splash.handoff(dlg)
+            splash = None
+        accepted = dlg.exec() == QDialog.DialogCode.Accepted
+        phases["dialog"] = time.perf_counter() - t_dialog
+        entry["verify"] = dlg.verify_path
+        if not accepted:
+            return finish(0, "cancelled")
         stored_code = dlg.activation_code
         expires_at = dlg.expires_at
         if not stored_code or expires_at is None:
-            return 0
-        cfg["activated"] = True
-        cfg["bind"] = {
-            "machine_code": mc,
-            "activation_code": stored_code,
-            "expires_at": expires_at,
-        }
+            return finish(0, "cancelled")
+        _store_binding(cfg, mc, stored_code, expires_at)
         save_config(cfg)
 
     loader = LoadingDialog()
+    if splash:
+        splash.handoff(loader)
     loader.show()
     app.processEvents()
-    result = start_ibase_exe()
-    QTimer.singleShot(600, loader.accept)
+    prefetcher = pipeline.prefetcher
+    if prefetcher:
+        prefetcher.mark_launch()
+    launch: dict = {}
+    admission = AdmissionController.from_config(cfg)
+    if admission:
+        _await_admission(admission, loader)
+        phases["admission"] = admission.waited
+        entry["admission"] = admission.describe()
+        if admission.outcome == "cancelled":
+            loader.close()
+            return finish(0, "cancelled")
+    t_spawn = time.perf_counter()
+    result = start_ibase_exe(launch, cfg)
+    phases["spawn"] = time.perf_counter() - t_spawn
+    if admission:
+        admission.release(launched=result == 0)
+    monitor = start_monitor(cfg, launch) if result == 0 else None
+    QTimer.singleShot(LOADER_CLOSE_DELAY_MS if result == 0 else Toast.DURATION_MS, loader.accept)
     loader.exec()
-    return result
+    # after 模式的后台摘要不等待：未算完时记为 incomplete，下次启动重新计算
+    integrity_thread = launch.get("integrity_thread")
+    integrity = None if integrity_thread is None else ("incomplete" if integrity_thread.is_alive() else "complete")
+    report = prefetcher.report() if prefetcher else None
+    if launch.get("pid") and _prefetch_settings(cfg).get("learn"):
+        learn_prefetch_manifest(launch["pid"], report)
+    code = finish(result, "ok" if result == 0 else "error", pid=launch.get("pid"), prefetch=report,
+                  scheduling=launch.get("scheduling"), integrity=integrity)
+    if monitor:
+        # 监控模式：iBase 可能运行数小时，先导出本次启动的计数并写回配置，再留在后台等待；
+        # 退出后的资源摘要单独记为 supervise 记录，不改动已导出的启动数据
+        _flush_outputs()
+        monitor.wait()
+        journal.record_supervision(**monitor.summary())
+    return code
+
+
+def _flush_outputs():
+    METRICS.export()
+    mirror = config_mirror()
+    if mirror is not None and not mirror.flush():
+        log.warning("配置写回未在 %.0f 秒内完成，将在下次启动时继续", CONFIG_MIRROR_FLUSH_TIMEOUT)
+
+
+def main():
+    journal = LaunchJournal().start()
+    try:
+        return _launch_flow(journal)
+    except Exception:
+        METRICS.inc("launches_total", result="crash")
+        log.exception("启动器异常退出")
+        raise
+    finally:
+        _flush_outputs()
+        journal.stop()
 
 if __name__ == "__main__":
     sys.exit(main())
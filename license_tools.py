@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+iBase 授权管理命令行工具
+"""
+import re
+import sys
+import argparse
+import datetime as dt
+from pathlib import Path
+
+from ibase_launcher import (
+    ACTIVE_KEY_ID, BUNDLE_FILE_NAME, REVOCATION_BITS_PER_ENTRY, SECRET_KEYS, LicenseBundle, RevocationList,
+    calc_activation_code_v3, format_activation_code, format_machine_code, _sanitize_machine_code
+)
+
+
+def _parse_expiry(value: str):
+    if value.lower() == "permanent":
+        return None
+    try:
+        return dt.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的到期日期：{value}（应为 YYYY-MM-DD 或 permanent）")
+
+
+def _parse_key_id(value: str) -> int:
+    try:
+        key_id = int(value, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的密钥编号：{value}")
+    if key_id not in SECRET_KEYS:
+        raise argparse.ArgumentTypeError(f"密钥环中没有编号 {key_id}（可用：{sorted(SECRET_KEYS)}）")
+    return key_id
+
+
+def cmd_issue(args) -> int:
+    for raw in args.machine_code:
+        mc = _sanitize_machine_code(raw)
+        code = calc_activation_code_v3(mc, args.expires, args.key_id)
+        print(f"{format_machine_code(mc)}\t{format_activation_code(code)}")
+    return 0
+
+
+def _read_lines(path: str):
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line in stream:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def cmd_build_revocation(args) -> int:
+    blob = RevocationList.build(_read_lines(args.input), args.bits_per_entry, args.key_id)
+    with open(args.output, "wb") as f:
+        f.write(blob)
+    revoked = RevocationList(Path(args.output))
+    print(f"已写入 {args.output}：{len(revoked)} 条，{len(blob)} 字节")
+    revoked.close()
+    return 0
+
+
+def _bundle_pairs(lines, expires, key_id):
+    # 每行“机器码 激活码”（制表符、空格或逗号分隔，与 issue 的输出格式一致）；只有机器码时按 --expires 签发 v3 码
+    for line in lines:
+        fields = [f for f in re.split(r"[\s,;]+", line) if f]
+        mc = _sanitize_machine_code(fields[0])
+        code = fields[1] if len(fields) > 1 else calc_activation_code_v3(mc, expires, key_id)
+        yield mc, code
+
+
+def cmd_build_bundle(args) -> int:
+    blob = LicenseBundle.build(_bundle_pairs(_read_lines(args.input), args.expires, args.key_id), args.key_id)
+    with open(args.output, "wb") as f:
+        f.write(blob)
+    bundle = LicenseBundle(Path(args.output))
+    print(f"已写入 {args.output}：{len(bundle)} 台机器，{len(blob)} 字节")
+    bundle.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="license_tools", description="iBase 授权管理工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_issue = sub.add_parser("issue", help="签发 v3 激活码")
+    p_issue.add_argument("machine_code", nargs="+", help="机器码（可带分隔符）")
+    p_issue.add_argument("--expires", type=_parse_expiry, default=None,
+                         help="到期日期 YYYY-MM-DD，缺省或 permanent 表示永久")
+    p_issue.add_argument("--key-id", type=_parse_key_id, default=ACTIVE_KEY_ID,
+                         help=f"签发所用的密钥编号（默认当前密钥 {ACTIVE_KEY_ID}）")
+    p_issue.set_defaults(func=cmd_issue)
+
+    p_rev = sub.add_parser("build-revocation", help="由文本文件（每行一个激活码）生成签名吊销列表")
+    p_rev.add_argument("input", help="激活码列表文件，- 表示标准输入")
+    p_rev.add_argument("-o", "--output", default="revoked.bin", help="输出文件（默认 revoked.bin）")
+    p_rev.add_argument("--bits-per-entry", type=int, default=REVOCATION_BITS_PER_ENTRY,
+                       help="布隆过滤器每条目位数，越大误判越少")
+    p_rev.add_argument("--key-id", type=_parse_key_id, default=ACTIVE_KEY_ID,
+                       help=f"签名所用的密钥编号，记录在文件头（默认当前密钥 {ACTIVE_KEY_ID}）")
+    p_rev.set_defaults(func=cmd_build_revocation)
+
+    p_bundle = sub.add_parser("build-bundle", help="由“机器码 激活码”清单生成签名批量授权包，供批量部署自动绑定")
+    p_bundle.add_argument("input", help="每行“机器码 激活码”或仅机器码，- 表示标准输入")
+    p_bundle.add_argument("-o", "--output", default=BUNDLE_FILE_NAME, help=f"输出文件（默认 {BUNDLE_FILE_NAME}）")
+    p_bundle.add_argument("--expires", type=_parse_expiry, default=None,
+                          help="仅有机器码的行按此日期签发 v3 码，缺省或 permanent 表示永久")
+    p_bundle.add_argument("--key-id", type=_parse_key_id, default=ACTIVE_KEY_ID,
+                          help=f"签名及签发新码所用的密钥编号（默认当前密钥 {ACTIVE_KEY_ID}）")
+    p_bundle.set_defaults(func=cmd_build_bundle)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())